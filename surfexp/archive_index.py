@@ -0,0 +1,157 @@
+"""Index of artifacts produced by an experiment."""
+import contextlib
+import os
+import sqlite3
+import time
+
+from deode.logs import logger
+
+
+class ArchiveIndex:
+    """SQLite index of produced files.
+
+    Producing tasks register their output files. Consumers query the index and
+    validate a hit with a stat of the file, so removed or replaced files are
+    detected. Files found on the file system are registered.
+    """
+
+    def __init__(self, filename, timeout=60.0):
+        """Construct the index.
+
+        Args:
+            filename (str): SQLite database file
+            timeout (float, optional): Seconds to wait for a lock. Defaults to 60.
+
+        """
+        self.filename = filename
+        self.timeout = timeout
+        self.initialized = False
+
+    @contextlib.contextmanager
+    def connect(self):
+        """Connect to the database and commit on success.
+
+        Yields:
+            sqlite3.Connection: Connection
+
+        """
+        if not self.initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+        connection = sqlite3.connect(self.filename, timeout=self.timeout)
+        try:
+            if not self.initialized:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS artifacts ("
+                    "path TEXT PRIMARY KEY, kind TEXT, size INTEGER, "
+                    "mtime_ns INTEGER, registered REAL)"
+                )
+                self.initialized = True
+            yield connection
+            connection.commit()
+        finally:
+            connection.close()
+
+    def register(self, path, kind=""):
+        """Register a produced file.
+
+        Args:
+            path (str): File name
+            kind (str, optional): Kind of artifact. Defaults to "".
+
+        Returns:
+            bool: True if the file was registered.
+
+        """
+        path = os.path.normpath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            logger.warning("Can not register missing artifact {}", path)
+            return False
+        try:
+            with self.connect() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?)",
+                    (path, kind, stat.st_size, stat.st_mtime_ns, time.time()),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Could not register {} in {}: {}", path, self.filename, exc)
+            return False
+        logger.debug("Registered {} artifact {}", kind, path)
+        return True
+
+    def unregister(self, path):
+        """Remove a file from the index.
+
+        Args:
+            path (str): File name
+
+        """
+        path = os.path.normpath(path)
+        try:
+            with self.connect() as connection:
+                connection.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+        except sqlite3.Error as exc:
+            logger.warning("Could not unregister {} in {}: {}", path, self.filename, exc)
+
+    def entry(self, path):
+        """Get the registered signature of a file.
+
+        Args:
+            path (str): File name
+
+        Returns:
+            tuple: Size and modification time in ns. None if not registered.
+
+        """
+        path = os.path.normpath(path)
+        try:
+            with self.connect() as connection:
+                row = connection.execute(
+                    "SELECT size, mtime_ns FROM artifacts WHERE path = ?", (path,)
+                ).fetchone()
+        except sqlite3.Error as exc:
+            logger.warning("Could not query {}: {}", self.filename, exc)
+            return None
+        if row is None:
+            return None
+        return tuple(row)
+
+    def lookup(self, path):
+        """Check if a file is in the index.
+
+        Args:
+            path (str): File name
+
+        Returns:
+            bool: True if the file is registered.
+
+        """
+        return self.entry(path) is not None
+
+    def exists(self, path, kind=""):
+        """Check if a file exists.
+
+        A registered file is validated with a stat of the file. Entries of
+        removed files are unregistered and files changed since they were
+        registered are registered again.
+
+        Args:
+            path (str): File name
+            kind (str, optional): Kind of artifact if registered. Defaults to "".
+
+        Returns:
+            bool: True if the file exists.
+
+        """
+        entry = self.entry(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if entry is not None:
+                logger.debug("Unregister removed artifact {}", path)
+                self.unregister(path)
+            return False
+        if entry != (stat.st_size, stat.st_mtime_ns):
+            self.register(path, kind=kind)
+        return True
@@ -0,0 +1,479 @@
+"""Caching utilities."""
+import contextlib
+import copy
+import glob
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+from deode.logs import logger
+
+from surfexp import __version__
+
+NAMELIST_BUNDLE_VERSION = 1
+CONFIG_CACHE_VERSION = 1
+
+
+def fingerprint(data):
+    """Create a stable fingerprint of json serializable data.
+
+    Args:
+        data (any): Data to fingerprint
+
+    Returns:
+        str: Hex digest
+
+    """
+    dump = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(dump.encode("utf8")).hexdigest()
+
+
+def file_signature(filename):
+    """Get a signature of a file based on modification time and size.
+
+    Args:
+        filename (str): File name
+
+    Returns:
+        list: File name, modification time in ns and size. None if missing.
+
+    """
+    try:
+        stat = os.stat(filename)
+    except (FileNotFoundError, TypeError):
+        return None
+    return [filename, stat.st_mtime_ns, stat.st_size]
+
+
+def get_cache_dir(config, subdir):
+    """Get a persistent cache directory under the case directory.
+
+    Args:
+        config (deode.config_parser.ParsedConfig): Parsed config file contents.
+        subdir (str): Sub directory in the cache
+
+    Returns:
+        str: Cache directory. None if it can not be determined.
+
+    """
+    try:
+        from deode.toolbox import Platform
+
+        casedir = Platform(config).get_system_value("casedir")
+    except Exception as exc:  # noqa: BLE001
+        logger.debug("Could not determine cache directory: {}", exc)
+        return None
+    return f"{casedir}/cache/{subdir}"
+
+
+def write_json_atomic(filename, data):
+    """Write json data to a file atomically.
+
+    Args:
+        filename (str): File name
+        data (any): Json serializable data
+
+    """
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_filename = f"{filename}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_filename, mode="w", encoding="utf8") as fhandler:
+            json.dump(data, fhandler)
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+def config_cache_key(filename, json_schema=None):
+    """Create a cache key for a config file.
+
+    The key changes when the file content, the schema or the surfExp version
+    changes.
+
+    Args:
+        filename (str): Config file
+        json_schema (dict, optional): Schema used to validate. Defaults to None.
+
+    Returns:
+        str: Hex digest
+
+    """
+    sha = hashlib.sha256()
+    with open(filename, mode="rb") as fhandler:
+        sha.update(fhandler.read())
+    sha.update(fingerprint([CONFIG_CACHE_VERSION, __version__, json_schema]).encode())
+    return sha.hexdigest()
+
+
+def load_config(filename, json_schema=None, cache_dir=None):
+    """Load a validated config, using a cache of already validated configs.
+
+    Configs are also kept in memory, so that a long running process only
+    parses a config again when the file changes.
+
+    Args:
+        filename (str): Config file
+        json_schema (dict, optional): Schema used to validate. Defaults to None.
+        cache_dir (str, optional): Cache directory. Defaults to a .config_cache
+                                   directory next to the config file.
+
+    Returns:
+        deode.config_parser.ParsedConfig: Parsed config
+
+    """
+    from deode.config_parser import ParsedConfig
+
+    if cache_dir is None:
+        cache_dir = f"{os.path.dirname(os.path.abspath(filename))}/.config_cache"
+    basename = os.path.basename(filename)
+    key = config_cache_key(filename, json_schema=json_schema)
+    config = CONFIG_CACHE.get(key)
+    if config is not None:
+        return config
+
+    cache_file = f"{cache_dir}/{basename}.{key}.pickle"
+    try:
+        with open(cache_file, mode="rb") as fhandler:
+            config = pickle.load(fhandler)  # noqa S301
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        config = None
+    if isinstance(config, ParsedConfig):
+        logger.debug("Loaded validated config from {}", cache_file)
+        CONFIG_CACHE.put(key, config)
+        return config
+
+    config = ParsedConfig.from_file(filename, json_schema=json_schema)
+    CONFIG_CACHE.put(key, config)
+    try:
+        write_pickle_atomic(cache_file, config)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError) as exc:
+        logger.debug("Could not store config cache {}: {}", cache_file, exc)
+        return config
+    for old_file in os.listdir(cache_dir):
+        if old_file.startswith(f"{basename}.") and old_file.endswith(".pickle"):
+            if old_file != os.path.basename(cache_file):
+                with contextlib.suppress(OSError):
+                    os.remove(f"{cache_dir}/{old_file}")
+    return config
+
+
+def write_pickle_atomic(filename, data):
+    """Write pickled data to a file atomically.
+
+    Args:
+        filename (str): File name
+        data (any): Picklable data
+
+    """
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_filename = f"{filename}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_filename, mode="wb") as fhandler:
+            pickle.dump(data, fhandler, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+class LRUCache:
+    """Simple least recently used cache."""
+
+    def __init__(self, maxsize=32):
+        """Construct the cache.
+
+        Args:
+            maxsize (int, optional): Maximum number of entries. Defaults to 32.
+
+        """
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key):
+        """Get a cached value.
+
+        Args:
+            key (str): Key
+
+        Returns:
+            any: Cached value. None if not found.
+
+        """
+        try:
+            self.data.move_to_end(key)
+        except KeyError:
+            return None
+        return self.data[key]
+
+    def put(self, key, value):
+        """Store a value.
+
+        Args:
+            key (str): Key
+            value (any): Value
+
+        """
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        """Clear the cache."""
+        self.data.clear()
+
+
+def _config_section(config, key, default=None):
+    """Get a config value or a default if it does not exist."""
+    try:
+        value = config[key]
+    except KeyError:
+        return default
+    if hasattr(value, "dict"):
+        return value.dict()
+    return value
+
+
+def deode_namelist_sources(config):
+    """Get the namelist definition files read by the deode namelist generator.
+
+    Args:
+        config (deode.config_parser.ParsedConfig): Parsed config file contents.
+
+    Returns:
+        list: Namelist definition files. Empty if they can not be determined.
+
+    """
+    try:
+        from deode.toolbox import Platform
+
+        namelist_dir = Platform(config).get_system_value("namelists")
+    except Exception as exc:  # noqa: BLE001
+        logger.debug("Could not determine deode namelist directory: {}", exc)
+        return []
+    if namelist_dir is None:
+        return []
+    return sorted(glob.glob(f"{namelist_dir}/surfex_namelists*.yml"))
+
+
+def namelist_cache_key(program, config):
+    """Get the cache key for an assembled namelist.
+
+    The key depends on the program, the config sections used to assemble
+    the namelist and the signature of the namelist definition files. Values
+    set per job, like times, task arguments and the deode home, are not part
+    of the key, so that the key of a case and of its jobs are the same.
+
+    Args:
+        program (str): Program
+        config (deode.config_parser.ParsedConfig): Parsed config file contents.
+
+    Returns:
+        str: Cache key
+
+    """
+    deode = _config_section(config, f"{program}.deode", default=False)
+    data = {"program": program, "deode": deode, "version": __version__}
+    if deode:
+        general = dict(_config_section(config, "general", default={}))
+        general.pop("times", None)
+        general.pop("loglevel", None)
+        platform = dict(_config_section(config, "platform", default={}))
+        platform.pop("deode_home", None)
+        data.update(
+            {
+                "program_settings": _config_section(config, program),
+                "namelist_mods": _config_section(config, "namelist_mods"),
+                "general": general,
+                "domain": _config_section(config, "domain"),
+                "system": _config_section(config, "system"),
+                "platform": platform,
+                "sources": [
+                    file_signature(filename)
+                    for filename in deode_namelist_sources(config)
+                ],
+            }
+        )
+    else:
+        namelist_defs = _config_section(config, "system.namelist_defs")
+        assemble_file = _config_section(config, "system.assemble_file")
+        data.update(
+            {
+                "blocks": _config_section(config, f"{program}.blocks"),
+                "namelist_defs": file_signature(namelist_defs),
+                "assemble_file": file_signature(assemble_file),
+            }
+        )
+    return f"{program}_{fingerprint(data)}"
+
+
+class NamelistCache:
+    """Memoization of assembled namelist settings.
+
+    Settings are kept in an in-process LRU cache and optionally persisted as
+    json files in a cache directory.
+    """
+
+    def __init__(self, maxsize=32):
+        """Construct the namelist cache.
+
+        Args:
+            maxsize (int, optional): Size of the in-process cache. Defaults to 32.
+
+        """
+        self.memory = LRUCache(maxsize=maxsize)
+        self.bundles = {}
+
+    def get_bundle(self, filename):
+        """Get the namelists from a precompiled namelist bundle.
+
+        Args:
+            filename (str): Bundle file
+
+        Returns:
+            dict: Encoded namelist settings by cache key.
+
+        """
+        signature = file_signature(filename)
+        if signature is None:
+            return {}
+        bundle = self.bundles.get(filename)
+        if bundle is not None and bundle[0] == signature:
+            return bundle[1]
+        try:
+            with open(filename, mode="r", encoding="utf8") as fhandler:
+                data = json.load(fhandler)
+        except (OSError, ValueError) as exc:
+            logger.warning("Could not read namelist bundle {}: {}", filename, exc)
+            return {}
+        if data.get("version") != NAMELIST_BUNDLE_VERSION:
+            logger.warning(
+                "Namelist bundle {} has version {}, expected {}",
+                filename,
+                data.get("version"),
+                NAMELIST_BUNDLE_VERSION,
+            )
+            namelists = {}
+        else:
+            namelists = data.get("namelists", {})
+        self.bundles.update({filename: (signature, namelists)})
+        return namelists
+
+    @staticmethod
+    def encode(settings):
+        """Encode settings for persistent storage.
+
+        Args:
+            settings (dict): Namelist settings
+
+        Returns:
+            dict: Serializable settings
+
+        """
+        nml_type = "dict"
+        try:
+            import f90nml
+
+            if isinstance(settings, f90nml.Namelist):
+                nml_type = "f90nml"
+        except ImportError:
+            pass
+        return {"type": nml_type, "settings": json.loads(json.dumps(settings))}
+
+    @staticmethod
+    def decode(data):
+        """Decode persistently stored settings.
+
+        Args:
+            data (dict): Stored settings
+
+        Returns:
+            dict: Namelist settings
+
+        """
+        settings = data["settings"]
+        if data["type"] == "f90nml":
+            import f90nml
+
+            settings = f90nml.Namelist(settings)
+        return settings
+
+    def get(self, key, cache_dir=None, bundle=None):
+        """Get cached settings.
+
+        Args:
+            key (str): Cache key
+            cache_dir (str, optional): Persistent cache directory. Defaults to None.
+            bundle (str, optional): Precompiled namelist bundle. Defaults to None.
+
+        Returns:
+            dict: A copy of the settings. None if not found.
+
+        """
+        settings = self.memory.get(key)
+        if settings is None and bundle is not None:
+            data = self.get_bundle(bundle).get(key)
+            if data is not None:
+                settings = self.decode(data)
+                logger.debug("Loaded namelist settings {} from bundle {}", key, bundle)
+                self.memory.put(key, settings)
+        if settings is None and cache_dir is not None:
+            filename = f"{cache_dir}/{key}.json"
+            try:
+                with open(filename, mode="r", encoding="utf8") as fhandler:
+                    settings = self.decode(json.load(fhandler))
+                logger.debug("Loaded namelist settings from {}", filename)
+            except (OSError, ValueError, KeyError):
+                settings = None
+            if settings is not None:
+                self.memory.put(key, settings)
+        if settings is None:
+            return None
+        return copy.deepcopy(settings)
+
+    def put(self, key, settings, cache_dir=None):
+        """Store settings.
+
+        Args:
+            key (str): Cache key
+            settings (dict): Namelist settings
+            cache_dir (str, optional): Persistent cache directory. Defaults to None.
+
+        """
+        self.memory.put(key, copy.deepcopy(settings))
+        if cache_dir is not None:
+            filename = f"{cache_dir}/{key}.json"
+            try:
+                write_json_atomic(filename, self.encode(settings))
+            except (OSError, TypeError, ValueError) as exc:
+                logger.warning("Could not store namelist cache {}: {}", filename, exc)
+
+    def clear(self):
+        """Clear the in-process cache."""
+        self.memory.clear()
+        self.bundles.clear()
+
+
+def write_namelist_bundle(filename, namelists):
+    """Write a precompiled namelist bundle.
+
+    Args:
+        filename (str): Bundle file
+        namelists (dict): Namelist settings by cache key
+
+    """
+    data = {
+        "version": NAMELIST_BUNDLE_VERSION,
+        "surfexp_version": __version__,
+        "namelists": {
+            key: NamelistCache.encode(settings) for key, settings in namelists.items()
+        },
+    }
+    write_json_atomic(filename, data)
+
+
+NAMELIST_CACHE = NamelistCache()
+CONFIG_CACHE = LRUCache(maxsize=4)
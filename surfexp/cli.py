@@ -6,9 +6,13 @@ import sys
 
 import deode
 from deode.__main__ import main
+from deode.config_parser import ConfigParserDefaults, ParsedConfig
+from deode.derived_variables import set_times
 from deode.logs import logger
 
 import surfexp
+from surfexp.experiment import create_namelist_bundle
+from surfexp.sizing import SuiteSizing, log_sizing_report
 
 
 def pysfxexp(argv=None):
@@ -77,6 +81,22 @@ def pysfxexp(argv=None):
         default=False,
         required=False,
     )
+    parser.add_argument(
+        "--no-namelist-bundle",
+        dest="namelist_bundle",
+        action="store_false",
+        help="Do not create a precompiled namelist bundle",
+        default=True,
+        required=False,
+    )
+    parser.add_argument(
+        "--sizing-report",
+        dest="sizing_report",
+        action="store_true",
+        help="Report the size of the suite before starting it",
+        default=False,
+        required=False,
+    )
     parser.add_argument(
         "args", help="Optional extra input configuration files", nargs="*"
     )
@@ -90,6 +110,8 @@ def pysfxexp(argv=None):
     start_suite = args.start_suite
     continue_mode = args.continue_mode
     troika_command = args.troika_command
+    namelist_bundle = args.namelist_bundle
+    sizing_report = args.sizing_report
     args = args.args
 
     deode_path = deode.__path__[0]
@@ -124,6 +146,11 @@ def pysfxexp(argv=None):
         if continue_mode:
             fhandler.write("[suite_control]\n")
             fhandler.write(" do_prep = false\n")
+        if namelist_bundle:
+            namelist_bundle = f"{os.path.splitext(os.path.abspath(output))[0]}"
+            namelist_bundle = f"{namelist_bundle}.namelists.json"
+            fhandler.write("[namelist_cache]\n")
+            fhandler.write(f'  bundle = "{namelist_bundle}"\n')
 
     argv += args
     argv.append(tmp_mods_output)
@@ -141,6 +168,23 @@ def pysfxexp(argv=None):
     if os.path.exists(tmp_mods_output):
         os.remove(tmp_mods_output)
 
+    if namelist_bundle:
+        try:
+            config = ParsedConfig.from_file(
+                output, json_schema=ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA
+            )
+            config = config.copy(update=set_times(config))
+            create_namelist_bundle(config, namelist_bundle)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Could not create namelist bundle: {}", exc)
+
+    if sizing_report:
+        config = ParsedConfig.from_file(
+            output, json_schema=ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA
+        )
+        config = config.copy(update=set_times(config))
+        log_sizing_report(SuiteSizing(config).report())
+
     if start_suite:
         argv = ["start", "suite", "--config-file", output]
         cmd = " ".join(argv)
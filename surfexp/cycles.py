@@ -0,0 +1,186 @@
+"""Cycle calendar for suite generation."""
+from datetime import timezone
+
+import numpy as np
+from deode.datetime_utils import get_decade
+
+
+def to_datetime64(dtime):
+    """Convert a datetime to a timezone naive UTC numpy datetime64.
+
+    Args:
+        dtime (datetime): Datetime
+
+    Returns:
+        np.datetime64: Datetime in seconds
+
+    """
+    if dtime.tzinfo is not None:
+        dtime = dtime.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(dtime, "s")
+
+
+def to_timedelta64(delta):
+    """Convert a timedelta to a numpy timedelta64.
+
+    Args:
+        delta (timedelta): Time delta
+
+    Returns:
+        np.timedelta64: Time delta in seconds
+
+    """
+    return np.timedelta64(int(delta.total_seconds()), "s")
+
+
+def format_indices(times):
+    """Format times as cycle indices (YYYYMMDDHHMM).
+
+    Args:
+        times (np.ndarray): datetime64 array
+
+    Returns:
+        np.ndarray: Cycle indices
+
+    """
+    if times.size == 0:
+        return np.array([], dtype="U12")
+    iso = np.datetime_as_string(times, unit="m")
+    for char in ("-", "T", ":"):
+        iso = np.char.replace(iso, char, "")
+    return iso
+
+
+class CycleCalendar:
+    """All cycles of an experiment computed in bulk.
+
+    Cycle indices, family names and trigger times are computed as numpy
+    datetime64 arrays instead of one cycle at a time.
+    """
+
+    def __init__(self, basetime, starttime, endtime, cycle_length, input_cycles_ahead=3):
+        """Construct the calendar.
+
+        Args:
+            basetime (datetime): First cycle to include
+            starttime (datetime): Start of the experiment
+            endtime (datetime): Last possible cycle
+            cycle_length (timedelta): Cycle length
+            input_cycles_ahead (int, optional): Number of cycles the input is
+                                                prepared ahead. Defaults to 3.
+
+        """
+        step = to_timedelta64(cycle_length)
+        if step <= np.timedelta64(0, "s"):
+            raise ValueError(f"Cycle length must be positive: {cycle_length}")
+        start = to_datetime64(basetime)
+        end = to_datetime64(endtime)
+        self.starttime = to_datetime64(starttime)
+        if start > end:
+            self.times = np.array([], dtype="datetime64[s]")
+        else:
+            ncycles = int((end - start) // step) + 1
+            self.times = start + step * np.arange(ncycles)
+
+        self.indices = format_indices(self.times)
+        # YYYYMMDD is the leading part of the index
+        self.days = self.indices.astype("U8")
+        minutes = (self.times - self.times.astype("datetime64[D]")).astype(
+            "timedelta64[m]"
+        ).astype(int)
+        self.hhmm = np.char.mod("%04d", minutes // 60 * 100 + minutes % 60)
+        self.basetimes = np.char.add(np.datetime_as_string(self.times, unit="s"), "Z")
+
+        time_fam_start = self.times - step * input_cycles_ahead
+        self.time_trigger_valid = time_fam_start >= self.starttime
+        self.time_trigger_indices = format_indices(time_fam_start)
+        prediction_time = np.maximum(self.times - step, self.starttime)
+        self.prediction_trigger_indices = format_indices(prediction_time)
+
+    def __len__(self):
+        """Number of cycles."""
+        return len(self.times)
+
+    def cycles(self):
+        """Cycles by cycle index.
+
+        Returns:
+            dict: day, time, basetime and validtime of each cycle
+
+        """
+        return {
+            c_index: {"day": day, "time": ctime, "validtime": btime, "basetime": btime}
+            for c_index, day, ctime, btime in zip(
+                self.indices.tolist(),
+                self.days.tolist(),
+                self.hhmm.tolist(),
+                self.basetimes.tolist(),
+            )
+        }
+
+    def time_trigger_times(self):
+        """Index of the cycle triggering the input of each cycle.
+
+        Returns:
+            dict: Trigger cycle index by cycle index. None if before the start.
+
+        """
+        return {
+            c_index: trigger if valid else None
+            for c_index, trigger, valid in zip(
+                self.indices.tolist(),
+                self.time_trigger_indices.tolist(),
+                self.time_trigger_valid.tolist(),
+            )
+        }
+
+    def prediction_trigger_times(self):
+        """Index of the cycle triggering the prediction of each cycle.
+
+        Returns:
+            dict: Trigger cycle index by cycle index.
+
+        """
+        return dict(
+            zip(self.indices.tolist(), self.prediction_trigger_indices.tolist())
+        )
+
+    def decades(self):
+        """Decade of each cycle.
+
+        The decade is computed once per ten-day period of a month.
+
+        Returns:
+            np.ndarray: Decades
+
+        """
+        months = self.times.astype("datetime64[M]")
+        day_of_month = (self.times.astype("datetime64[D]") - months).astype(int)
+        period_start = months.astype("datetime64[D]") + np.minimum(
+            day_of_month // 10, 2
+        ) * np.timedelta64(10, "D")
+        periods, inverse = np.unique(period_start, return_inverse=True)
+        decades = [
+            get_decade(
+                period.astype("datetime64[s]").astype(object).replace(tzinfo=timezone.utc)
+            )
+            for period in periods
+        ]
+        decades = np.array(decades, dtype=str)
+        return decades[inverse]
+
+    def decade_starts(self):
+        """First cycle of each decade.
+
+        Returns:
+            dict: Basetime of the first cycle by decade in time order
+
+        """
+        decades = self.decades()
+        __, first = np.unique(decades, return_index=True)
+        return {
+            str(decades[index]): self.times[index]
+            .astype(object)
+            .replace(tzinfo=timezone.utc)
+            for index in sorted(first.tolist())
+        }
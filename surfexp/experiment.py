@@ -1,9 +1,25 @@
 """Experiment tools."""
+import os
+from functools import cached_property
+
 import yaml
 from deode.datetime_utils import as_datetime, as_timedelta
+from deode.derived_variables import derived_variables
 from deode.logs import logger
 from deode.namelist import NamelistGenerator as DeodeNamelistGenerator
-from pysurfex.namelist import NamelistGenerator, NamelistGeneratorAssemble
+
+from surfexp.cache import (
+    NAMELIST_CACHE,
+    fingerprint,
+    get_cache_dir,
+    namelist_cache_key,
+    write_json_atomic,
+    write_namelist_bundle,
+)
+from surfexp.lazy import LazyObject
+
+NamelistGenerator = LazyObject("pysurfex.namelist", "NamelistGenerator")
+NamelistGeneratorAssemble = LazyObject("pysurfex.namelist", "NamelistGeneratorAssemble")
 
 
 class SettingsFromNamelist:
@@ -112,6 +128,107 @@ class SettingsFromNamelist:
         return nnco
 
 
+def assemble_settings(program, config):
+    """Assemble namelist settings from namelist definitions and config.
+
+    Args:
+        program (str): Calling program
+        config (deode.config_parser.ParsedConfig): Parsed config file contents.
+
+    Returns:
+        dict: Namelist settings
+
+    """
+    try:
+        deode = config[f"{program}.deode"]
+    except KeyError:
+        deode = False
+    if deode:
+        # SURFEX: Namelists and input data
+        if program == "offline":
+            program = "forecast"
+        nlgen_surfex = DeodeNamelistGenerator(config, "surfex")
+        nlgen_surfex.load(program)
+        settings = nlgen_surfex.assemble_namelist(program)
+        try:
+            namelist_mods = config["namelist_mods"].dict()
+        except KeyError:
+            namelist_mods = None
+        if namelist_mods is not None:
+            for block, mods in namelist_mods.items():
+                try:
+                    changes = settings[block]
+                except KeyError:
+                    changes = {}
+                for key, value in mods.items():
+                    if key in block:
+                        origval = block[key]
+                        if value != origval:
+                            logger.warning(
+                                "Override key={} setting={} with new setting={}",
+                                key,
+                                origval,
+                                value,
+                            )
+                    changes.update({key: value})
+                settings.update({block: changes})
+    else:
+        try:
+            blocks = config[f"{program}.blocks"]
+        except KeyError:
+            blocks = None
+        # SURFEX: Namelists and input data
+        namelist_defs = config["system.namelist_defs"]
+        with open(namelist_defs, mode="r", encoding="utf8") as fhandler:
+            namelist_defs = yaml.safe_load(fhandler)
+        if blocks is None:
+            assemble_file = config["system.assemble_file"]
+            logger.info("assemble_file={}", assemble_file)
+            with open(assemble_file, mode="r", encoding="utf8") as fhandler:
+                blocks = yaml.safe_load(fhandler)
+                blocks = list(blocks[program])
+        else:
+            blocks = list(blocks)
+
+        blocks = {program: blocks}
+        nlgen_surfex = NamelistGeneratorAssemble(program, namelist_defs, blocks)
+        settings = nlgen_surfex.get_namelist()
+    return settings
+
+
+def get_cached_settings(program, config):
+    """Get namelist settings using the namelist cache.
+
+    Settings are looked up in the in-process cache, in the precompiled namelist
+    bundle and in the persistent cache in the case directory before they are
+    assembled.
+
+    Args:
+        program (str): Calling program
+        config (deode.config_parser.ParsedConfig): Parsed config file contents.
+
+    Returns:
+        dict: Namelist settings
+
+    """
+    if not config.get("namelist_cache.enabled", True):
+        return assemble_settings(program, config)
+
+    cache_dir = None
+    if config.get("namelist_cache.persistent", True):
+        cache_dir = get_cache_dir(config, "namelists")
+    bundle = config.get("namelist_cache.bundle")
+    if bundle == "":
+        bundle = None
+    key = namelist_cache_key(program, config)
+    settings = NAMELIST_CACHE.get(key, cache_dir=cache_dir, bundle=bundle)
+    if settings is None:
+        logger.debug("Assemble namelist settings for {} key={}", program, key)
+        settings = assemble_settings(program, config)
+        NAMELIST_CACHE.put(key, settings, cache_dir=cache_dir)
+    return settings
+
+
 class SettingsFromNamelistAndConfig(SettingsFromNamelist):
     """Setttings from namelist and config."""
 
@@ -123,63 +240,135 @@ class SettingsFromNamelistAndConfig(SettingsFromNamelist):
             config (deode.config_parser.ParsedConfig): Parsed config file contents.
 
         """
+        settings = get_cached_settings(program, config)
         try:
             deode = config[f"{program}.deode"]
         except KeyError:
             deode = False
-        if deode:
-            # SURFEX: Namelists and input data
-            if program == "offline":
-                program = "forecast"
-            nlgen_surfex = DeodeNamelistGenerator(config, "surfex")
-            nlgen_surfex.load(program)
-            settings = nlgen_surfex.assemble_namelist(program)
-            try:
-                namelist_mods = config["namelist_mods"].dict()
-            except KeyError:
-                namelist_mods = None
-            if namelist_mods is not None:
-                for block, mods in namelist_mods.items():
-                    try:
-                        changes = settings[block]
-                    except KeyError:
-                        changes = {}
-                    for key, value in mods.items():
-                        if key in block:
-                            origval = block[key]
-                            if value != origval:
-                                logger.warning(
-                                    "Override key={} setting={} with new setting={}",
-                                    key,
-                                    origval,
-                                    value,
-                                )
-                        changes.update({key: value})
-                    settings.update({block: changes})
-        else:
-            try:
-                blocks = config[f"{program}.blocks"]
-            except KeyError:
-                blocks = None
-            # SURFEX: Namelists and input data
-            namelist_defs = config["system.namelist_defs"]
-            with open(namelist_defs, mode="r", encoding="utf8") as fhandler:
-                namelist_defs = yaml.safe_load(fhandler)
-            if blocks is None:
-                assemble_file = config["system.assemble_file"]
-                logger.info("assemble_file={}", assemble_file)
-                with open(assemble_file, mode="r", encoding="utf8") as fhandler:
-                    blocks = yaml.safe_load(fhandler)
-                    blocks = list(blocks[program])
-            else:
-                blocks = list(blocks)
-
-            blocks = {program: blocks}
-            nlgen_surfex = NamelistGeneratorAssemble(program, namelist_defs, blocks)
-            settings = nlgen_surfex.get_namelist()
+        if deode and program == "offline":
+            program = "forecast"
         SettingsFromNamelist.__init__(self, program, settings, assemble=None)
 
 
+class SuiteNamelistSettings:
+    """Namelist settings used when building a suite.
+
+    The settings are evaluated once per suite. Only NNCO depends on the cycle,
+    through the hour of day, and is memoized per hour.
+    """
+
+    def __init__(self, config):
+        """Construct the suite namelist settings.
+
+        Args:
+            config (deode.config_parser.ParsedConfig): Parsed config file contents.
+
+        """
+        self.config = config
+        self.nnco_by_hour = {}
+
+    @cached_property
+    def prep(self):
+        """Namelist settings for prep."""
+        return SettingsFromNamelistAndConfig("prep", self.config)
+
+    @cached_property
+    def soda(self):
+        """Namelist settings for soda."""
+        return SettingsFromNamelistAndConfig("soda", self.config)
+
+    @cached_property
+    def offline(self):
+        """Namelist settings for offline."""
+        return SettingsFromNamelistAndConfig("offline", self.config)
+
+    @cached_property
+    def prep_input(self):
+        """File name and file type of the prep input."""
+        cfile = self.prep.get_setting("NAM_PREP_SURF_ATM#CFILE")
+        cfiletype = self.prep.get_setting("NAM_PREP_SURF_ATM#CFILETYPE")
+        return cfile, cfiletype
+
+    @cached_property
+    def schemes(self):
+        """Assimilation schemes."""
+        return {
+            scheme: self.soda.get_setting(f"NAM_ASSIM#{scheme}")
+            for scheme in ["CASSIM_ISBA", "CASSIM_SEA", "CASSIM_TEB", "CASSIM_WATER"]
+        }
+
+    @cached_property
+    def obs_types(self):
+        """Observation types."""
+        return self.soda.get_setting("NAM_OBS#COBS_M", default=[])
+
+    @cached_property
+    def nncv(self):
+        """Control variables to perturb."""
+        return self.soda.get_setting("NAM_VAR#NNCV")
+
+    @cached_property
+    def cvar_m(self):
+        """Names of the control variables."""
+        return self.soda.get_setting("NAM_VAR#CVAR_M")
+
+    @cached_property
+    def llincheck(self):
+        """Check linearity with positive and negative perturbations."""
+        return self.soda.get_setting("NAM_ASSIM#LLINCHECK")
+
+    @cached_property
+    def sst_ascii(self):
+        """SST input is ascii."""
+        return self.soda.setting_is("NAM_ASSIM#CFILE_FORMAT_SST", "ASCII")
+
+    @cached_property
+    def lextrap_water(self):
+        """Extrapolate water."""
+        return self.soda.setting_is("NAM_ASSIM#LEXTRAP_WATER", True)
+
+    def nnco(self, basetime):
+        """Get the active observations for a cycle.
+
+        Args:
+            basetime (datetime): Basetime of the cycle
+
+        Returns:
+            list: List with either 0 or 1
+
+        """
+        hour = basetime.hour
+        nnco = self.nnco_by_hour.get(hour)
+        if nnco is None:
+            nnco = self.soda.get_nnco(self.config, basetime=basetime)
+            self.nnco_by_hour.update({hour: nnco})
+        return list(nnco)
+
+
+def create_namelist_bundle(config, filename, programs=None):
+    """Assemble namelists once and write them to a namelist bundle.
+
+    The derived variables are added to the config like in the jobs, so that
+    the cache keys in the bundle match the keys computed by the jobs.
+
+    Args:
+        config (deode.config_parser.ParsedConfig): Parsed config file contents.
+        filename (str): Bundle file
+        programs (list, optional): Programs. Defaults to pgd, prep, offline and soda.
+
+    """
+    if programs is None:
+        programs = ["pgd", "prep", "offline", "soda"]
+    config = config.copy(update=derived_variables(config))
+    namelists = {}
+    for program in programs:
+        logger.info("Assemble namelist for {} to bundle", program)
+        key = namelist_cache_key(program, config)
+        namelists.update({key: assemble_settings(program, config)})
+    write_namelist_bundle(filename, namelists)
+    logger.info("Wrote namelist bundle {}", filename)
+
+
 class SettingsFromNamelistAndConfigDeode(SettingsFromNamelist):
     """Set namelist and config from Deode configuration."""
 
@@ -235,6 +424,48 @@ def check_consistency(config):
         raise RuntimeError
 
 
+def consistency_fingerprint(config, modes=None):
+    """Get a fingerprint of the inputs checked by check_consistency.
+
+    Args:
+        config (deode.config_parser.ParsedConfig): Parsed config file contents.
+        modes (list, optional): Programs to check. Defaults to None.
+
+    Returns:
+        str: Fingerprint
+
+    """
+    if modes is None:
+        modes = ["pgd", "prep", "offline", "soda"]
+    return fingerprint([namelist_cache_key(mode, config) for mode in modes])
+
+
+def ensure_consistency(config):
+    """Check consistency once for a given set of inputs.
+
+    The fingerprint of the checked inputs is recorded in the case directory.
+    The full check is only done if the config or namelist files have changed.
+
+    Args:
+        config (deode.config_parser.ParsedConfig): Parsed config file contents.
+
+    """
+    cache_dir = get_cache_dir(config, "consistency")
+    if cache_dir is None:
+        check_consistency(config)
+        return
+
+    consistency_file = f"{cache_dir}/{consistency_fingerprint(config)}.json"
+    if os.path.exists(consistency_file):
+        logger.debug("Consistency already checked: {}", consistency_file)
+        return
+    check_consistency(config)
+    try:
+        write_json_atomic(consistency_file, {"consistent": True})
+    except OSError as exc:
+        logger.warning("Could not record consistency check: {}", exc)
+
+
 def get_total_unique_cycle_list(config):
     """Get a list of unique start times for the forecasts.
 
@@ -250,18 +481,9 @@ def get_total_unique_cycle_list(config):
     if realizations is None or len(realizations) == 0:
         return get_cycle_list(config)
 
-    cycle_list_all = []
-    for realization in realizations:
-        cycle_list_all += get_cycle_list(config, realization=realization)
-
-    cycle_list = []
-    cycle_list_str = []
-    for cycle in cycle_list_all:
-        cycle_str = str(cycle)
-        if cycle_str not in cycle_list_str:
-            cycle_list.append(cycle)
-            cycle_list_str.append(str(cycle))
-    return cycle_list
+    # The cycle list does not depend on the realization. Remove duplicates but
+    # keep the order
+    return list(dict.fromkeys(get_cycle_list(config)))
 
 
 def get_cycle_list(config):
@@ -296,3 +518,72 @@ def get_fgint(config):
 
     """
     return as_timedelta(config["general.times.cycle_length"])
+
+
+def get_verification_leadtimes(config, mode, offline_nml=None):
+    """Get the verified lead times of a mode.
+
+    Args:
+        config (.config_parser.ParsedConfig): Parsed config file contents.
+        mode (str): Verification mode (cycle or forecast)
+        offline_nml (dict, optional): Offline namelist used if no output
+                                      frequency is configured. Defaults to None.
+
+    Raises:
+        RuntimeError: No output frequency found
+
+    Returns:
+        list: Lead times in seconds
+
+    """
+    if mode == "cycle":
+        forecast_range = as_timedelta(config["general.times.cycle_length"])
+        extra = ""
+    else:
+        forecast_range = as_timedelta(config["general.times.forecast_range"])
+        extra = ".forecast"
+    output_frequency = config.get(f"offline{extra}.args.output-frequency")
+    if output_frequency is None:
+        if offline_nml is None:
+            offline_nml = SettingsFromNamelistAndConfig("offline", config).nml
+        try:
+            output_frequency = offline_nml["nam_io_offline"]["xtstep_output"]
+        except KeyError:
+            raise RuntimeError(
+                "No value for output-frequency or xtstep_output found"
+            ) from KeyError
+    step = int(output_frequency)
+    return list(range(step, int(forecast_range.total_seconds()) + 1, step))
+
+
+def get_perturbations(nncv, cvar_m, llincheck):
+    """Get the perturbed runs of the EKF.
+
+    Args:
+        nncv (list): Active control variables
+        cvar_m (list): Names of the control variables
+        llincheck (bool): Positive and negative perturbations
+
+    Returns:
+        list: Perturbations as dicts with pert, name, ivar and pert_sign. The
+              first is the unperturbed reference run.
+
+    """
+    perturbations = [{"pert": 0, "name": "REF", "ivar": 0, "pert_sign": None}]
+    if nncv is None:
+        return perturbations
+    pert_signs = ["pos", "neg"] if llincheck else ["none"]
+    for nfam, pert_sign in enumerate(pert_signs):
+        nivar = 1
+        for ivar, val in enumerate(nncv):
+            if val == 1:
+                perturbations.append(
+                    {
+                        "pert": nfam * len(nncv) + ivar + 1,
+                        "name": cvar_m[ivar],
+                        "ivar": nivar,
+                        "pert_sign": pert_sign,
+                    }
+                )
+                nivar += 1
+    return perturbations
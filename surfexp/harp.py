@@ -0,0 +1,59 @@
+"""HARP SQLite helpers."""
+import contextlib
+import os
+import sqlite3
+
+from deode.logs import logger
+
+
+def merge_sqlite(source, target, timeout=60.0):
+    """Merge all tables of a SQLite file into another in one transaction.
+
+    Missing tables and indices are created in the target. Rows with the same
+    key are replaced.
+
+    Args:
+        source (str): SQLite file to merge
+        target (str): SQLite file to merge into
+        timeout (float, optional): Seconds to wait for a lock. Defaults to 60.
+
+    Returns:
+        int: Number of merged rows
+
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    connection = sqlite3.connect(target, timeout=timeout, isolation_level=None)
+    nrows = 0
+    try:
+        connection.execute("ATTACH DATABASE ? AS batch", (source,))
+        schema = connection.execute(
+            "SELECT type, name, sql FROM batch.sqlite_master WHERE sql IS NOT NULL "
+            "AND type IN ('table', 'index') AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY type DESC"
+        ).fetchall()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            existing = {
+                row[0]
+                for row in connection.execute("SELECT name FROM main.sqlite_master")
+            }
+            for __, name, sql in schema:
+                if name not in existing:
+                    connection.execute(sql)
+            for obj_type, name, __ in schema:
+                if obj_type != "table":
+                    continue
+                cursor = connection.execute(
+                    f'INSERT OR REPLACE INTO main."{name}" SELECT * FROM batch."{name}"'
+                )
+                nrows += max(cursor.rowcount, 0)
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            with contextlib.suppress(sqlite3.Error):
+                connection.execute("ROLLBACK")
+            raise
+        connection.execute("DETACH DATABASE batch")
+    finally:
+        connection.close()
+    logger.info("Merged {} rows from {} into {}", nrows, source, target)
+    return nrows
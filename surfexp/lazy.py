@@ -0,0 +1,103 @@
+"""Lazy imports of heavy dependencies."""
+import importlib
+
+
+class LazyModule:
+    """Module imported on first attribute access."""
+
+    def __init__(self, name, error_message=None):
+        """Construct the lazy module.
+
+        Args:
+            name (str): Module name
+            error_message (str, optional): Message of the ImportError raised if
+                                           the module can not be imported.
+                                           Defaults to None.
+
+        """
+        self.__dict__["_name"] = name
+        self.__dict__["_error_message"] = error_message
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        """Import the module.
+
+        Returns:
+            module: The imported module
+
+        Raises:
+            ImportError: If the module can not be imported
+
+        """
+        module = self.__dict__["_module"]
+        if module is None:
+            try:
+                module = importlib.import_module(self.__dict__["_name"])
+            except ImportError as error:
+                if self.__dict__["_error_message"] is None:
+                    raise
+                raise ImportError(self.__dict__["_error_message"]) from error
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        """Get an attribute of the imported module."""
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        """Set an attribute of the imported module."""
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        """Representation of the lazy module."""
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+
+class LazyObject:
+    """Module attribute, typically a function or a class, imported on first use.
+
+    The proxy is assigned to a module level name so that the name can still be
+    patched in tests.
+    """
+
+    def __init__(self, module, name):
+        """Construct the lazy object.
+
+        Args:
+            module (str): Module name
+            name (str): Attribute name in the module
+
+        """
+        self.__dict__["_module"] = module
+        self.__dict__["_name"] = name
+        self.__dict__["_object"] = None
+
+    def _load(self):
+        """Import the object.
+
+        Returns:
+            any: The imported object
+
+        """
+        obj = self.__dict__["_object"]
+        if obj is None:
+            module = importlib.import_module(self.__dict__["_module"])
+            obj = getattr(module, self.__dict__["_name"])
+            self.__dict__["_object"] = obj
+        return obj
+
+    def __call__(self, *args, **kwargs):
+        """Call the imported object."""
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        """Get an attribute of the imported object."""
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        """Representation of the lazy object."""
+        state = "loaded" if self.__dict__["_object"] is not None else "not loaded"
+        name = f"{self.__dict__['_module']}.{self.__dict__['_name']}"
+        return f"<LazyObject {name} ({state})>"
+
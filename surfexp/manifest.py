@@ -0,0 +1,114 @@
+"""Per-cycle manifest of resolved paths."""
+import json
+
+from deode.logs import logger
+
+from surfexp.cache import write_json_atomic
+
+
+class CycleManifest:
+    """Resolved paths for a cycle.
+
+    Paths are stored by kind and basetime. The manifest is written once per
+    cycle and read by all tasks of the cycle.
+    """
+
+    def __init__(self, fingerprint=None, paths=None):
+        """Construct the manifest.
+
+        Args:
+            fingerprint (str, optional): Fingerprint of the inputs. Defaults to None.
+            paths (dict, optional): Paths by kind and time key. Defaults to None.
+
+        """
+        self.fingerprint = fingerprint
+        if paths is None:
+            paths = {}
+        self.paths = paths
+
+    @staticmethod
+    def time_key(basetime):
+        """Get the key for a basetime.
+
+        Args:
+            basetime (datetime): Basetime. None for time independent paths.
+
+        Returns:
+            str: Key
+
+        """
+        if basetime is None:
+            return ""
+        return basetime.strftime("%Y%m%d%H%M")
+
+    @staticmethod
+    def get_filename(manifest_dir, basetime):
+        """Get the manifest file name for a cycle.
+
+        Args:
+            manifest_dir (str): Manifest directory
+            basetime (datetime): Basetime of the cycle
+
+        Returns:
+            str: File name
+
+        """
+        return f"{manifest_dir}/{CycleManifest.time_key(basetime)}.json"
+
+    def add(self, kind, basetime, path):
+        """Add a resolved path.
+
+        Args:
+            kind (str): Kind of path
+            basetime (datetime): Basetime the path was resolved for
+            path (str): Resolved path
+
+        """
+        self.paths.setdefault(kind, {}).update({self.time_key(basetime): path})
+
+    def get(self, kind, basetime=None):
+        """Get a resolved path.
+
+        Args:
+            kind (str): Kind of path
+            basetime (datetime, optional): Basetime. Defaults to None.
+
+        Returns:
+            str: Resolved path. None if not in the manifest.
+
+        """
+        return self.paths.get(kind, {}).get(self.time_key(basetime))
+
+    def save(self, filename):
+        """Save the manifest.
+
+        Args:
+            filename (str): File name
+
+        """
+        data = {"fingerprint": self.fingerprint, "paths": self.paths}
+        write_json_atomic(filename, data)
+        logger.info("Wrote cycle manifest {}", filename)
+
+    @classmethod
+    def load(cls, filename, fingerprint=None):
+        """Load a manifest.
+
+        Args:
+            filename (str): File name
+            fingerprint (str, optional): Expected fingerprint. Defaults to None.
+
+        Returns:
+            CycleManifest: The manifest. Empty if missing or outdated.
+
+        """
+        try:
+            with open(filename, mode="r", encoding="utf8") as fhandler:
+                data = json.load(fhandler)
+        except (OSError, ValueError):
+            logger.debug("No cycle manifest found in {}", filename)
+            return cls(fingerprint=fingerprint)
+        if fingerprint is not None and data.get("fingerprint") != fingerprint:
+            logger.warning("Cycle manifest {} is outdated. Ignore it", filename)
+            return cls(fingerprint=fingerprint)
+        return cls(fingerprint=data.get("fingerprint"), paths=data.get("paths", {}))
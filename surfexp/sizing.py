@@ -0,0 +1,346 @@
+"""Sizing of a suite from a dry run build of its definition."""
+import re
+from collections import Counter
+
+from deode.datetime_utils import as_datetime, as_timedelta
+from deode.logs import logger
+
+from surfexp.experiment import SuiteNamelistSettings, get_verification_leadtimes
+from surfexp.lazy import LazyObject
+
+SurfexSuiteDefinition = LazyObject("surfexp.suites.offline", "SurfexSuiteDefinition")
+SurfexCompactSuiteDefinition = LazyObject(
+    "surfexp.suites.compact", "SurfexCompactSuiteDefinition"
+)
+node_variables = LazyObject("surfexp.templates.local", "node_variables")
+
+SUITE_DEFINITIONS = {
+    "SurfexSuiteDefinition": SurfexSuiteDefinition,
+    "SurfexCompactSuiteDefinition": SurfexCompactSuiteDefinition,
+}
+INPUT_CYCLES_AHEAD = 3
+INTERPOLATE2GRID_FILES_PER_STEP = 11
+STAGES = {
+    "CycleInput": "input",
+    "Initialization": "initialization",
+    "Prediction": "prediction",
+    "PostProcessing": "postprocessing",
+}
+OUTPUTS = {
+    "OfflinePgd": "pgd",
+    "OfflinePrep": "prep",
+    "Forcing": "forcing",
+    "Soda": "analysis",
+    "CollectLogs": "logs",
+}
+
+
+def family_kind(name, in_suite):
+    """Get the kind of a family from its name.
+
+    Numbered families like offset3 or decade_20250101 are of the same kind.
+
+    Args:
+        name (str): Family name
+        in_suite (bool): The family is a child of the suite
+
+    Returns:
+        str: Kind
+
+    """
+    kind = re.sub(r"[_\d]+$", "", name)
+    if kind == "":
+        kind = "day" if in_suite else "time"
+    return kind
+
+
+def task_args(variables):
+    """Get the task arguments from the ARGS variable.
+
+    Args:
+        variables (dict): Ecflow variables of the task
+
+    Returns:
+        dict: Arguments
+
+    """
+    args = {}
+    for arg in variables.get("ARGS", "").split(";"):
+        parts = arg.split("=")
+        if len(parts) == 2:
+            args.update({parts[0]: parts[1]})
+    return args
+
+
+class CycleSize:
+    """Families, tasks and output files of a cycle family or the static part."""
+
+    def __init__(self, basetimes=None):
+        """Construct an empty size.
+
+        Args:
+            basetimes (list, optional): Basetimes of the cycles run by the family.
+                                        Defaults to None for the static part.
+
+        """
+        self.basetimes = basetimes
+        self.families = Counter()
+        self.tasks = Counter()
+        self.outputs = Counter()
+        self.stages = Counter()
+
+    @property
+    def runs(self):
+        """Number of times the tasks run."""
+        return 1 if self.basetimes is None else len(self.basetimes)
+
+    def add_task(self, name, stage, outputs):
+        """Add a task.
+
+        Args:
+            name (str): Task class name
+            stage (str): Stage of the cycle running the task in parallel
+            outputs (Counter): Output files of one run of the task
+
+        """
+        self.tasks[name] += 1
+        self.stages[stage] += 1
+        self.outputs.update(outputs)
+
+
+class SuiteSizing:
+    """Size of a suite, counted on a dry run build of its definition.
+
+    The suite definition given by suite_control.suite_definition is built in
+    memory, so the counts follow its layout and the generated window exactly.
+    """
+
+    def __init__(self, config):
+        """Construct the sizing.
+
+        Args:
+            config (ParsedConfig): Parsed configuration
+
+        Raises:
+            NotImplementedError: If the suite definition is not supported
+
+        """
+        self.config = config
+        self.suite_definition = config.get(
+            "suite_control.suite_definition", "SurfexSuiteDefinition"
+        )
+        if self.suite_definition not in SUITE_DEFINITIONS:
+            raise NotImplementedError(f"Can not size {self.suite_definition}")
+        self.nml_settings = SuiteNamelistSettings(config)
+        cycle_length = as_timedelta(config["general.times.cycle_length"])
+        self.steps = int(cycle_length.total_seconds()) // 3600
+        max_tasks = config.get("general.max_tasks")
+        self.max_tasks = 20 if max_tasks is None else max_tasks
+
+    def build(self):
+        """Build the suite definition without writing files.
+
+        Returns:
+            SuiteDefinition: Suite definition
+
+        """
+        suite_class = SUITE_DEFINITIONS[self.suite_definition]
+        return suite_class(self.config, dry_run=True)
+
+    def output_count(self, mode):
+        """Number of SURFOUT files of a forecast.
+
+        Args:
+            mode (str): cycle or forecast
+
+        Returns:
+            int: Number of files
+
+        """
+        try:
+            return len(
+                get_verification_leadtimes(
+                    self.config, mode, offline_nml=self.nml_settings.offline.nml
+                )
+            )
+        except RuntimeError:
+            return 1
+
+    def task_outputs(self, name, args):
+        """Output files of one run of a task.
+
+        Args:
+            name (str): Task class name
+            args (dict): Task arguments
+
+        Returns:
+            Counter: Number of files by kind
+
+        """
+        outputs = Counter()
+        if name in OUTPUTS:
+            outputs[OUTPUTS[name]] += 1
+        elif name == "OfflineForecast" and args.get("mode") in ("cycle", "forecast"):
+            outputs["surfout"] += self.output_count(args["mode"])
+        elif name == "Interpolate2grid":
+            nsteps = 1 if "step" in args else self.steps + 1
+            outputs["interpolated"] += nsteps * INTERPOLATE2GRID_FILES_PER_STEP
+        return outputs
+
+    @staticmethod
+    def cycle_basetimes(suite, basetime):
+        """Get the basetimes of the cycles run by a cycle family.
+
+        Args:
+            suite (SuiteDefinition): Suite definition
+            basetime (str): BASETIME variable of the family
+
+        Returns:
+            list: Basetimes
+
+        """
+        if "%CYCLE%" not in basetime:
+            return [as_datetime(basetime)]
+        # Families in a repeat get the basetime from the CYCLE repeat variable
+        suffix = basetime.replace("%CYCLE%", "")
+        return [
+            repeat_basetime
+            for repeat_basetime in getattr(suite, "repeat_basetimes", [])
+            if repeat_basetime.strftime("%Y%m%dT%H%M%S").endswith(suffix)
+        ]
+
+    def count_nodes(self, suite, node, task_paths, size, sizes, stage=None):
+        """Count the families and tasks below a node.
+
+        A family with a PrepareCycle task is a cycle family. Its tasks are
+        counted in a new size.
+
+        Args:
+            suite (SuiteDefinition): Suite definition
+            node (ecflow.Node): Suite or family
+            task_paths (set): Paths of the tasks in the suite
+            size (CycleSize): Size of the node
+            sizes (list): Sizes of the cycle families
+            stage (str, optional): Stage of the node in its cycle. Defaults to None.
+
+        """
+        for child in node.nodes:
+            name = child.name()
+            path = child.get_abs_node_path()
+            if path in task_paths:
+                args = task_args(node_variables(child))
+                task_stage = "static" if size.basetimes is None else stage or "control"
+                size.add_task(name, task_stage, self.task_outputs(name, args))
+                continue
+
+            in_suite = node.get_abs_node_path().count("/") == 1
+            size.families[family_kind(name, in_suite)] += 1
+            child_size = size
+            child_stage = stage
+            if f"{path}/PrepareCycle" in task_paths:
+                basetime = node_variables(child)["BASETIME"]
+                child_size = CycleSize(self.cycle_basetimes(suite, basetime))
+                sizes.append(child_size)
+            elif size.basetimes is not None and stage is None:
+                child_stage = STAGES.get(name, "other")
+            self.count_nodes(suite, child, task_paths, child_size, sizes, child_stage)
+
+    def report(self):
+        """Create the sizing report.
+
+        Returns:
+            dict: Counts of families, tasks, job submissions and output files
+
+        """
+        suite = self.build()
+        suite_node = suite.suite.ecf_node
+        task_paths = {task.get_abs_node_path() for task in suite_node.get_all_tasks()}
+        static = CycleSize()
+        sizes = []
+        self.count_nodes(suite, suite_node, task_paths, static, sizes)
+
+        families = Counter(static.families)
+        tasks = Counter(static.tasks)
+        outputs = Counter(static.outputs)
+        per_day = Counter()
+        peak = static.stages["static"]
+        ncycles = 0
+        for size in sizes:
+            families.update(size.families)
+            tasks.update(size.tasks)
+            for kind, count in size.outputs.items():
+                outputs[kind] += count * size.runs
+            ncycle_tasks = sum(size.tasks.values())
+            for basetime in size.basetimes:
+                per_day[basetime.date()] += ncycle_tasks
+            ncycles += size.runs
+            if size.runs == 0:
+                continue
+            # The input of the next cycles can run while a cycle is processed
+            overlap = size.stages["input"] * INPUT_CYCLES_AHEAD + max(
+                size.stages["input"],
+                size.stages["initialization"],
+                size.stages["prediction"],
+                size.stages["postprocessing"],
+            )
+            peak = max(peak, overlap)
+
+        daily = list(per_day.values())
+        next_window = getattr(suite, "next_window_basetime", None)
+        return {
+            "suite_definition": self.suite_definition,
+            "cycles": ncycles,
+            "days": len(per_day),
+            "next_window_basetime": None if next_window is None else str(next_window),
+            "families": dict(sorted(families.items())),
+            "tasks": dict(sorted(tasks.items())),
+            "total_families": sum(families.values()),
+            "total_tasks": sum(tasks.values()),
+            "total_job_submissions": sum(static.tasks.values()) + sum(daily),
+            "job_submissions_per_day": {
+                "min": min(daily, default=0),
+                "mean": sum(daily) / len(daily) if daily else 0,
+                "max": max(daily, default=0),
+            },
+            "max_tasks": self.max_tasks,
+            "peak_concurrent_tasks_unlimited": peak,
+            "peak_concurrent_tasks": min(peak, self.max_tasks),
+            "output_files": dict(sorted(outputs.items())),
+            "total_output_files": sum(outputs.values()),
+        }
+
+
+def log_sizing_report(report):
+    """Log a sizing report.
+
+    Args:
+        report (dict): Report from SuiteSizing.report
+
+    """
+    logger.info(
+        "Suite sizing of {}: {} cycles over {} days",
+        report["suite_definition"],
+        report["cycles"],
+        report["days"],
+    )
+    if report["next_window_basetime"] is not None:
+        logger.info("Next window starts at {}", report["next_window_basetime"])
+    logger.info("Families: {} {}", report["total_families"], report["families"])
+    logger.info("Tasks: {} {}", report["total_tasks"], report["tasks"])
+    per_day = report["job_submissions_per_day"]
+    logger.info(
+        "Job submissions: {}. Per day: min={} mean={:.1f} max={}",
+        report["total_job_submissions"],
+        per_day["min"],
+        per_day["mean"],
+        per_day["max"],
+    )
+    logger.info(
+        "Peak concurrent tasks: {} (max_tasks={}, unlimited={})",
+        report["peak_concurrent_tasks"],
+        report["max_tasks"],
+        report["peak_concurrent_tasks_unlimited"],
+    )
+    logger.info(
+        "Output files: {} {}", report["total_output_files"], report["output_files"]
+    )
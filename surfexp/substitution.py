@@ -0,0 +1,149 @@
+"""Compiled template substitution."""
+from deode.datetime_utils import get_decade
+
+from surfexp.cache import LRUCache
+
+
+class TemplateEngine:
+    """Substitute @KEY@ tokens in patterns.
+
+    Patterns are parsed once into literal and token segments. Rendering is a
+    single pass over the segments, and results are memoized by pattern and
+    basetime.
+    """
+
+    def __init__(
+        self, values, micro="@", one_decade=False, case_insensitive=True, maxsize=1024
+    ):
+        """Construct the engine.
+
+        Args:
+            values (dict): Values to substitute by key.
+            micro (str, optional): Token delimiter. Defaults to "@".
+            one_decade (bool, optional): Substitute DECADE from basetime.
+                                         Defaults to False.
+            case_insensitive (bool, optional): Match both upper and lower case keys.
+                                               Defaults to True.
+            maxsize (int, optional): Number of memoized results. Defaults to 1024.
+
+        """
+        self.micro = micro
+        self.one_decade = one_decade
+        self.values = {}
+        for key, val in values.items():
+            if isinstance(key, str) and isinstance(val, str):
+                if case_insensitive:
+                    self.values.setdefault(key.upper(), val)
+                    self.values.setdefault(key.lower(), val)
+                else:
+                    self.values.setdefault(key, val)
+        self.compiled = {}
+        self.rendered = LRUCache(maxsize=maxsize)
+
+    def is_token(self, key):
+        """Check if a key is substituted by the engine.
+
+        Args:
+            key (str): Key
+
+        Returns:
+            bool: True if the key is substituted.
+
+        """
+        return key in self.values or key in ("DECADE", "decade")
+
+    def compile(self, pattern):
+        """Parse a pattern into segments.
+
+        Args:
+            pattern (str): Pattern
+
+        Returns:
+            tuple: Segments as (is_token, text) tuples.
+
+        """
+        try:
+            return self.compiled[pattern]
+        except KeyError:
+            pass
+
+        micro = self.micro
+        segments = []
+        literal = []
+        pos = 0
+        while True:
+            start = pattern.find(micro, pos)
+            if start < 0:
+                literal.append(pattern[pos:])
+                break
+            end = pattern.find(micro, start + len(micro))
+            if end < 0:
+                literal.append(pattern[pos:])
+                break
+            key = pattern[start + len(micro) : end]
+            if self.is_token(key):
+                literal.append(pattern[pos:start])
+                segments.append((False, "".join(literal)))
+                segments.append((True, key))
+                literal = []
+                pos = end + len(micro)
+            else:
+                # The closing delimiter might open a new token
+                literal.append(pattern[pos:end])
+                pos = end
+        if literal:
+            segments.append((False, "".join(literal)))
+        segments = tuple(
+            (is_token, text) for is_token, text in segments if is_token or text != ""
+        )
+        self.compiled.update({pattern: segments})
+        return segments
+
+    def render(self, pattern, basetime=None):
+        """Substitute the tokens in a pattern.
+
+        Args:
+            pattern (str): Pattern
+            basetime (datetime, optional): Basetime for DECADE. Defaults to None.
+
+        Returns:
+            str: Substituted pattern
+
+        """
+        if not isinstance(pattern, str):
+            return pattern
+        key = (pattern, basetime)
+        result = self.rendered.get(key)
+        if result is not None:
+            return result
+
+        values = self.values
+        decade = None
+        if basetime is not None:
+            decade = get_decade(basetime) if self.one_decade else ""
+        parts = []
+        for is_token, text in self.compile(pattern):
+            if not is_token:
+                parts.append(text)
+            elif text in values:
+                parts.append(values[text])
+            elif decade is not None:
+                parts.append(decade)
+            else:
+                parts.append(f"{self.micro}{text}{self.micro}")
+        result = "".join(parts)
+        self.rendered.put(key, result)
+        return result
+
+    def render_many(self, patterns, basetime=None):
+        """Substitute the tokens in many patterns for one basetime.
+
+        Args:
+            patterns (list): Patterns
+            basetime (datetime, optional): Basetime for DECADE. Defaults to None.
+
+        Returns:
+            list: Substituted patterns
+
+        """
+        return [self.render(pattern, basetime=basetime) for pattern in patterns]
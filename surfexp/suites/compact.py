@@ -0,0 +1,508 @@
+"""Compact offline suite driven by an ecflow repeat."""
+from pathlib import Path
+
+import ecflow
+from deode.datetime_utils import as_datetime, as_timedelta
+from deode.logs import logger
+from deode.suites.base import (
+    EcflowSuiteFamily,
+    EcflowSuiteTask,
+    EcflowSuiteTrigger,
+    EcflowSuiteTriggers,
+    SuiteDefinition,
+)
+
+from surfexp.experiment import (
+    SuiteNamelistSettings,
+    ensure_consistency,
+    get_perturbations,
+    get_verification_leadtimes,
+)
+from surfexp.suites.offline import SurfexSuiteDefinition
+from surfexp.suites.triggers import reduce_triggers
+
+
+def repeat_time(dtime):
+    """Format a datetime as an ecflow repeat value (YYYYMMDDTHHMMSS).
+
+    Args:
+        dtime (datetime): Datetime
+
+    Returns:
+        str: Repeat value
+
+    """
+    return dtime.strftime("%Y%m%dT%H%M%S")
+
+
+class SurfexCompactSuiteDefinition(SurfexSuiteDefinition):
+    """Surfex suite with one cycle template driven by an ecflow repeat.
+
+    BASETIME and VALIDTIME are derived from the CYCLE repeat variable. The
+    number of nodes does not depend on the length of the experiment. The
+    basetimes covered by the repeat are kept in repeat_basetimes.
+    """
+
+    def __init__(self, config, dry_run=False):
+        """Initialize a compact surfex suite.
+
+        Args:
+            config (ParsedConfig): Parsed configuration
+            dry_run (bool, optional): Dry run. Defaults to False
+
+        Raises:
+            NotImplementedError: Settings not supported in the compact layout
+
+        """
+        SuiteDefinition.__init__(self, config, dry_run=dry_run)
+        ensure_consistency(config)
+
+        for setting in [
+            "an_forcing.enabled",
+            "suite_control.interpolate2grid",
+            "suite_control.do_marsprep",
+        ]:
+            if config.get(setting, False):
+                raise NotImplementedError(f"{setting} in the compact suite layout")
+
+        template = Path(__file__).parent.resolve() / "../templates/ecflow/default.py"
+        self.template = template.as_posix()
+        self.config = config
+        self.one_decade = config["pgd.one_decade"]
+        self.has_mars = False
+        self.mode = config["suite_control.mode"]
+        self.do_prep = config["suite_control.do_prep"]
+        if self.mode == "restart":
+            self.do_prep = False
+        self.nml_settings = SuiteNamelistSettings(config)
+
+        basetime = as_datetime(config["general.times.basetime"])
+        starttime = as_datetime(config["general.times.start"])
+        endtime = as_datetime(config["general.times.end"])
+        self.cycle_length = as_timedelta(config["general.times.cycle_length"])
+        self.do_forecast = (
+            as_timedelta(config["general.times.forecast_range"]).total_seconds() > 0.0
+        )
+
+        max_tasks = config.get("general.max_tasks")
+        if max_tasks is None:
+            max_tasks = 20
+
+        self.repeat_basetimes = []
+        comp_complete = self.add_compilation(config, self.template)
+        static_complete = self.add_static_data(
+            config, self.template, comp_complete, starttime, endtime, self.cycle_length
+        )
+        if config["suite_control.create_time_dependent_suite"]:
+            triggers = EcflowSuiteTriggers([comp_complete, static_complete])
+            self.add_cycles(basetime, endtime, triggers)
+        self.add_limits(config, max_tasks)
+        self.suite.ecf_node.add_variable(
+            "MAX_ITERATIONS", str(config.get("suite_control.max_iterations", 1))
+        )
+
+        self.removed_triggers = 0
+        if config.get("suite_control.reduce_triggers", False):
+            self.removed_triggers = reduce_triggers(self.suite.ecf_node)
+
+    def add_cycles(self, basetime, endtime, triggers):
+        """Add the first cycle and the repeated cycles.
+
+        Args:
+            basetime (datetime): First cycle
+            endtime (datetime): Last cycle
+            triggers (EcflowSuiteTriggers): Triggers for the first cycle
+
+        """
+        first_cycle = basetime
+        if self.do_prep:
+            # The first cycle is initialized by PREP
+            variables = {
+                "BASETIME": basetime.isoformat(),
+                "VALIDTIME": basetime.isoformat(),
+            }
+            initial = EcflowSuiteFamily(
+                "InitialCycle",
+                self.suite,
+                self.ecf_files,
+                trigger=triggers,
+                variables=variables,
+                ecf_files_remotely=self.ecf_files_remotely,
+            )
+            self.add_cycle(initial, do_prep=True)
+            triggers = EcflowSuiteTriggers([EcflowSuiteTrigger(initial)])
+            first_cycle = basetime + self.cycle_length
+
+        if first_cycle > endtime:
+            return
+        cycles = EcflowSuiteFamily(
+            "Cycles",
+            self.suite,
+            self.ecf_files,
+            trigger=triggers,
+            ecf_files_remotely=self.ecf_files_remotely,
+        )
+        self.add_repeat(cycles, first_cycle, endtime)
+        logger.info(
+            "Compact suite with cycles from {} to {} every {}",
+            first_cycle,
+            endtime,
+            self.cycle_length,
+        )
+
+    def add_repeat(self, cycles, first_cycle, endtime):
+        """Add the repeat and the cycle template.
+
+        RepeatDateTime is used if available in ecflow. Otherwise a RepeatDate
+        with one family per cycle time of the day is used.
+
+        Args:
+            cycles (EcflowSuiteFamily): Family to repeat
+            first_cycle (datetime): First cycle
+            endtime (datetime): Last cycle
+
+        """
+        basetime = first_cycle
+        while basetime <= endtime:
+            self.repeat_basetimes.append(basetime)
+            basetime = basetime + self.cycle_length
+
+        seconds = int(self.cycle_length.total_seconds())
+        if hasattr(ecflow, "RepeatDateTime"):
+            delta = f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:00"
+            repeat = ecflow.RepeatDateTime(
+                "CYCLE", repeat_time(first_cycle), repeat_time(endtime), delta
+            )
+            cycles.ecf_node.add_repeat(repeat)
+            cycles.ecf_node.add_variable("BASETIME", "%CYCLE%")
+            cycles.ecf_node.add_variable("VALIDTIME", "%CYCLE%")
+            self.add_cycle(cycles, do_prep=False)
+            return
+
+        last_hour = 24 - seconds // 3600
+        if (
+            seconds % 3600 != 0
+            or 86400 % seconds != 0
+            or first_cycle.hour != 0
+            or endtime.hour != last_hour
+        ):
+            raise NotImplementedError(
+                "Cycles must cover whole days without ecflow RepeatDateTime"
+            )
+        repeat = ecflow.RepeatDate(
+            "CYCLE", int(first_cycle.strftime("%Y%m%d")), int(endtime.strftime("%Y%m%d"))
+        )
+        cycles.ecf_node.add_repeat(repeat)
+        previous = None
+        for hour in range(0, 24, seconds // 3600):
+            time_value = f"%CYCLE%T{hour:02d}0000"
+            trigger = None
+            if previous is not None:
+                trigger = EcflowSuiteTriggers([EcflowSuiteTrigger(previous)])
+            time_family = EcflowSuiteFamily(
+                f"{hour:02d}00",
+                cycles,
+                self.ecf_files,
+                trigger=trigger,
+                variables={"BASETIME": time_value, "VALIDTIME": time_value},
+                ecf_files_remotely=self.ecf_files_remotely,
+            )
+            self.add_cycle(time_family, do_prep=False)
+            previous = time_family
+
+    def add_task(self, name, parent, args=None, trigger=None):
+        """Add a task using the default template.
+
+        Args:
+            name (str): Task name
+            parent (EcflowSuiteFamily): Parent family
+            args (str, optional): Task arguments. Defaults to None.
+            trigger (EcflowSuiteTriggers, optional): Trigger. Defaults to None.
+
+        Returns:
+            EcflowSuiteTask: Task
+
+        """
+        variables = None if args is None else {"ARGS": args}
+        return EcflowSuiteTask(
+            name,
+            parent,
+            self.config,
+            self.task_settings,
+            self.ecf_files,
+            input_template=self.template,
+            variables=variables,
+            trigger=trigger,
+        )
+
+    def add_cycle(self, parent, do_prep=False):
+        """Add the families of a cycle.
+
+        Args:
+            parent (EcflowSuiteFamily): Family of the cycle
+            do_prep (bool, optional): Initialize with PREP. Defaults to False.
+
+        """
+        prepare_cycle = self.add_task("PrepareCycle", parent)
+        triggers = EcflowSuiteTriggers([EcflowSuiteTrigger(prepare_cycle)])
+
+        cycle_input = EcflowSuiteFamily(
+            "CycleInput", parent, self.ecf_files, trigger=triggers
+        )
+        forcing = self.add_task("Forcing", cycle_input, args="mode=default;")
+        forcing_triggers = [EcflowSuiteTrigger(forcing)]
+        if self.config["forcing.modify_forcing"]:
+            mod_forcing = self.add_task(
+                "ModifyForcing",
+                cycle_input,
+                args="mode=default;",
+                trigger=EcflowSuiteTriggers([EcflowSuiteTrigger(forcing)]),
+            )
+            forcing_triggers.append(EcflowSuiteTrigger(mod_forcing))
+        if self.do_forecast:
+            forecast_forcing = EcflowSuiteFamily(
+                "ForecastForcing",
+                cycle_input,
+                self.ecf_files,
+                trigger=EcflowSuiteTriggers(forcing_triggers),
+            )
+            self.add_task("Forcing", forecast_forcing, args="mode=forecast;")
+
+        triggers = EcflowSuiteTriggers([EcflowSuiteTrigger(cycle_input)])
+        analysis = None
+        if do_prep:
+            initialization = EcflowSuiteFamily(
+                "Initialization", parent, self.ecf_files, trigger=triggers
+            )
+            self.add_task("OfflinePrep", initialization)
+            triggers = EcflowSuiteTriggers([EcflowSuiteTrigger(initialization)])
+        elif self.do_soda():
+            initialization = EcflowSuiteFamily(
+                "Initialization", parent, self.ecf_files, trigger=triggers
+            )
+            analysis = self.add_analysis(initialization)
+            triggers = EcflowSuiteTriggers([EcflowSuiteTrigger(initialization)])
+
+        prediction = EcflowSuiteFamily(
+            "Prediction", parent, self.ecf_files, trigger=triggers
+        )
+        cycle_forecast = EcflowSuiteFamily("Cycle", prediction, self.ecf_files)
+        self.add_task("OfflineForecast", cycle_forecast, args="mode=cycle;")
+        if self.do_forecast:
+            long_forecast = EcflowSuiteFamily("LongForecast", prediction, self.ecf_files)
+            self.add_task("OfflineForecast", long_forecast, args="mode=forecast;")
+        triggers = EcflowSuiteTriggers([EcflowSuiteTrigger(prediction)])
+
+        pp_fam = None
+        verification = self.verification_leadtimes(do_prep)
+        if len(verification) > 0 or analysis is not None:
+            pp_fam = EcflowSuiteFamily(
+                "PostProcessing", parent, self.ecf_files, trigger=triggers
+            )
+        if len(verification) > 0:
+            verification_fam = EcflowSuiteFamily("Verification", pp_fam, self.ecf_files)
+            batch = self.config.get("suite_control.batch_verification", False)
+            for mode, (ver_vars, leadtimes) in verification.items():
+                mode_fam = EcflowSuiteFamily(mode, verification_fam, self.ecf_files)
+                if batch:
+                    self.add_task("HarpSQLiteBatch", mode_fam, args=f"mode={mode};")
+                    continue
+                for block, leadtime in enumerate(leadtimes, start=1):
+                    block_fam = EcflowSuiteFamily(
+                        f"output{block}", mode_fam, self.ecf_files
+                    )
+                    for var_name in ver_vars:
+                        harp_fam = EcflowSuiteFamily(var_name, block_fam, self.ecf_files)
+                        self.add_task(
+                            "HarpSQLite",
+                            harp_fam,
+                            args=f"mode={mode};var_name={var_name};leadtime={leadtime};",
+                        )
+        if analysis is not None:
+            qc2obsmon_fam = EcflowSuiteFamily("QC2Obsmon", pp_fam, self.ecf_files)
+            analysis_fam = EcflowSuiteFamily("analysis", qc2obsmon_fam, self.ecf_files)
+            self.add_task("Qc2obsmon", analysis_fam, args="mode=default;")
+
+        trigger = None
+        if pp_fam is not None:
+            trigger = EcflowSuiteTriggers([EcflowSuiteTrigger(pp_fam)])
+        task_logs = self.config["system.wrk"]
+        args = ";".join(
+            [
+                f"joboutdir={self.ecf_out}/{self.name}/%CYCLE%",
+                f"tarname={self.name}_%CYCLE%",
+                f"task_logs={task_logs}",
+                "config_label=hourlogs",
+            ]
+        )
+        self.add_task("CollectLogs", parent, args=args, trigger=trigger)
+
+    def do_soda(self):
+        """Check if soda is run in the cycles.
+
+        Returns:
+            bool: True if any scheme or observation is active.
+
+        """
+        for scheme in self.nml_settings.schemes.values():
+            if scheme.upper() != "NONE":
+                return True
+        return any(sum(nnco) > 0 for nnco in self.hourly_nnco())
+
+    def hourly_nnco(self):
+        """Active observations for each cycle time of the day.
+
+        Returns:
+            list: NNCO for each cycle time of the day
+
+        """
+        day = as_datetime("2000-01-01T00:00:00Z")
+        nncos = []
+        cycle_time = day
+        while cycle_time < day + as_timedelta("PT24H"):
+            nncos.append(self.nml_settings.nnco(cycle_time))
+            cycle_time += self.cycle_length
+        return nncos
+
+    def add_analysis(self, initialization):
+        """Add the analysis and soda tasks.
+
+        The analysis variables are the union over the cycle times of the day.
+        Soda sets the active observations for each cycle itself.
+
+        Args:
+            initialization (EcflowSuiteFamily): Initialization family
+
+        Returns:
+            EcflowSuiteFamily: Analysis family
+
+        """
+        schemes = self.nml_settings.schemes
+        soda_triggers = []
+        if schemes["CASSIM_ISBA"] == "EKF":
+            perturbations = EcflowSuiteFamily(
+                "Perturbations", initialization, self.ecf_files
+            )
+            if self.config.get("suite_control.batch_perturbations", False):
+                self.add_task("PerturbedRuns", perturbations)
+            else:
+                for pert, name, args in self.perturbation_runs():
+                    pert_fam = EcflowSuiteFamily(name, perturbations, self.ecf_files)
+                    self.add_task(
+                        "PerturbedRun", pert_fam, args=f"pert={pert};{args}"
+                    )
+            soda_triggers.append(EcflowSuiteTrigger(perturbations))
+
+        active = {"t2m": False, "rh2m": False, "sd": False}
+        for nnco in self.hourly_nnco():
+            for t_ind, val in enumerate(self.nml_settings.obs_types):
+                if nnco[t_ind] == 1:
+                    if val in ("T2M", "T2M_P"):
+                        active.update({"t2m": True})
+                    elif val in ("HU2M", "HU2M_P"):
+                        active.update({"rh2m": True})
+                    elif val == "SWE":
+                        active.update({"sd": True})
+
+        analysis = EcflowSuiteFamily("Analysis", initialization, self.ecf_files)
+        fg4oi = self.add_task("FirstGuess4OI", analysis, args="mode=analysis;")
+        fg4oi_complete = EcflowSuiteTrigger(fg4oi)
+        cryo_complete = fg4oi_complete
+        if self.config["observations.cryo_obs_sd"]:
+            cryo2json = self.add_task(
+                "CryoClim2json",
+                analysis,
+                trigger=EcflowSuiteTriggers([fg4oi_complete]),
+            )
+            cryo_complete = EcflowSuiteTrigger(cryo2json)
+
+        var_triggers = []
+        for var, is_active in active.items():
+            if not is_active:
+                continue
+            var_fam = EcflowSuiteFamily(
+                var, analysis, self.ecf_files, variables={"ARGS": f"var_name={var};"}
+            )
+            qc_triggers = None
+            if var == "sd":
+                qc_triggers = EcflowSuiteTriggers([fg4oi_complete, cryo_complete])
+            qc_task = self.add_task("QualityControl", var_fam, trigger=qc_triggers)
+            self.add_task(
+                "OptimalInterpolation",
+                var_fam,
+                trigger=EcflowSuiteTriggers(
+                    [EcflowSuiteTrigger(qc_task), fg4oi_complete]
+                ),
+            )
+            var_triggers.append(EcflowSuiteTrigger(var_fam))
+        if len(var_triggers) > 0:
+            oi2soda = self.add_task(
+                "Oi2soda", analysis, trigger=EcflowSuiteTriggers(var_triggers)
+            )
+            soda_triggers.append(EcflowSuiteTrigger(oi2soda))
+
+        if schemes["CASSIM_ISBA"] == "OI":
+            for name in ["PrepareOiSoilInput", "PrepareOiClimate"]:
+                task = self.add_task(name, initialization)
+                soda_triggers.append(EcflowSuiteTrigger(task))
+        if schemes["CASSIM_ISBA"] == "INPUT" and self.nml_settings.sst_ascii:
+            task = self.add_task("PrepareSST", initialization)
+            soda_triggers.append(EcflowSuiteTrigger(task))
+        if schemes["CASSIM_ISBA"] == "OI" or self.nml_settings.lextrap_water:
+            task = self.add_task(
+                "PrepareLSM",
+                initialization,
+                trigger=EcflowSuiteTriggers([fg4oi_complete]),
+            )
+            soda_triggers.append(EcflowSuiteTrigger(task))
+
+        self.add_task("Soda", analysis, trigger=EcflowSuiteTriggers(soda_triggers))
+        return analysis
+
+    def perturbation_runs(self):
+        """Perturbed runs for the EKF.
+
+        Returns:
+            list: Perturbation number, family name and extra task arguments
+
+        """
+        runs = []
+        for perturbation in get_perturbations(
+            self.nml_settings.nncv, self.nml_settings.cvar_m, self.nml_settings.llincheck
+        ):
+            name = perturbation["name"]
+            pert_sign = perturbation["pert_sign"]
+            args = f"name={name};ivar={perturbation['ivar']}"
+            family = name
+            if pert_sign is not None:
+                args = f"{args};pert_sign={pert_sign}"
+                if pert_sign != "none":
+                    family = f"{name}_{pert_sign}"
+            runs.append((perturbation["pert"], family, args))
+        return runs
+
+    def verification_leadtimes(self, do_prep):
+        """Verification variables and lead times in seconds for each mode.
+
+        Args:
+            do_prep (bool): The cycle is initialized by PREP
+
+        Returns:
+            dict: Variables and lead times by mode
+
+        """
+        verification = {}
+        if not self.config["suite_control.do_verification"]:
+            return verification
+        if do_prep and not self.do_forecast:
+            return verification
+        modes = ["cycle", "forecast"] if self.do_forecast else ["cycle"]
+        for mode in modes:
+            ver_vars = self.config.get(f"verification.{mode}.variables", [])
+            if len(ver_vars) == 0:
+                continue
+            leadtimes = get_verification_leadtimes(
+                self.config, mode, offline_nml=self.nml_settings.offline.nml
+            )
+            verification.update({mode: (list(ver_vars), leadtimes)})
+        return verification
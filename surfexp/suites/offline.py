@@ -1,8 +1,9 @@
 """Offline suite."""
 import contextlib
+from datetime import timedelta
 from pathlib import Path
 
-from deode.datetime_utils import as_datetime, as_timedelta, get_decadal_list, get_decade
+from deode.datetime_utils import as_datetime, as_timedelta
 from deode.logs import logger
 from deode.suites.base import (
     EcflowSuiteFamily,
@@ -15,7 +16,48 @@ from deode.suites.base import (
 # TODO should be moved to deode.suites or a module
 from ecflow import Limit
 
-from surfexp.experiment import SettingsFromNamelistAndConfig, get_total_unique_cycle_list
+from surfexp.cycles import CycleCalendar
+from surfexp.experiment import (
+    SuiteNamelistSettings,
+    ensure_consistency,
+    get_total_unique_cycle_list,
+)
+from surfexp.suites.triggers import add_complete_trigger, reduce_triggers
+
+# Task classes with separate concurrency limits. Tasks not listed here are in the
+# default class.
+DEFAULT_LIMIT_CLASS = "default"
+LIMIT_CLASSES = {
+    DEFAULT_LIMIT_CLASS: [],
+    "control": ["PrepareCycle", "SuiteExtender"],
+    "static": ["CMakeBuild", "Gmted", "Soil"],
+    "fetch": ["FetchMars", "FetchMarsPrep", "FetchMarsObs"],
+    "interpolation": ["Interpolate2grid"],
+    "forcing": ["Forcing", "ModifyForcing"],
+    "binaries": [
+        "OfflinePgd",
+        "OfflinePrep",
+        "OfflineForecast",
+        "PerturbedRun",
+        "PerturbedRuns",
+        "Soda",
+    ],
+    "analysis": [
+        "FirstGuess4OI",
+        "CryoClim2json",
+        "QualityControl",
+        "OptimalInterpolation",
+        "Oi2soda",
+        "PrepareOiSoilInput",
+        "PrepareOiClimate",
+        "PrepareSST",
+        "PrepareLSM",
+    ],
+    "postprocessing": ["HarpSQLite", "HarpSQLiteBatch", "Qc2obsmon", "CollectLogs"],
+}
+TASK_LIMIT_CLASSES = {
+    task: limit_class for limit_class, tasks in LIMIT_CLASSES.items() for task in tasks
+}
 
 
 class SurfexSuiteDefinition(SuiteDefinition):
@@ -40,6 +82,7 @@ class SurfexSuiteDefinition(SuiteDefinition):
 
         """
         SuiteDefinition.__init__(self, config, dry_run=dry_run)
+        ensure_consistency(config)
 
         template = Path(__file__).parent.resolve() / "../templates/ecflow/default.py"
         template = template.as_posix()
@@ -64,170 +107,63 @@ class SurfexSuiteDefinition(SuiteDefinition):
             max_tasks = 20
         logger.debug("DTGSTART: {} DTGBEG: {} DTGEND: {}", basetime, starttime, endtime)
 
-        limit = Limit("max_tasks", max_tasks)
-        self.suite.ecf_node.add_limit(limit)
-        self.suite.ecf_node.add_inlimit("max_tasks")
-
-        l_basetime = basetime
         logger.debug("Building list of DTGs")
-
-        cycles = {}
-        time_trigger_times = {}
-        prediction_trigger_times = {}
-
-        logger.info("unique_cycles={}", unique_cycles)
-        cont = True
-        while cont:
-            for cycle in unique_cycles:
-                while l_basetime <= endtime:
-                    c_index = l_basetime.strftime("%Y%m%d%H%M")
-                    time_fam_start = l_basetime - cycle_length * input_cycles_ahead
-                    if time_fam_start >= starttime:
-                        time_trigger_times.update(
-                            {c_index: time_fam_start.strftime("%Y%m%d%H%M")}
-                        )
-                    else:
-                        time_trigger_times.update({c_index: None})
-
-                    prediction_time = l_basetime - cycle_length
-                    if prediction_time >= starttime:
-                        prediction_trigger_times.update(
-                            {c_index: prediction_time.strftime("%Y%m%d%H%M")}
-                        )
-                    else:
-                        prediction_trigger_times.update(
-                            {c_index: starttime.strftime("%Y%m%d%H%M")}
-                        )
-
-                    cycles.update(
-                        {
-                            c_index: {
-                                "day": l_basetime.strftime("%Y%m%d"),
-                                "time": l_basetime.strftime("%H%M"),
-                                "validtime": l_basetime.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                                "basetime": l_basetime.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                            }
-                        }
-                    )
-                    logger.debug("Loop basetime: {}, fcint: {}", l_basetime, cycle)
-                    logger.info(
-                        "c_index={} prediction_trigger_times={}",
-                        c_index,
-                        prediction_trigger_times[c_index],
-                    )
-                    l_basetime = l_basetime + cycle
-                if l_basetime >= endtime:
-                    cont = False
-            cont = False
-
+        cycle_step = unique_cycles[0] if len(unique_cycles) > 0 else cycle_length
+
+        # In windowed mode only the next window_days days are generated and the
+        # SuiteExtender task in the last day appends the following window. The
+        # cycles of an appended window are triggered by the previous window.
+        window_days = config.get("suite_control.window_days", 0)
+        window_continuation = config.get("suite_control.window_continuation", False)
+        window_endtime = endtime
+        if window_days > 0:
+            day_start = basetime.replace(hour=0, minute=0, second=0, microsecond=0)
+            window_end = day_start + timedelta(days=window_days)
+            window_endtime = min(endtime, window_end - timedelta(seconds=1))
+        calendar = CycleCalendar(
+            basetime,
+            starttime,
+            window_endtime,
+            cycle_step,
+            input_cycles_ahead=input_cycles_ahead,
+        )
+        self.next_window_basetime = None
+        if len(calendar) > 0:
+            next_basetime = as_datetime(calendar.basetimes[-1]) + cycle_step
+            if next_basetime <= endtime:
+                self.next_window_basetime = next_basetime
+        cycles = calendar.cycles()
+        nml_settings = SuiteNamelistSettings(config)
+        time_trigger_times = calendar.time_trigger_times()
+        prediction_trigger_times = calendar.prediction_trigger_times()
+        logger.info("Built {} cycles. unique_cycles={}", len(calendar), unique_cycles)
         logger.debug("Built cycles: {}", cycles)
 
-        comp_complete = None
-        if config["compile.build"]:
-            comp = EcflowSuiteFamily("Compilation", self.suite, self.ecf_files)
-            EcflowSuiteTask(
-                "CMakeBuild",
-                comp,
-                config,
-                self.task_settings,
-                self.ecf_files,
-                input_template=template,
-            )
-            comp_complete = EcflowSuiteTrigger(comp, mode="complete")
-
-        static_complete = None
-        triggers = EcflowSuiteTriggers([comp_complete])
-        if config["suite_control.create_static_data"]:
-            static_data = EcflowSuiteFamily(
-                "StaticData", self.suite, self.ecf_files, trigger=triggers
-            )
-
-            pgd_input = EcflowSuiteFamily("PgdInput", static_data, self.ecf_files)
-            EcflowSuiteTask(
-                "Gmted",
-                pgd_input,
-                config,
-                self.task_settings,
-                self.ecf_files,
-                input_template=template,
-                variables=None,
-            )
-
-            EcflowSuiteTask(
-                "Soil",
-                pgd_input,
-                config,
-                self.task_settings,
-                self.ecf_files,
-                input_template=template,
-                variables=None,
-            )
-
-            pgd_trigger = EcflowSuiteTriggers([EcflowSuiteTrigger(pgd_input)])
-            if self.one_decade:
-                pgd_family = EcflowSuiteFamily(
-                    "OfflinePgd",
-                    static_data,
-                    self.ecf_files,
-                    trigger=pgd_trigger,
-                    ecf_files_remotely=self.ecf_files_remotely,
-                )
-                decade_dates = get_decadal_list(
-                    starttime,
-                    endtime,
-                )
-
-                for dec_date in decade_dates:
-                    decade_pgd_family = EcflowSuiteFamily(
-                        f"decade_{get_decade(dec_date)}",
-                        pgd_family,
-                        self.ecf_files,
-                        ecf_files_remotely=self.ecf_files_remotely,
-                    )
-
-                    EcflowSuiteTask(
-                        "OfflinePgd",
-                        decade_pgd_family,
-                        config,
-                        self.task_settings,
-                        self.ecf_files,
-                        input_template=template,
-                        variables={"ARGS": f"basetime={dec_date.isoformat()}"},
-                        ecf_files_remotely=self.ecf_files_remotely,
-                    )
-            else:
-                EcflowSuiteTask(
-                    "OfflinePgd",
-                    static_data,
-                    config,
-                    self.task_settings,
-                    self.ecf_files,
-                    input_template=template,
-                    variables={"ARGS": f"basetime={dec_date.isoformat()}"},
-                    trigger=pgd_trigger,
-                    ecf_files_remotely=self.ecf_files_remotely,
-                )
-            static_complete = EcflowSuiteTrigger(static_data)
+        comp_complete = self.add_compilation(config, template)
+        static_complete = self.add_static_data(
+            config, template, comp_complete, starttime, endtime, cycle_step
+        )
 
         prep_complete = None
-        days = []
+        days = set()
+        self.day_names = []
         cycle_input_nodes = {}
         prediction_nodes = {}
         if config["suite_control.create_time_dependent_suite"]:
-            cycles_values = cycles.values()
+            cycles_items = cycles.items()
         else:
-            cycles_values = []
+            cycles_items = []
 
         day_family = None
         time_trigger = None
+        window_triggers = []
         prev_cycle_input = None
         prev_initialization = None
         prev_prediction = None
-        logger.info("cycles: {}", cycles)
-        for cycle in cycles_values:
+        logger.debug("cycles: {}", cycles)
+        for c_index, cycle in cycles_items:
             cycle_day = cycle["day"]
             basetime = as_datetime(cycle["basetime"])
-            c_index = basetime.strftime("%Y%m%d%H%M")
             time_variables = {
                 "BASETIME": cycle["basetime"],
                 "VALIDTIME": cycle["validtime"],
@@ -241,7 +177,8 @@ class SurfexSuiteDefinition(SuiteDefinition):
                     variables=time_variables,
                     ecf_files_remotely=self.ecf_files_remotely,
                 )
-                days.append(cycle_day)
+                days.add(cycle_day)
+                self.day_names.append(cycle_day)
 
             if (
                 c_index in time_trigger_times
@@ -250,7 +187,7 @@ class SurfexSuiteDefinition(SuiteDefinition):
             ):
                 time_trigger = cycle_input_nodes[time_trigger_times[c_index]]
 
-            logger.info("cycle_time={}", cycle["time"])
+            logger.debug("cycle_time={}", cycle["time"])
             triggers = EcflowSuiteTriggers([comp_complete, static_complete, time_trigger])
 
             time_family = EcflowSuiteFamily(
@@ -262,6 +199,13 @@ class SurfexSuiteDefinition(SuiteDefinition):
                 ecf_files_remotely=self.ecf_files_remotely,
             )
             cycle_input_nodes.update({c_index: EcflowSuiteTrigger(time_family)})
+            trigger_index = time_trigger_times.get(c_index)
+            if (
+                window_continuation
+                and trigger_index is not None
+                and trigger_index not in cycle_input_nodes
+            ):
+                window_triggers.append((time_family.ecf_node, trigger_index))
 
             prepare_cycle = EcflowSuiteTask(
                 "PrepareCycle",
@@ -312,9 +256,7 @@ class SurfexSuiteDefinition(SuiteDefinition):
                     triggers = EcflowSuiteTriggers([EcflowSuiteTrigger(mars)])
 
                 if self.do_prep:
-                    settings = SettingsFromNamelistAndConfig("prep", self.config)
-                    cfile = settings.get_setting("NAM_PREP_SURF_ATM#CFILE")
-                    cfiletype = settings.get_setting("NAM_PREP_SURF_ATM#CFILETYPE")
+                    cfile, cfiletype = nml_settings.prep_input
                     if cfile != "" and cfiletype == "GRIB":
                         mars_prep = EcflowSuiteTask(
                             "FetchMarsPrep",
@@ -344,6 +286,20 @@ class SurfexSuiteDefinition(SuiteDefinition):
                         ecf_files_remotely=self.ecf_files_remotely,
                         variables={"ARGS": args},
                     )
+                    if config.get("suite_control.interpolate2grid_per_mode", False):
+                        # One task interpolating all steps in parallel
+                        EcflowSuiteTask(
+                            "Interpolate2grid",
+                            interpolate2grid_fam,
+                            config,
+                            self.task_settings,
+                            self.ecf_files,
+                            input_template=template,
+                        )
+                        triggers = EcflowSuiteTriggers(
+                            [EcflowSuiteTrigger(interpolate2grid_fam)]
+                        )
+                        continue
                     fcint = as_timedelta(self.config["general.times.cycle_length"])
                     steps = int(int(fcint.total_seconds()) / 3600)
                     for bd in range(steps + 1):
@@ -517,7 +473,7 @@ class SurfexSuiteDefinition(SuiteDefinition):
                     trigger=EcflowSuiteTriggers([EcflowSuiteTrigger(analysis)]),
                 )
 
-            logger.info(
+            logger.debug(
                 "c_index={} prediction_trigger_times[c_index]={}",
                 c_index,
                 prediction_trigger_times[c_index],
@@ -544,30 +500,15 @@ class SurfexSuiteDefinition(SuiteDefinition):
             if self.do_prep:
                 do_initialization = True
             else:
-                settings = SettingsFromNamelistAndConfig("soda", config)
-
-                schemes = {}
-                schemes.update(
-                    {"CASSIM_ISBA": settings.get_setting("NAM_ASSIM#CASSIM_ISBA")}
-                )
-                schemes.update(
-                    {"CASSIM_SEA": settings.get_setting("NAM_ASSIM#CASSIM_SEA")}
-                )
-                schemes.update(
-                    {"CASSIM_TEB": settings.get_setting("NAM_ASSIM#CASSIM_TEB")}
-                )
-                schemes.update(
-                    {"CASSIM_WATER": settings.get_setting("NAM_ASSIM#CASSIM_WATER")}
-                )
+                schemes = nml_settings.schemes
 
                 do_soda = False
                 for scheme in schemes.values():
                     if scheme.upper() != "NONE":
                         do_soda = True
 
-                obs_types = settings.get_setting("NAM_OBS#COBS_M", default=[])
-                nnco = settings.get_nnco(config, basetime=as_datetime(cycle["basetime"]))
-                logger.info("nnco={}", nnco)
+                nnco = nml_settings.nnco(basetime)
+                logger.debug("nnco={}", nnco)
                 if sum(nnco) > 0:
                     do_soda = True
                 if do_soda:
@@ -602,9 +543,22 @@ class SurfexSuiteDefinition(SuiteDefinition):
                         perturbations = EcflowSuiteFamily(
                             "Perturbations", initialization, self.ecf_files
                         )
-                        nncv = settings.get_setting("NAM_VAR#NNCV")
-                        names = settings.get_setting("NAM_VAR#CVAR_M")
-                        llincheck = settings.get_setting("NAM_ASSIM#LLINCHECK")
+                    if perturbations is not None and config.get(
+                        "suite_control.batch_perturbations", False
+                    ):
+                        # All perturbed runs in one task
+                        EcflowSuiteTask(
+                            "PerturbedRuns",
+                            perturbations,
+                            config,
+                            self.task_settings,
+                            self.ecf_files,
+                            input_template=template,
+                        )
+                    elif perturbations is not None:
+                        nncv = nml_settings.nncv
+                        names = nml_settings.cvar_m
+                        llincheck = nml_settings.llincheck
                         triggers = None
 
                         name = "REF"
@@ -703,9 +657,7 @@ class SurfexSuiteDefinition(SuiteDefinition):
                         )
 
                     prepare_sst = None
-                    if schemes["CASSIM_ISBA"] == "INPUT" and settings.setting_is(
-                        "NAM_ASSIM#CFILE_FORMAT_SST", "ASCII"
-                    ):
+                    if schemes["CASSIM_ISBA"] == "INPUT" and nml_settings.sst_ascii:
                         prepare_sst = EcflowSuiteTask(
                             "PrepareSST",
                             initialization,
@@ -716,10 +668,8 @@ class SurfexSuiteDefinition(SuiteDefinition):
                         )
 
                     an_variables = {"t2m": False, "rh2m": False, "sd": False}
-                    obs_types = settings.get_setting("NAM_OBS#COBS_M")
-                    nnco = settings.get_nnco(
-                        config, basetime=as_datetime(cycle["basetime"])
-                    )
+                    obs_types = nml_settings.obs_types
+                    nnco = nml_settings.nnco(basetime)
                     need_obs = False
                     for t_ind, val in enumerate(obs_types):
                         if nnco[t_ind] == 1:
@@ -833,7 +783,7 @@ class SurfexSuiteDefinition(SuiteDefinition):
                     need_lsm = False
                     if schemes["CASSIM_ISBA"] == "OI":
                         need_lsm = True
-                    if settings.setting_is("NAM_ASSIM#LEXTRAP_WATER", True):
+                    if nml_settings.lextrap_water:
                         need_lsm = True
                     if need_lsm:
                         triggers = EcflowSuiteTriggers(fg4oi_complete)
@@ -931,7 +881,6 @@ class SurfexSuiteDefinition(SuiteDefinition):
 
             verification_fam = None
             do_verification = False
-            offline_settings = SettingsFromNamelistAndConfig("offline", config)
             if config["suite_control.do_verification"]:
                 do_verification = False
                 modes = ["cycle"]
@@ -988,8 +937,9 @@ class SurfexSuiteDefinition(SuiteDefinition):
                                 f"offline{extra}.args.output-frequency"
                             ]
                         except KeyError:
+                            offline_nml = nml_settings.offline.nml
                             try:
-                                output_frequency = offline_settings.nml["nam_io_offline"][
+                                output_frequency = offline_nml["nam_io_offline"][
                                     "xtstep_output"
                                 ]
                             except KeyError:
@@ -1006,6 +956,20 @@ class SurfexSuiteDefinition(SuiteDefinition):
                             if mode == "cycle" and self.config["an_forcing.enabled"]:
                                 vbasetime = basetime - forecast_range
                             iso_basetime = vbasetime.isoformat()
+                            if config.get("suite_control.batch_verification", False):
+                                # One task for all variables and lead times
+                                EcflowSuiteTask(
+                                    "HarpSQLiteBatch",
+                                    verification_mode_fam,
+                                    config,
+                                    self.task_settings,
+                                    self.ecf_files,
+                                    input_template=template,
+                                    variables={
+                                        "ARGS": f"mode={mode};basetime={iso_basetime};"
+                                    },
+                                )
+                                continue
                             dt = as_timedelta(f"PT{int(output_frequency)}S")
                             validtime = vbasetime + dt
                             block = 0
@@ -1124,5 +1088,213 @@ class SurfexSuiteDefinition(SuiteDefinition):
             if prediction is not None:
                 prev_prediction = prediction
 
+            if window_continuation and len(cycle_input_nodes) == 1:
+                # Everything after the input waits for the previous cycle
+                previous_index = prediction_trigger_times[c_index]
+                if previous_index != c_index:
+                    window_triggers += [
+                        (node, previous_index)
+                        for node in time_family.ecf_node.nodes
+                        if node.name() not in ("PrepareCycle", "CycleInput")
+                    ]
+
             # For now set do_prep False after for next cycles and do cycling
             self.do_prep = False
+
+        if day_family is not None and self.next_window_basetime is not None:
+            args = ";".join(
+                [
+                    f"next_basetime={self.next_window_basetime.isoformat()}",
+                    f"suite={self.name}",
+                ]
+            )
+            EcflowSuiteTask(
+                "SuiteExtender",
+                day_family,
+                config,
+                self.task_settings,
+                self.ecf_files,
+                trigger=EcflowSuiteTriggers([EcflowSuiteTrigger(cycle_input)]),
+                variables={"ARGS": args},
+                input_template=template,
+            )
+
+        self.add_limits(config, max_tasks)
+        self.suite.ecf_node.add_variable(
+            "MAX_ITERATIONS", str(config.get("suite_control.max_iterations", 1))
+        )
+
+        self.removed_triggers = 0
+        if config.get("suite_control.reduce_triggers", False):
+            self.removed_triggers = reduce_triggers(self.suite.ecf_node)
+        for node, c_index in window_triggers:
+            add_complete_trigger(node, f"/{self.name}/{c_index[:8]}/{c_index[8:]}")
+
+    def add_limits(self, config, max_tasks):
+        """Add the max_tasks limit and the limits of the task classes.
+
+        All tasks are counted in max_tasks. Tasks of a class with a positive
+        value in suite_control.limits are also counted in the limit of the
+        class. If priority classes are set, the other tasks are also counted
+        in a regular_tasks limit, so that a share of max_tasks is reserved for
+        the priority classes. Tasks without a class in LIMIT_CLASSES are in the
+        default class.
+
+        Args:
+            config (ParsedConfig): Parsed configuration
+            max_tasks (int): Maximum number of active tasks
+
+        Raises:
+            ValueError: If a class is unknown
+
+        """
+        suite_node = self.suite.ecf_node
+        suite_node.add_limit(Limit("max_tasks", max_tasks))
+        limits = config.get("suite_control.limits")
+        limits = {} if limits is None else limits.dict()
+        priority_classes = config.get("suite_control.priority_classes", [])
+        for limit_class, value in limits.items():
+            if limit_class not in LIMIT_CLASSES:
+                raise ValueError(f"Unknown limit class {limit_class}")
+            if value > 0:
+                suite_node.add_limit(Limit(f"limit_{limit_class}", value))
+        for limit_class in priority_classes:
+            if limit_class not in LIMIT_CLASSES:
+                raise ValueError(f"Unknown priority class {limit_class}")
+        if len(priority_classes) > 0:
+            share = config.get("suite_control.priority_share", 0.25)
+            reserved = min(max(1, round(max_tasks * share)), max_tasks - 1)
+            suite_node.add_limit(Limit("regular_tasks", max_tasks - reserved))
+
+        suite_node.add_inlimit("max_tasks")
+        unclassified = set()
+        for task in suite_node.get_all_tasks():
+            task_class = TASK_LIMIT_CLASSES.get(task.name(), DEFAULT_LIMIT_CLASS)
+            if task.name() not in TASK_LIMIT_CLASSES:
+                unclassified.add(task.name())
+            if limits.get(task_class, 0) > 0:
+                task.add_inlimit(f"limit_{task_class}")
+            if len(priority_classes) > 0 and task_class not in priority_classes:
+                task.add_inlimit("regular_tasks")
+        if len(unclassified) > 0:
+            logger.info(
+                "Tasks in the {} limit class: {}",
+                DEFAULT_LIMIT_CLASS,
+                sorted(unclassified),
+            )
+
+    def add_compilation(self, config, template):
+        """Add the compilation family.
+
+        Args:
+            config (ParsedConfig): Parsed configuration
+            template (str): Task template
+
+        Returns:
+            EcflowSuiteTrigger: Trigger for completed compilation. None if not built.
+
+        """
+        comp_complete = None
+        if config["compile.build"]:
+            comp = EcflowSuiteFamily("Compilation", self.suite, self.ecf_files)
+            EcflowSuiteTask(
+                "CMakeBuild",
+                comp,
+                config,
+                self.task_settings,
+                self.ecf_files,
+                input_template=template,
+            )
+            comp_complete = EcflowSuiteTrigger(comp, mode="complete")
+        return comp_complete
+
+    def add_static_data(
+        self, config, template, comp_complete, starttime, endtime, cycle_step
+    ):
+        """Add the static data family.
+
+        Args:
+            config (ParsedConfig): Parsed configuration
+            template (str): Task template
+            comp_complete (EcflowSuiteTrigger): Trigger for completed compilation
+            starttime (datetime): Start of the experiment
+            endtime (datetime): End of the experiment
+            cycle_step (timedelta): Time between cycles
+
+        Returns:
+            EcflowSuiteTrigger: Trigger for completed static data. None if not created.
+
+        """
+        static_complete = None
+        triggers = EcflowSuiteTriggers([comp_complete])
+        if config["suite_control.create_static_data"]:
+            static_data = EcflowSuiteFamily(
+                "StaticData", self.suite, self.ecf_files, trigger=triggers
+            )
+
+            pgd_input = EcflowSuiteFamily("PgdInput", static_data, self.ecf_files)
+            EcflowSuiteTask(
+                "Gmted",
+                pgd_input,
+                config,
+                self.task_settings,
+                self.ecf_files,
+                input_template=template,
+                variables=None,
+            )
+
+            EcflowSuiteTask(
+                "Soil",
+                pgd_input,
+                config,
+                self.task_settings,
+                self.ecf_files,
+                input_template=template,
+                variables=None,
+            )
+
+            pgd_trigger = EcflowSuiteTriggers([EcflowSuiteTrigger(pgd_input)])
+            if self.one_decade:
+                pgd_family = EcflowSuiteFamily(
+                    "OfflinePgd",
+                    static_data,
+                    self.ecf_files,
+                    trigger=pgd_trigger,
+                    ecf_files_remotely=self.ecf_files_remotely,
+                )
+                decade_dates = CycleCalendar(
+                    starttime, starttime, endtime, cycle_step
+                ).decade_starts()
+
+                for decade, dec_date in decade_dates.items():
+                    decade_pgd_family = EcflowSuiteFamily(
+                        f"decade_{decade}",
+                        pgd_family,
+                        self.ecf_files,
+                        ecf_files_remotely=self.ecf_files_remotely,
+                    )
+
+                    EcflowSuiteTask(
+                        "OfflinePgd",
+                        decade_pgd_family,
+                        config,
+                        self.task_settings,
+                        self.ecf_files,
+                        input_template=template,
+                        variables={"ARGS": f"basetime={dec_date.isoformat()}"},
+                        ecf_files_remotely=self.ecf_files_remotely,
+                    )
+            else:
+                EcflowSuiteTask(
+                    "OfflinePgd",
+                    static_data,
+                    config,
+                    self.task_settings,
+                    self.ecf_files,
+                    input_template=template,
+                    variables={"ARGS": f"basetime={starttime.isoformat()}"},
+                    trigger=pgd_trigger,
+                    ecf_files_remotely=self.ecf_files_remotely,
+                )
+            static_complete = EcflowSuiteTrigger(static_data)
+        return static_complete
@@ -0,0 +1,310 @@
+"""Reduction of redundant ecflow triggers."""
+import re
+
+from deode.logs import logger
+
+COMPLETE_TERM = re.compile(r"^(/[^\s()=]+)\s*(?:==|eq)\s*complete$")
+
+
+def strip_parentheses(expression):
+    """Remove enclosing parentheses.
+
+    Args:
+        expression (str): Expression
+
+    Returns:
+        str: Expression without enclosing parentheses
+
+    """
+    expression = expression.strip()
+    while expression.startswith("(") and expression.endswith(")"):
+        depth = 0
+        for pos, char in enumerate(expression):
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            if depth == 0 and pos < len(expression) - 1:
+                # The first parenthesis closes before the end
+                return expression
+        expression = expression[1:-1].strip()
+    return expression
+
+
+def split_conjunction(expression):
+    """Split an expression on top level and operators.
+
+    Args:
+        expression (str): Expression
+
+    Returns:
+        list: Terms. None if the expression contains or/not operators.
+
+    """
+    terms = []
+    depth = 0
+    tokens = re.split(r"(\(|\)|\s+and\s+|\s+AND\s+|\s*&&\s*)", expression)
+    current = []
+    for token in tokens:
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        if depth == 0 and token.strip() in ("and", "AND", "&&"):
+            terms.append("".join(current))
+            current = []
+            continue
+        current.append(token)
+    terms.append("".join(current))
+    for term in terms:
+        if re.search(r"(\s|^|\))(or|OR|not|NOT)(\s|$|\()|\|\||!", term):
+            return None
+    return terms
+
+
+def parse_trigger(expression):
+    """Parse a trigger that is a conjunction of complete conditions.
+
+    Args:
+        expression (str): Trigger expression
+
+    Returns:
+        list: Absolute node paths that must be complete. None if the expression
+              is not a conjunction of complete conditions.
+
+    """
+    if expression is None:
+        return None
+    terms = split_conjunction(strip_parentheses(expression))
+    if terms is None:
+        return None
+    paths = []
+    for term in terms:
+        match = COMPLETE_TERM.match(strip_parentheses(term))
+        if match is None:
+            return None
+        path = match.group(1)
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+
+def format_trigger(paths):
+    """Format a conjunction of complete conditions.
+
+    Args:
+        paths (list): Absolute node paths
+
+    Returns:
+        str: Trigger expression
+
+    """
+    return " and ".join(f"({path} == complete)" for path in paths)
+
+
+def add_complete_trigger(node, path):
+    """Add a complete condition to the trigger of a node.
+
+    Args:
+        node (ecflow.Node): Node
+        path (str): Absolute path of the node that must be complete
+
+    """
+    expression = format_trigger([path])
+    trigger = node.get_trigger()
+    if trigger is not None:
+        paths = parse_trigger(trigger.get_expression())
+        if paths is None:
+            expression = f"({trigger.get_expression()}) and {expression}"
+        else:
+            expression = format_trigger([*paths, path])
+        node.delete_trigger()
+    node.add_trigger(expression)
+
+
+class TriggerGraph:
+    """Triggers and the node tree of a suite.
+
+    A node can only run when the triggers of the node and of all its ancestors
+    are complete. A complete node implies that all its children are complete
+    and that these triggers were complete. This does not hold for volatile
+    nodes, which can be requeued or completed without running their children,
+    so their triggers are not used to imply other conditions.
+    """
+
+    def __init__(self, parents, triggers, max_depth=4, volatile=None):
+        """Construct the graph.
+
+        Args:
+            parents (dict): Parent path by node path
+            triggers (dict): Paths in the trigger of each node. None if the
+                             trigger can not be reduced.
+            max_depth (int, optional): Maximum depth of the implication search.
+                                       Defaults to 4.
+            volatile (set, optional): Paths of volatile nodes. Defaults to None.
+
+        """
+        self.parents = parents
+        self.triggers = triggers
+        self.max_depth = max_depth
+        self.volatile = set() if volatile is None else volatile
+
+    def ancestors(self, path):
+        """Ancestors of a node, closest first.
+
+        Args:
+            path (str): Node path
+
+        Returns:
+            list: Ancestor paths
+
+        """
+        ancestors = []
+        parent = self.parents.get(path)
+        while parent is not None:
+            ancestors.append(parent)
+            parent = self.parents.get(parent)
+        return ancestors
+
+    def required(self, path):
+        """Paths that must be complete before a node can run.
+
+        Args:
+            path (str): Node path
+
+        Returns:
+            list: Paths in the triggers of the node and its ancestors
+
+        """
+        required = []
+        for node in [path, *self.ancestors(path)]:
+            required += self.triggers.get(node) or []
+        return required
+
+    def implied(self, sources, target):
+        """Check if the target is complete when all sources are complete.
+
+        Args:
+            sources (list): Paths known to be complete
+            target (str): Path
+
+        Returns:
+            bool: True if the target is implied.
+
+        """
+        if target in self.volatile:
+            # Only a direct condition or a complete ancestor implies the target
+            return any(
+                path == target or target.startswith(f"{path}/") for path in sources
+            )
+        visited = set()
+        frontier = list(sources)
+        for __ in range(self.max_depth + 1):
+            next_frontier = []
+            for path in frontier:
+                if path == target:
+                    return True
+                if path in visited:
+                    continue
+                visited.add(path)
+                if target.startswith(f"{path}/"):
+                    # Complete families have complete children
+                    return True
+                if path not in self.volatile:
+                    next_frontier += self.required(path)
+            frontier = next_frontier
+            if len(frontier) == 0:
+                break
+        return False
+
+    def reduce(self):
+        """Remove redundant paths from the triggers.
+
+        Returns:
+            dict: Reduced triggers of the changed nodes
+
+        """
+        changed = {}
+        for path, terms in self.triggers.items():
+            if terms is None:
+                continue
+            ancestor_terms = []
+            for ancestor in self.ancestors(path):
+                ancestor_terms += self.triggers.get(ancestor) or []
+            kept = list(terms)
+            for term in terms:
+                others = [other for other in kept if other != term]
+                if self.implied(others + ancestor_terms, term):
+                    kept = others
+            if kept != terms:
+                self.triggers[path] = kept
+                changed.update({path: kept})
+        return changed
+
+
+def is_volatile(node):
+    """Check if a node can be complete without its triggers having held.
+
+    Nodes with repeats or time dependencies are requeued, and empty families
+    complete without running anything.
+
+    Args:
+        node (ecflow.Node): Node
+
+    Returns:
+        bool: True if the node is volatile
+
+    """
+    if not node.get_repeat().empty():
+        return True
+    for attributes in (node.crons, node.times, node.todays, node.dates, node.days):
+        if len(list(attributes)) > 0:
+            return True
+    return hasattr(node, "nodes") and len(list(node.nodes)) == 0
+
+
+def reduce_triggers(suite_node, max_depth=4):
+    """Remove redundant triggers from an ecflow suite.
+
+    Volatile nodes and their descendants are not used to imply conditions.
+
+    Args:
+        suite_node (ecflow.Suite): Suite
+        max_depth (int, optional): Maximum depth of the implication search.
+                                   Defaults to 4.
+
+    Returns:
+        int: Number of removed trigger conditions
+
+    """
+    nodes = {}
+    parents = {}
+    triggers = {}
+    volatile = set()
+    for node in suite_node.get_all_nodes():
+        path = node.get_abs_node_path()
+        nodes.update({path: node})
+        parent = node.get_parent()
+        parents.update({path: None if parent is None else parent.get_abs_node_path()})
+        trigger = node.get_trigger()
+        if trigger is not None:
+            triggers.update({path: parse_trigger(trigger.get_expression())})
+        if is_volatile(node):
+            volatile.add(path)
+    volatile = {
+        path
+        for path in nodes
+        if any(path == other or path.startswith(f"{other}/") for other in volatile)
+    }
+
+    graph = TriggerGraph(parents, triggers, max_depth=max_depth, volatile=volatile)
+    original = {path: len(terms) for path, terms in triggers.items() if terms}
+    removed = 0
+    for path, terms in graph.reduce().items():
+        removed += original[path] - len(terms)
+        node = nodes[path]
+        node.delete_trigger()
+        if len(terms) > 0:
+            node.add_trigger(format_trigger(terms))
+    logger.info("Removed {} redundant trigger conditions", removed)
+    return removed
@@ -3,10 +3,12 @@ import os
 import shutil
 
 from deode.logs import logger
-from pysurfex.run import BatchJob
 
+from surfexp.lazy import LazyObject
 from surfexp.tasks.tasks import PySurfexBaseTask
 
+BatchJob = LazyObject("pysurfex.run", "BatchJob")
+
 
 class CMakeBuild(PySurfexBaseTask):
     """Make offline binaries.
@@ -58,11 +60,14 @@ class CMakeBuild(PySurfexBaseTask):
                 f" -DCMAKE_INSTALL_PREFIX={install_dir} -DCONFIG_FILE={cmake_config} "
             )
             cmd = f"cmake {current_project_dir} {cmake_flags}"
-            BatchJob(rte, wrapper=wrapper).run(cmd)
+            with self.timer.phase("external"):
+                BatchJob(rte, wrapper=wrapper).run(cmd)
             cmd = f"cmake --build . -j{nproc} --target gribex"
-            BatchJob(rte, wrapper=wrapper).run(cmd)
+            with self.timer.phase("external"):
+                BatchJob(rte, wrapper=wrapper).run(cmd)
             cmd = "cmake --build . --target install"
-            BatchJob(rte, wrapper=wrapper).run(cmd)
+            with self.timer.phase("external"):
+                BatchJob(rte, wrapper=wrapper).run(cmd)
 
         cmake_flags = " -DCMAKE_BUILD_TYPE=Release "
         cmake_flags += f"{cmake_flags} -DCMAKE_INSTALL_PREFIX={install_dir} "
@@ -72,11 +77,13 @@ class CMakeBuild(PySurfexBaseTask):
         os.chdir(build_dir)
         # Configure
         cmd = f"cmake {offline_source}/src {cmake_flags}"
-        BatchJob(rte, wrapper=wrapper).run(cmd)
+        with self.timer.phase("external"):
+            BatchJob(rte, wrapper=wrapper).run(cmd)
         # Build
         targets = "offline-pgd offline-prep offline-offline offline-soda"
         cmd = f"cmake --build . -- -j{nproc} {targets}"
-        BatchJob(rte, wrapper=wrapper).run(cmd)
+        with self.timer.phase("external"):
+            BatchJob(rte, wrapper=wrapper).run(cmd)
 
         # Manual installation
         programs = ["PGD-offline", "PREP-offline", "OFFLINE-offline", "SODA-offline"]
@@ -5,10 +5,12 @@ import shutil
 
 from deode.datetime_utils import as_timedelta
 from deode.logs import logger
-from pysurfex.run import BatchJob
 
+from surfexp.lazy import LazyObject
 from surfexp.tasks.tasks import PySurfexBaseTask
 
+BatchJob = LazyObject("pysurfex.run", "BatchJob")
+
 
 class FetchMars(PySurfexBaseTask):
     """Fetch mars data.
@@ -96,8 +98,10 @@ class FetchMars(PySurfexBaseTask):
 
         rte = os.environ.copy()
         os.system(f"cat {request_file}")  # noqa S605
-        BatchJob(rte).run(f"mars {request_file}")
-        shutil.move(self.gribfile, self.gribdir)
+        with self.timer.phase("external"):
+            BatchJob(rte).run(f"mars {request_file}")
+        with self.timer.phase("archive"):
+            shutil.move(self.gribfile, self.gribdir)
 
     def split_files(self):
         """Split files."""
@@ -110,7 +114,8 @@ class FetchMars(PySurfexBaseTask):
             )
         logger.info("grib_filter {} {}", rule_file, self.grib_file_with_path)
         rte = os.environ.copy()
-        BatchJob(rte).run(f"grib_filter {rule_file} {self.grib_file_with_path}")
+        with self.timer.phase("external"):
+            BatchJob(rte).run(f"grib_filter {rule_file} {self.grib_file_with_path}")
         rule_file = f"{self.mars_config}_filter2.rule"
         with open(rule_file, mode="w", encoding="utf8") as fhandler:
             fhandler.write(
@@ -134,7 +139,8 @@ class FetchMars(PySurfexBaseTask):
                 + f"{self.basetime.strftime('%Y%m%d%H')}+{ltime:02d}.grib1"
             )
             if os.path.exists(infile):
-                BatchJob(rte).run(f"grib_filter -o {outfile} {rule_file} {infile}")
+                with self.timer.phase("external"):
+                    BatchJob(rte).run(f"grib_filter -o {outfile} {rule_file} {infile}")
             else:
                 raise FileNotFoundError(f"Infile {infile} is missing")
 
@@ -212,7 +218,8 @@ class FetchMarsPrep(PySurfexBaseTask):
 
         rte = os.environ.copy()
         os.system(f"cat {request_file}")  # noqa S605
-        BatchJob(rte).run(f"mars {request_file}")
+        with self.timer.phase("external"):
+            BatchJob(rte).run(f"mars {request_file}")
 
 
 class Request(object):
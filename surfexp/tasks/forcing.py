@@ -1,15 +1,23 @@
 """Forcing task."""
+import contextlib
+import glob
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import timedelta
 
 from deode.datetime_utils import as_timedelta
 from deode.logs import logger
 from deode.os_utils import deodemakedirs
-from pysurfex.cli import create_forcing, cli_modify_forcing
-from pysurfex.verification import concat_datasets, converter2ds
 
+from surfexp.lazy import LazyObject
 from surfexp.tasks.tasks import PySurfexBaseTask
 
+create_forcing = LazyObject("pysurfex.cli", "create_forcing")
+cli_modify_forcing = LazyObject("pysurfex.cli", "cli_modify_forcing")
+concat_datasets = LazyObject("pysurfex.verification", "concat_datasets")
+converter2ds = LazyObject("pysurfex.verification", "converter2ds")
+
 
 class Forcing(PySurfexBaseTask):
     """Create forcing task."""
@@ -48,6 +56,9 @@ class Forcing(PySurfexBaseTask):
     def execute(self):
         """Execute the forcing task.
 
+        The interpolation to the domain is done by create_forcing, which
+        computes it for each call as it does not accept stored weights.
+
         Raises:
             NotImplementedError: _description_
 
@@ -58,11 +69,10 @@ class Forcing(PySurfexBaseTask):
         logger.info("start={} stop={}", dtg_start, dtg_stop)
         forcing_dir = self.config["system.forcing_dir"]
         default_forcing_dir = f"{forcing_dir}/default"
-        forcing_dir = f"{forcing_dir}/{self.mode}"
-        forcing_dir = self.platform.substitute(forcing_dir, basetime=self.basetime)
-        self.exp_file_paths.system_file_paths.update(
-            {"default_forcing_dir": default_forcing_dir}
+        forcing_dir = self.resolve_path(
+            f"forcing_dir/{self.mode}", self.basetime, f"{forcing_dir}/{self.mode}"
         )
+        self.add_system_file_path("default_forcing_dir", default_forcing_dir)
         deodemakedirs(forcing_dir)
 
         cforcing_filetype = self.soda_settings.get_setting(
@@ -80,11 +90,12 @@ class Forcing(PySurfexBaseTask):
         self.args.update({"system-file-paths": self.get_exp_file_paths_file()})
 
         logger.info("args={}", self.args)
+        args = dict(self.args)
+        keys = [key for key, value in args.items() if isinstance(value, str)]
+        values = self.substitute_many([args[key] for key in keys], basetime=self.basetime)
+        args.update(zip(keys, values))
         argv = []
-        for key, lvalue in self.args.items():
-            value = lvalue
-            if isinstance(value, str):
-                value = self.substitute(value, basetime=self.basetime)
+        for key, value in args.items():
             if isinstance(value, bool):
                 if value:
                     argv.append(f"--{key}")
@@ -94,7 +105,9 @@ class Forcing(PySurfexBaseTask):
 
         argv += [dtg_start, dtg_stop]
         logger.info("argv={}", " ".join(argv))
-        create_forcing(argv=argv)
+        with self.timer.phase("external"):
+            create_forcing(argv=argv)
+        self.register_artifact(output, kind="forcing")
 
 
 class ModifyForcing(PySurfexBaseTask):
@@ -124,8 +137,9 @@ class ModifyForcing(PySurfexBaseTask):
         logger.debug("modify forcing dtg={} dtg_prev={}", self.basetime, dtg_prev)
         forcing_dir = self.config["system.forcing_dir"]
         forcing_dir = f"{forcing_dir}/{self.mode}"
-        input_dir = self.platform.substitute(forcing_dir, basetime=dtg_prev)
-        output_dir = self.platform.substitute(forcing_dir, basetime=self.basetime)
+        kind = f"forcing_dir/{self.mode}"
+        input_dir = self.resolve_path(kind, dtg_prev, forcing_dir)
+        output_dir = self.resolve_path(kind, self.basetime, forcing_dir)
         input_file = input_dir + "/FORCING.nc"
         output_file = output_dir + "/FORCING.nc"
         time_step = int(self.fcint.total_seconds()/3600)
@@ -139,17 +153,219 @@ class ModifyForcing(PySurfexBaseTask):
             str(time_step),
         ]
         argv = argv + self.variables
-        if os.path.exists(output_file) and os.path.exists(input_file):
-            cli_modify_forcing(argv=argv)
+        if self.artifact_exists(output_file, kind="forcing") and self.artifact_exists(
+            input_file, kind="forcing"
+        ):
+            with self.timer.phase("external"):
+                cli_modify_forcing(argv=argv)
         else:
             logger.info("Output or input is missing: {}", output_file)
 
 
+INTERPOLATE2GRID_MAPPING = {
+    "surface_geopotential": {"indicatorOfParameter": 129},
+    "air_temperature_2m": {"indicatorOfParameter": 167},
+    "dew_point_temperature_2m": {"indicatorOfParameter": 168},
+    "surface_air_pressure": {"indicatorOfParameter": 134},
+    "x_wind_10m": {"indicatorOfParameter": 165},
+    "y_wind_10m": {"indicatorOfParameter": 166},
+    "precipitation_amount_acc": {
+        "indicatorOfParameter": 228,
+        "timeRangeIndicator": 4,
+    },
+    "snowfall_amount_acc": {"indicatorOfParameter": 144, "timeRangeIndicator": 4},
+    "integral_of_surface_downwelling_shortwave_flux_in_air_wrt_time": {
+        "indicatorOfParameter": 169,
+        "timeRangeIndicator": 4,
+    },
+    "integral_of_surface_downwelling_longwave_flux_in_air_wrt_time": {
+        "indicatorOfParameter": 175,
+        "timeRangeIndicator": 4,
+    },
+}
+
+
+def variable_file(ncdir, mode, var, basetime, leadtime):
+    """Get the interpolated file of one variable and lead time.
+
+    Args:
+        ncdir (str): Directory of the grib input and the netcdf output
+        mode (str): Forcing mode
+        var (str): Variable name
+        basetime (datetime): Base time
+        leadtime (int): Lead time in hours
+
+    Returns:
+        str: File name
+
+    """
+    return f"{ncdir}/{mode}/{var}_{basetime.strftime('%Y%m%d%H')}+{leadtime:02d}.nc"
+
+
+def step_file(ncdir, mode, mars_config, basetime, leadtime):
+    """Get the file with all interpolated variables of a lead time.
+
+    Args:
+        ncdir (str): Directory of the grib input and the netcdf output
+        mode (str): Forcing mode
+        mars_config (str): Mars configuration name of the input
+        basetime (datetime): Base time
+        leadtime (int): Lead time in hours
+
+    Returns:
+        str: File name
+
+    """
+    return (
+        f"{ncdir}/{mode}/{mars_config}_{basetime.strftime('%Y%m%d%H')}+{leadtime:02d}.nc"
+    )
+
+
+def tmp_file(filename):
+    """Get a temporary file to write before moving it in place.
+
+    Args:
+        filename (str): Final file name
+
+    Returns:
+        str: Temporary file name in the same directory
+
+    """
+    return f"{os.path.dirname(filename)}/tmp{os.getpid()}_{os.path.basename(filename)}"
+
+
+def remove_tmp_files(filename):
+    """Remove temporary files of a file left by interrupted processes.
+
+    Args:
+        filename (str): Final file name
+
+    """
+    basename = os.path.basename(filename)
+    pattern = re.compile(rf"tmp\d+_{re.escape(basename)}")
+    for tmp_filename in glob.glob(f"{os.path.dirname(filename)}/tmp*_{basename}"):
+        if pattern.fullmatch(os.path.basename(tmp_filename)):
+            logger.info("Remove stale temporary file {}", tmp_filename)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_filename)
+
+
+def move_in_place(tmp_filename, filename):
+    """Move a completed temporary file in place.
+
+    Args:
+        tmp_filename (str): Temporary file
+        filename (str): Final file
+
+    """
+    if os.path.exists(tmp_filename):
+        os.replace(tmp_filename, filename)
+
+
+def convert_variable(domain_file, ncdir, mode, mars_config, basetime, leadtime, var):
+    """Interpolate one forcing variable of one lead time to the domain.
+
+    Existing output is kept, so a rerun only converts missing files.
+
+    Args:
+        domain_file (str): Domain file
+        ncdir (str): Directory of the grib input and the netcdf output
+        mode (str): Forcing mode
+        mars_config (str): Mars configuration name of the input
+        basetime (datetime): Base time
+        leadtime (int): Lead time in hours
+        var (str): Variable name in INTERPOLATE2GRID_MAPPING
+
+    Returns:
+        str: Output file
+
+    """
+    output = variable_file(ncdir, mode, var, basetime, leadtime)
+    if os.path.exists(output):
+        logger.info("Keep existing {}", output)
+        return output
+
+    mapping = INTERPOLATE2GRID_MAPPING[var]
+    time_range_indicator = mapping.get("timeRangeIndicator", 0)
+    indicator_of_parameter = mapping["indicatorOfParameter"]
+    validtime = basetime + timedelta(hours=leadtime)
+    input_file = (
+        f"{ncdir}/{mode}/{mars_config}_{basetime.strftime('%Y%m%d%H')}+@LL@.grib1"
+    )
+    remove_tmp_files(output)
+    tmp_output = tmp_file(output)
+    argv = [
+        "-g",
+        domain_file,
+        "--output",
+        tmp_output,
+        "--inputfile",
+        input_file,
+        "--inputtype",
+        "grib1",
+        "--indicatorOfParameter",
+        f"{indicator_of_parameter}",
+        "--levelType",
+        "1",
+        "--level",
+        "0",
+        "--timeRangeIndicator",
+        f"{time_range_indicator}",
+        "--out-variable",
+        var,
+        "--basetime",
+        basetime.strftime("%Y%m%d%H"),
+        "--validtime",
+        validtime.strftime("%Y%m%d%H"),
+        "--fcint", "86400",
+    ]
+    logger.info("converter2ds {}", " ".join(argv))
+    try:
+        converter2ds(argv=argv)
+        move_in_place(tmp_output, output)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_output)
+    return output
+
+
+def concat_step(ncdir, mode, mars_config, basetime, leadtime):
+    """Concatenate the interpolated variables of one lead time.
+
+    Args:
+        ncdir (str): Directory of the grib input and the netcdf output
+        mode (str): Forcing mode
+        mars_config (str): Mars configuration name of the input
+        basetime (datetime): Base time
+        leadtime (int): Lead time in hours
+
+    Returns:
+        str: Output file
+
+    """
+    output = step_file(ncdir, mode, mars_config, basetime, leadtime)
+    remove_tmp_files(output)
+    tmp_output = tmp_file(output)
+    argv = ["-o", tmp_output] + [
+        variable_file(ncdir, mode, var, basetime, leadtime)
+        for var in INTERPOLATE2GRID_MAPPING
+    ]
+    try:
+        concat_datasets(argv=argv)
+        move_in_place(tmp_output, output)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_output)
+    return output
+
+
 class Interpolate2grid(PySurfexBaseTask):
-    """Create modify forcing task."""
+    """Interpolate grib forcing input to the domain."""
 
     def __init__(self, config):
-        """Construct modify forcing task.
+        """Construct the Interpolate2grid task.
+
+        Without a step argument all steps of the cycle are processed.
 
         Args:
             config (ParsedObject): Parsed configuration
@@ -160,7 +376,7 @@ class Interpolate2grid(PySurfexBaseTask):
             self.steps = [int(self.config["task.args.step"])]
         except KeyError:
             fc_length = int(int(self.fcint.total_seconds()) / 3600)
-            self.steps = range(fc_length)
+            self.steps = range(fc_length + 1)
         try:
             self.mode = self.config["task.args.mode"]
         except KeyError:
@@ -169,96 +385,78 @@ class Interpolate2grid(PySurfexBaseTask):
             self.basetime = self.basetime - self.fcint
         self.mars_config = self.config[f"mars.{self.mode}.config"]
 
+    def run_units(self, function, units):
+        """Run units of work, in a process pool if the task has several processes.
+
+        Args:
+            function (callable): Module level function called with each unit
+            units (dict): Arguments of the function by unit
+
+        Returns:
+            dict: Error message by failed unit
+
+        """
+        failed = {}
+        nproc = min(self.get_nproc(), len(units))
+        if nproc <= 1:
+            for unit, args in units.items():
+                try:
+                    function(*args)
+                except Exception as exc:  # noqa: BLE001
+                    logger.error("{} failed: {}", unit, exc)
+                    failed.update({unit: str(exc)})
+            return failed
+
+        logger.info("Run {} units with {} processes", len(units), nproc)
+        with ProcessPoolExecutor(max_workers=nproc) as executor:
+            futures = {
+                executor.submit(function, *args): unit for unit, args in units.items()
+            }
+            for future in as_completed(futures):
+                unit = futures[future]
+                try:
+                    logger.info("Finished {}: {}", unit, future.result())
+                except Exception as exc:  # noqa: BLE001
+                    logger.error("{} failed: {}", unit, exc)
+                    failed.update({unit: str(exc)})
+        return failed
+
     def execute(self):
-        """Execute."""
-        variables = [
-            "surface_geopotential",
-            "air_temperature_2m",
-            "dew_point_temperature_2m",
-            "surface_air_pressure",
-            "x_wind_10m",
-            "y_wind_10m",
-            "precipitation_amount_acc",
-            "snowfall_amount_acc",
-            "integral_of_surface_downwelling_shortwave_flux_in_air_wrt_time",
-            "integral_of_surface_downwelling_longwave_flux_in_air_wrt_time",
-        ]
+        """Execute.
+
+        The (lead time, variable) conversions run in parallel, followed by
+        the concatenation of each lead time. Existing output is kept.
+        converter2ds interpolates every conversion from the grib grid itself,
+        so weights can not be shared between the units.
 
+        Raises:
+            RuntimeError: If units of work failed
+
+        """
         ncdir = f"{self.platform.get_system_value('casedir')}/grib"
-        gribdir = ncdir
-
-        mapping = {
-            "surface_geopotential": {"indicatorOfParameter": 129},
-            "air_temperature_2m": {"indicatorOfParameter": 167},
-            "dew_point_temperature_2m": {"indicatorOfParameter": 168},
-            "surface_air_pressure": {"indicatorOfParameter": 134},
-            "x_wind_10m": {"indicatorOfParameter": 165},
-            "y_wind_10m": {"indicatorOfParameter": 166},
-            "precipitation_amount_acc": {
-                "indicatorOfParameter": 228,
-                "timeRangeIndicator": 4,
-            },
-            "snowfall_amount_acc": {"indicatorOfParameter": 144, "timeRangeIndicator": 4},
-            "integral_of_surface_downwelling_shortwave_flux_in_air_wrt_time": {
-                "indicatorOfParameter": 169,
-                "timeRangeIndicator": 4,
-            },
-            "integral_of_surface_downwelling_longwave_flux_in_air_wrt_time": {
-                "indicatorOfParameter": 175,
-                "timeRangeIndicator": 4,
-            },
+        args = (self.domain_file, ncdir, self.mode, self.mars_config, self.basetime)
+        steps = [
+            leadtime
+            for leadtime in self.steps
+            if not os.path.exists(step_file(*args[1:], leadtime))
+        ]
+        units = {
+            (leadtime, var): (*args, leadtime, var)
+            for leadtime in steps
+            for var in INTERPOLATE2GRID_MAPPING
         }
-
-        for leadtime in self.steps:
-            validtime = self.basetime + timedelta(hours=leadtime)
-            validtime = validtime.strftime("%Y%m%d%H")
-            ofiles = []
-            for var in variables:
-                try:
-                    time_range_indicator = mapping[var]["timeRangeIndicator"]
-                except KeyError:
-                    time_range_indicator = 0
-                indicator_of_parameter = mapping[var]["indicatorOfParameter"]
-                output = (
-                    f"{ncdir}/{self.mode}/{var}_"
-                    + f"{self.basetime.strftime('%Y%m%d%H')}+{leadtime:02d}.nc"
-                )
-                input_file = (
-                    f"{gribdir}/{self.mode}/{self.mars_config}_"
-                    + f"{self.basetime.strftime('%Y%m%d%H')}+@LL@.grib1"
-                )
-                ofiles.append(output)
-                argv = [
-                    "-g",
-                    self.domain_file,
-                    "--output",
-                    output,
-                    "--inputfile",
-                    input_file,
-                    "--inputtype",
-                    "grib1",
-                    "--indicatorOfParameter",
-                    f"{indicator_of_parameter}",
-                    "--levelType",
-                    "1",
-                    "--level",
-                    "0",
-                    "--timeRangeIndicator",
-                    f"{time_range_indicator}",
-                    "--out-variable",
-                    var,
-                    "--basetime",
-                    self.basetime.strftime("%Y%m%d%H"),
-                    "--validtime",
-                    validtime,
-                    "--fcint", "86400",
-                ]
-                logger.info("converter2ds {}", " ".join(argv))
-                converter2ds(argv=argv)
-
-            argv = [
-                "-o",
-                f"{ncdir}/{self.mode}/{self.mars_config}_{self.basetime.strftime('%Y%m%d%H')}+{leadtime:02d}.nc",
-            ]
-            argv = argv + ofiles
-            concat_datasets(argv=argv)
+        with self.timer.phase("external"):
+            failed = self.run_units(convert_variable, units)
+            failed_steps = {leadtime for leadtime, __ in failed}
+            concat_units = {
+                (leadtime, "concat"): (*args[1:], leadtime)
+                for leadtime in steps
+                if leadtime not in failed_steps
+            }
+            failed.update(self.run_units(concat_step, concat_units))
+        if len(failed) > 0:
+            for (leadtime, var), error in sorted(failed.items()):
+                logger.error("Lead time {} {} failed: {}", leadtime, var, error)
+            raise RuntimeError(
+                f"Interpolate2grid failed for {len(failed)} units: {sorted(failed)}"
+            )
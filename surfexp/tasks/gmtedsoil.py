@@ -4,22 +4,23 @@ import os
 import shutil
 import sys
 
-import netCDF4
 from deode.geo_utils import Projection, Projstring
 from deode.logs import logger
 from deode.os_utils import Search, deodemakedirs
-from deode.tasks.base import Task
 
-try:
-    from osgeo import gdal
-except ImportError as error:
-    MSG = "Cannot use the installed gdal library, "
-    MSG += "or there is no gdal library installed. "
-    MSG += "If you have not installed it, you may want to try running"
-    MSG += " 'pip install pygdal==\"`gdal-config --version`.*\"' "
-    MSG += "or, if you use conda,"
-    MSG += " 'conda install -c conda-forge gdal'."
-    raise ImportError(MSG) from error
+from surfexp.lazy import LazyModule
+from surfexp.tasks.tasks import PySurfexBaseTask
+
+MSG = "Cannot use the installed gdal library, "
+MSG += "or there is no gdal library installed. "
+MSG += "If you have not installed it, you may want to try running"
+MSG += " 'pip install pygdal==\"`gdal-config --version`.*\"' "
+MSG += "or, if you use conda,"
+MSG += " 'conda install -c conda-forge gdal'."
+
+# GDAL and netCDF4 are slow to import and only needed when the tasks run
+gdal = LazyModule("osgeo.gdal", error_message=MSG)
+netCDF4 = LazyModule("netCDF4")
 
 
 def modify_ncfile(ncfile, var_name, fact=1):
@@ -42,7 +43,7 @@ def modify_ncfile(ncfile, var_name, fact=1):
     nc[var_name].setncattr("multitype", 0)
 
 
-class Gmted(Task):
+class Gmted(PySurfexBaseTask):
     """GMTED."""
 
     def __init__(self, config):
@@ -55,7 +56,7 @@ class Gmted(Task):
         """
         self.domain = self.get_domain_properties(config)
 
-        Task.__init__(self, config, "Gmted")
+        PySurfexBaseTask.__init__(self, config, "Gmted")
 
         self.gmted2010_path = self.fmanager.platform.get_platform_value(
             "gmted2010_data_path"
@@ -264,7 +265,8 @@ class Gmted(Task):
                 modify_ncfile(output, "ZS")
         elif fmt == "direct":
             Gmted.tif2bin(gd, "gmted_mea075.bin")
-            shutil.move("gmted_mea075.bin", f"{climdir}/gmted2010.dir")
+            with self.timer.phase("archive"):
+                shutil.move("gmted_mea075.bin", f"{climdir}/gmted2010.dir")
 
             # Get number of rows and columns
             hdr_rows = gd.RasterYSize
@@ -286,7 +288,7 @@ class Gmted(Task):
             )
 
 
-class Soil(Task):
+class Soil(PySurfexBaseTask):
     """Prepare soil data task for PGD."""
 
     def __init__(self, config):
@@ -299,7 +301,7 @@ class Soil(Task):
         """
         self.domain = self.get_domain_properties(config)
 
-        Task.__init__(self, config, "Soil")
+        PySurfexBaseTask.__init__(self, config, "Soil")
         logger.debug("Constructed Soil task")
 
     def get_domain_properties(self, config) -> dict:
@@ -0,0 +1,107 @@
+"""Tasks managing the running suite."""
+import os
+
+from deode.datetime_utils import as_datetime
+from deode.logs import logger
+from ecflow import Client
+
+from surfexp.suites.offline import SurfexSuiteDefinition
+from surfexp.tasks.tasks import PySurfexBaseTask
+
+
+def is_complete(node):
+    """Check if an ecflow node is complete.
+
+    Args:
+        node (ecflow.Node): Node
+
+    Returns:
+        bool: True if the node is complete
+
+    """
+    return str(node.get_state()) == "complete"
+
+
+class SuiteExtender(PySurfexBaseTask):
+    """Extend a windowed suite.
+
+    The task runs when the input of the last cycle of a window is complete, so
+    that the input of the next window is prepared ahead like within a window.
+    The next window of days is generated and added to the running suite.
+    Completed days before the day of this task are deleted from the suite.
+    """
+
+    def __init__(self, config):
+        """Construct the SuiteExtender task.
+
+        Args:
+            config (ParsedObject): Parsed configuration
+
+        """
+        PySurfexBaseTask.__init__(self, config, "SuiteExtender")
+        self.next_basetime = as_datetime(self.config["task.args.next_basetime"])
+        self.suite_name = self.config["task.args.suite"]
+
+    def get_client(self):
+        """Get a client for the ecflow server running the suite.
+
+        Returns:
+            ecflow.Client: Client
+
+        """
+        host = os.environ.get(
+            "ECF_HOST", self.config.get("scheduler.ecfvars.ecf_host", "localhost")
+        )
+        port = os.environ.get(
+            "ECF_PORT", self.config.get("scheduler.ecfvars.ecf_port", "3141")
+        )
+        return Client(host, str(port))
+
+    def generate_window(self):
+        """Generate the suite definition of the next window.
+
+        Returns:
+            tuple: Definition file and the names of the generated days
+
+        """
+        update = {
+            "general": {"times": {"basetime": self.next_basetime.isoformat()}},
+            "suite_control": {"do_prep": False, "window_continuation": True},
+        }
+        config = self.config.copy(update=update)
+        suite = SurfexSuiteDefinition(config)
+        os.makedirs(self.wrk, exist_ok=True)
+        defs_file = f"{self.wrk}/{self.suite_name}_{self.next_basetime:%Y%m%d%H%M}.def"
+        suite.save_as_defs(defs_file)
+        return defs_file, suite.day_names
+
+    def prune(self, client):
+        """Delete completed days before the day of this task.
+
+        Args:
+            client (ecflow.Client): Client
+
+        """
+        current_day = self.cycle_basetime.strftime("%Y%m%d")
+        client.sync_local()
+        suite = client.get_defs().find_suite(self.suite_name)
+        if suite is None:
+            logger.warning("Suite {} not found on the server", self.suite_name)
+            return
+        for node in list(suite.nodes):
+            name = node.name()
+            if not (len(name) == 8 and name.isdigit()) or name >= current_day:
+                continue
+            if is_complete(node):
+                logger.info("Delete completed day {}", node.get_abs_node_path())
+                client.delete(node.get_abs_node_path(), True)
+
+    def execute(self):
+        """Execute."""
+        defs_file, day_names = self.generate_window()
+        client = self.get_client()
+        for day in day_names:
+            path = f"/{self.suite_name}/{day}"
+            logger.info("Add {} from {}", path, defs_file)
+            client.replace(path, defs_file, True, False)
+        self.prune(client)
@@ -1,15 +1,27 @@
 """Tasks running surfex binaries."""
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from deode.datetime_utils import as_datetime, as_timedelta, get_decade
+from deode.datetime_utils import as_datetime, as_timedelta
 from deode.logs import logger
 from deode.namelist import NamelistGenerator
 from deode.os_utils import deodemakedirs
-from pysurfex.cli import offline, perturbed_offline, pgd, prep, soda
 
-from surfexp.experiment import SettingsFromNamelistAndConfig, check_consistency
+from surfexp.experiment import (
+    SettingsFromNamelistAndConfig,
+    ensure_consistency,
+    get_perturbations,
+)
+from surfexp.lazy import LazyObject
 from surfexp.tasks.tasks import PySurfexBaseTask
 
+offline = LazyObject("pysurfex.cli", "offline")
+perturbed_offline = LazyObject("pysurfex.cli", "perturbed_offline")
+pgd = LazyObject("pysurfex.cli", "pgd")
+prep = LazyObject("pysurfex.cli", "prep")
+soda = LazyObject("pysurfex.cli", "soda")
+
 
 class SurfexBinaryTask(PySurfexBaseTask):
     """Task."""
@@ -24,24 +36,90 @@ class SurfexBinaryTask(PySurfexBaseTask):
         """
         PySurfexBaseTask.__init__(self, config, name)
         self.one_decade = self.config["pgd.one_decade"]
-        check_consistency(self.config)
+        ensure_consistency(self.config)
+
+    def execute(self):
+        """Execute."""
+        raise NotImplementedError
 
-    def get_pgdfile(self, basetime):
-        """Get path to PGD file. Take decade into account.
+    def get_perturbed_shared(self, nml_file, settings, wrapper):
+        """Get the perturbed_offline arguments shared by all perturbations.
 
         Args:
-            basetime (as_datetime): Basetime
+            nml_file (str): Namelist file
+            settings (SettingsFromNamelistAndConfig): Offline settings
+            wrapper (str): Wrapper of the binary
 
         Returns:
-            str: Path to PGD fil
+            dict: Shared arguments
+
         """
-        decade = f"_{get_decade(as_datetime(basetime))}" if self.one_decade else ""
-        pgdfile = f"{self.climdir}/PGD{decade}{self.suffix}"
-        return pgdfile
+        # Forcing dir is for previous cycle
+        # TODO If perturbed runs moved to pp it should be a diffenent dtg
+        forcing_dir = self.config["system.forcing_dir"]
+        return {
+            "system_file_paths": self.get_exp_file_paths_file(),
+            "namelist": nml_file,
+            "csurffile": settings.get_setting("NAM_IO_OFFLINE#CSURFFILE"),
+            "pgd": f"{self.get_pgdfile(self.basetime)}",
+            "binary": self.get_binary("OFFLINE"),
+            "archive": f"{self.platform.get_system_value('archive_dir')}",
+            "prep": self.get_forecast_start_file(self.fg_basetime, "perturbed"),
+            "forcing_dir": self.resolve_path(
+                "forcing_dir/default", self.fg_basetime, f"{forcing_dir}/default"
+            ),
+            "wrapper": wrapper,
+        }
+
+    def get_perturbed_argv(self, shared, pert, negpert, args):
+        """Get the perturbed_offline arguments of a perturbation.
 
-    def execute(self):
-        """Execute."""
-        raise NotImplementedError
+        Args:
+            shared (dict): Arguments shared by all perturbations
+            pert (str): Perturbation number
+            negpert (bool): Negative perturbation
+            args (dict): Extra arguments from the config
+
+        Returns:
+            list: Arguments
+
+        """
+        argv = [
+            "--system-file-paths",
+            shared["system_file_paths"],
+            "--pgd",
+            shared["pgd"],
+            "--prep",
+            shared["prep"],
+            "--basetime",
+            self.basetime.strftime("%Y%m%d%H"),
+            "--namelist-path",
+            shared["namelist"],
+            "--input-binary-data",
+            self.input_definition,
+            "--forcing-dir",
+            shared["forcing_dir"],
+            "--binary",
+            shared["binary"],
+            "--pert",
+            pert,
+            "--wrapper",
+            shared["wrapper"],
+            "--output",
+            f"{shared['archive']}/{shared['csurffile']}_PERT{pert}{self.suffix}",
+        ]
+        if negpert:
+            argv += ["--negpert"]
+        for key, val in args.items():
+            if f"--{key}" not in argv:
+                if isinstance(val, bool):
+                    if val:
+                        argv += [f"--{key}"]
+                else:
+                    argv += [f"--{key}", val]
+            else:
+                logger.warning("setting {} can not be overriden", key)
+        return argv
 
 
 class OfflinePgd(SurfexBinaryTask):
@@ -116,7 +194,9 @@ class OfflinePgd(SurfexBinaryTask):
 
         # Run PGD
         logger.info("argv={}", argv)
-        pgd(argv=argv)
+        with self.timer.phase("external"):
+            pgd(argv=argv)
+        self.register_artifact(output, kind="pgd")
         self.archive_logs(["OPTIONS.nam", "LISTING_PGD.txt"], target=self.climdir)
 
 
@@ -161,7 +241,7 @@ class OfflinePrep(SurfexBinaryTask):
 
         archive = self.platform.get_system_value("archive_dir")
         output = (
-            f"{self.platform.substitute(archive, basetime=self.basetime)}/{cprepfile}"
+            f"{self.resolve_path('archive_dir', self.basetime, archive)}/{cprepfile}"
         )
 
         # PREP arguments output
@@ -197,7 +277,9 @@ class OfflinePrep(SurfexBinaryTask):
 
         # Run PREP
         logger.info("argv={}", " ".join(argv))
-        prep(argv=argv)
+        with self.timer.phase("external"):
+            prep(argv=argv)
+        self.register_artifact(output, kind="prep")
         self.archive_logs(["OPTIONS.nam", "LISTING_PREP0.txt"])
 
 
@@ -258,7 +340,7 @@ class OfflineForecast(SurfexBinaryTask):
 
         pgd_file_path = f"{self.get_pgdfile(self.basetime)}"
         archive_path = f"{self.archive_path}"
-        archive = self.platform.substitute(archive_path, basetime=self.basetime)
+        archive = self.resolve_path("archive_dir", self.basetime, archive_path)
         if self.mode == "forecast":
             archive = f"{archive}/forecast/"
 
@@ -306,8 +388,11 @@ class OfflineForecast(SurfexBinaryTask):
 
         # Forcing dir
         forcing_dir = self.config["system.forcing_dir"]
-        forcing_dir = f"{forcing_dir}/{self.forcing_type}"
-        forcing_dir = self.platform.substitute(forcing_dir, basetime=self.basetime)
+        forcing_dir = self.resolve_path(
+            f"forcing_dir/{self.forcing_type}",
+            self.basetime,
+            f"{forcing_dir}/{self.forcing_type}",
+        )
 
         # Offline arguments output
         argv = [
@@ -347,7 +432,9 @@ class OfflineForecast(SurfexBinaryTask):
             argv += ["--output-frequency", str(self.fcint.total_seconds())]
 
         # Run Offline
-        offline(argv=argv)
+        with self.timer.phase("external"):
+            offline(argv=argv)
+        self.register_artifact(output, kind="offline")
 
 
 class PerturbedRun(SurfexBinaryTask):
@@ -396,59 +483,121 @@ class PerturbedRun(SurfexBinaryTask):
         settings = SettingsFromNamelistAndConfig("offline", self.config)
         settings.nam_gen.write(nml_file)
 
-        csurffile = settings.get_setting("NAM_IO_OFFLINE#CSURFFILE")
-        pgd_file_path = f"{self.get_pgdfile(self.basetime)}"
-        binary = self.get_binary("OFFLINE")
+        # Offline arguments output
+        shared = self.get_perturbed_shared(nml_file, settings, self.wrapper)
+        argv = self.get_perturbed_argv(shared, str(self.pert), self.negpert, self.args)
 
-        archive = f"{self.platform.get_system_value('archive_dir')}"
-        prepfile = self.get_forecast_start_file(self.fg_basetime, "perturbed")
-        output = f"{archive}/{csurffile}_PERT{self.pert!s}{self.suffix}"
+        # Run Offline
+        with self.timer.phase("external"):
+            perturbed_offline(argv=argv)
 
-        # Forcing dir is for previous cycle
-        # TODO If perturbed runs moved to pp it should be a diffenent dtg
-        forcing_dir = self.config["system.forcing_dir"]
-        forcing_dir = f"{forcing_dir}/default"
-        forcing_dir = self.platform.substitute(forcing_dir, basetime=self.fg_basetime)
 
-        # Offline arguments output
-        argv = [
-            "--system-file-paths",
-            self.get_exp_file_paths_file(),
-            "--pgd",
-            pgd_file_path,
-            "--prep",
-            prepfile,
-            "--basetime",
-            self.basetime.strftime("%Y%m%d%H"),
-            "--namelist-path",
-            nml_file,
-            "--input-binary-data",
-            self.input_definition,
-            "--forcing-dir",
-            forcing_dir,
-            "--binary",
-            binary,
-            "--pert",
-            self.pert,
-            "--wrapper",
-            self.wrapper,
-            "--output",
-            output,
-        ]
-        if self.negpert:
-            argv += ["--negpert"]
-        for key, val in self.args.items():
-            if f"--{key}" not in argv:
-                if isinstance(val, bool):
-                    if val:
-                        argv += [f"--{key}"]
-                else:
-                    argv += [f"--{key}", val]
-            else:
-                logger.warning("setting {} can not be overriden", key)
+def run_perturbation(workdir, argv):
+    """Run one perturbed offline forecast in its own work directory.
 
-        # Run Offline
+    Args:
+        workdir (str): Work directory of the member
+        argv (list): Arguments for perturbed_offline
+
+    Returns:
+        str: Work directory
+
+    """
+    cwd = os.getcwd()
+    deodemakedirs(workdir)
+    os.chdir(workdir)
+    try:
         perturbed_offline(argv=argv)
+    finally:
+        os.chdir(cwd)
+    return workdir
+
+
+class PerturbedRuns(SurfexBinaryTask):
+    """Run all perturbed forecasts of a cycle in one task.
+
+    The namelist and the input files are prepared once. The members run in a
+    process pool sized from the processor layout, each in its own work
+    directory. With more than one process, the members run without the task
+    wrapper, so that the pool does not start one MPI job per member on the
+    resources of the task, and a warning is logged if a wrapper is set. Set the
+    processor layout to one process to run the members with the wrapper.
+    """
+
+    def __init__(self, config):
+        """Construct the perturbed runs task.
+
+        Args:
+            config (ParsedObject): Parsed configuration
+
+        """
+        SurfexBinaryTask.__init__(self, config, __class__.__name__)
+        self.mode = "perturbed"
+        try:
+            self.args = self.config[f"{self.mode}.args"]
+        except KeyError:
+            self.args = {}
+        try:
+            self.wrapper = f"{self.config['submission.task.wrapper']}"
+        except KeyError:
+            self.wrapper = ""
+        self.perturbations = get_perturbations(
+            self.soda_settings.get_setting("NAM_VAR#NNCV"),
+            self.soda_settings.get_setting("NAM_VAR#CVAR_M"),
+            self.soda_settings.get_setting("NAM_ASSIM#LLINCHECK"),
+        )
+
+    def execute(self):
+        """Execute."""
+        deodemakedirs(self.wrk)
+        nml_file = f"{self.wrk}/OPTIONS_input.nam"
+        settings = SettingsFromNamelistAndConfig("offline", self.config)
+        settings.nam_gen.write(nml_file)
+
+        nproc = min(self.get_nproc(), len(self.perturbations))
+        wrapper = self.wrapper
+        if nproc > 1 and wrapper != "":
+            logger.warning("Pooled perturbations run without the wrapper '{}'", wrapper)
+            wrapper = ""
+        shared = self.get_perturbed_shared(nml_file, settings, wrapper)
+        members = {}
+        for perturbation in self.perturbations:
+            workdir = f"{self.wrk}/pert{perturbation['pert']}"
+            argv = self.get_perturbed_argv(
+                shared,
+                str(perturbation["pert"]),
+                perturbation["pert_sign"] == "neg",
+                self.args,
+            )
+            members.update({workdir: argv})
+
+        failed = []
+        with self.timer.phase("external"):
+            if nproc <= 1:
+                for workdir, argv in members.items():
+                    try:
+                        run_perturbation(workdir, argv)
+                    except Exception as exc:  # noqa: BLE001
+                        logger.error("Perturbation in {} failed: {}", workdir, exc)
+                        failed.append(workdir)
+            else:
+                logger.info("Run {} perturbations with {} processes", len(members), nproc)
+                with ProcessPoolExecutor(max_workers=nproc) as executor:
+                    futures = {
+                        executor.submit(run_perturbation, workdir, argv): workdir
+                        for workdir, argv in members.items()
+                    }
+                    for future in as_completed(futures):
+                        try:
+                            future.result()
+                        except Exception as exc:  # noqa: BLE001
+                            workdir = futures[future]
+                            logger.error("Perturbation in {} failed: {}", workdir, exc)
+                            failed.append(workdir)
+        if len(failed) > 0:
+            raise RuntimeError(f"Perturbed runs failed: {sorted(failed)}")
+        for argv in members.values():
+            self.register_artifact(argv[argv.index("--output") + 1], kind="offline")
 
 
 class Soda(SurfexBinaryTask):
@@ -498,12 +647,12 @@ class Soda(SurfexBinaryTask):
         if cassim_isba == "EKF":
             # TODO If pertubed runs moved to pp it should be a diffenent dtg
             archive_dir = self.config["system.archive_dir"]
-            pert_run_dir = self.platform.substitute(archive_dir, basetime=self.basetime)
-            self.exp_file_paths.add_system_file_path("perturbed_run_dir", pert_run_dir)
-            first_guess_dir = self.platform.substitute(
-                archive_dir, basetime=self.fg_basetime
+            pert_run_dir = self.resolve_path("archive_dir", self.basetime, archive_dir)
+            self.add_system_file_path("perturbed_run_dir", pert_run_dir)
+            first_guess_dir = self.resolve_path(
+                "archive_dir", self.fg_basetime, archive_dir
             )
-            self.exp_file_paths.add_system_file_path("first_guess_dir", first_guess_dir)
+            self.add_system_file_path("first_guess_dir", first_guess_dir)
 
         # Soda arguments output
         argv = [
@@ -537,4 +686,6 @@ class Soda(SurfexBinaryTask):
                 logger.warning("setting {} can not be overriden", key)
 
         # Run Soda
-        soda(argv=argv)
+        with self.timer.phase("external"):
+            soda(argv=argv)
+        self.register_artifact(output, kind="soda")
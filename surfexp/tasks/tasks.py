@@ -4,44 +4,201 @@ import contextlib
 import json
 import os
 import shutil
+from functools import cached_property
 
 from deode.datetime_utils import as_datetime, as_timedelta, get_decade
 from deode.logs import InterceptHandler, logger
 from deode.logs import builtin_logging as logging
 from deode.os_utils import deodemakedirs
 from deode.tasks.base import Task
-from pysurfex.cli import (
-    cli_oi2soda,
-    cryoclim_pseudoobs,
-    first_guess_for_oi,
-    gridpp,
-    qc2obsmon,
-    titan,
+
+from surfexp.archive_index import ArchiveIndex
+from surfexp.cache import fingerprint
+from surfexp.experiment import (
+    SettingsFromNamelistAndConfig,
+    get_verification_leadtimes,
+)
+from surfexp.harp import merge_sqlite
+from surfexp.lazy import LazyObject
+from surfexp.manifest import CycleManifest
+from surfexp.substitution import TemplateEngine
+from surfexp.timing import PhaseTimer, write_prometheus_textfile, write_record
+
+cli_oi2soda = LazyObject("pysurfex.cli", "cli_oi2soda")
+cryoclim_pseudoobs = LazyObject("pysurfex.cli", "cryoclim_pseudoobs")
+first_guess_for_oi = LazyObject("pysurfex.cli", "first_guess_for_oi")
+gridpp = LazyObject("pysurfex.cli", "gridpp")
+qc2obsmon = LazyObject("pysurfex.cli", "qc2obsmon")
+titan = LazyObject("pysurfex.cli", "titan")
+ConfProj = LazyObject("pysurfex.geo", "ConfProj")
+SystemFilePaths = LazyObject("pysurfex.platform_deps", "SystemFilePaths")
+BatchJob = LazyObject("pysurfex.run", "BatchJob")
+converter2harp_cli = LazyObject("pysurfex.verification", "converter2harp_cli")
+converter2harp = LazyObject("pysurfex.verification", "converter2harp")
+parse_args_converter2harp = LazyObject(
+    "pysurfex.verification", "parse_args_converter2harp"
 )
-from pysurfex.geo import ConfProj
-from pysurfex.platform_deps import SystemFilePaths
-from pysurfex.run import BatchJob
-from pysurfex.verification import converter2harp_cli
+get_multi_converters = LazyObject("pysurfex.read", "get_multi_converters")
+Cache = LazyObject("pysurfex.cache", "Cache")
+
+
+class LazyAttribute(cached_property):
+    """Task attribute computed on first access.
 
-from surfexp.experiment import SettingsFromNamelistAndConfig
+    The name of the attribute is recorded in the lazy_attributes_used list of
+    the instance and the optional lazy_attribute_hook of the instance is called.
+    """
+
+    def __get__(self, instance, owner=None):
+        """Compute the attribute and record the access."""
+        if instance is not None and self.attrname not in instance.__dict__:
+            instance.__dict__.setdefault("lazy_attributes_used", []).append(
+                self.attrname
+            )
+            hook = getattr(type(instance), "lazy_attribute_hook", None)
+            if hook is not None:
+                hook(instance, self.attrname)
+        return super().__get__(instance, owner)
 
 
 class PySurfexBaseTask(Task):
     """Base task class for pysurfex-experiment."""
 
+    # Optional callable(task, attribute_name) called on first access of lazy attributes
+    lazy_attribute_hook = None
+    # Tasks that manage the work directory themselves run execute() without Task.run
+    use_work_directory = True
+
     def __init__(self, config, name):
         """Construct pysurfex-experiment base class.
 
+        Most attributes are computed lazily on first access.
+
         Args:
         -------------------------------------------
             config (ParsedConfig): Configuration.
             name (str): Task name.
 
         """
+        self.timer = PhaseTimer()
+        self.lazy_attributes_used = []
         Task.__init__(self, config, name)
         logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
 
-        # Domain/geo
+        self.basetime = as_datetime(self.config["general.times.basetime"])
+        # Basetime of the cycle. Tasks might modify self.basetime
+        self.cycle_basetime = self.basetime
+        self.archive_path = self.config["system.archive_dir"]
+
+        self.translation = {
+            "t2m": "air_temperature_2m",
+            "rh2m": "relative_humidity_2m",
+            "sd": "surface_snow_thickness",
+        }
+
+        self.fgint = as_timedelta(self.config["general.times.cycle_length"])
+        self.fcint = as_timedelta(self.config["general.times.cycle_length"])
+        self.fg_basetime = self.basetime - self.fgint
+        self.next_dtg = self.basetime + self.fcint
+        self.next_dtgpp = self.next_dtg
+
+    def run(self):
+        """Run the task and report which lazy attributes were used and the timing."""
+        self.timer.stop("init")
+        status = "aborted"
+        try:
+            with self.timer.phase("run"):
+                if self.use_work_directory:
+                    Task.run(self)
+                else:
+                    self.execute()
+            status = "complete"
+        finally:
+            logger.debug(
+                "Lazy attributes used by {}: {}", self.name, self.lazy_attributes_used
+            )
+            self.write_timing(status)
+
+    def archive_logs(self, *args, **kwargs):
+        """Archive logs and time it as part of the archive phase.
+
+        Args:
+            args (tuple): Positional arguments to Task.archive_logs
+            kwargs (dict): Keyword arguments to Task.archive_logs
+
+        Returns:
+            any: Return value of Task.archive_logs
+
+        """
+        with self.timer.phase("archive"):
+            return Task.archive_logs(self, *args, **kwargs)
+
+    def timing_record(self, status):
+        """Create the timing record of the task.
+
+        The argv phase is the time of the run that is not spent in external
+        calls or archiving, i.e. mainly setting up namelists and arguments.
+
+        Args:
+            status (str): Task status
+
+        Returns:
+            dict: Timing record
+
+        """
+        phases = self.timer.phases
+        run = phases.get("run", 0.0)
+        external = phases.get("external", 0.0)
+        archive = phases.get("archive", 0.0)
+        phases = {
+            "init": phases.get("init", 0.0),
+            "argv": max(run - external - archive, 0.0),
+            "external": external,
+            "archive": archive,
+            "total": phases.get("init", 0.0) + run,
+        }
+        try:
+            args = self.config["task.args"].dict()
+        except (KeyError, AttributeError):
+            args = {}
+        return self.timer.record(
+            phases=phases,
+            task=self.name,
+            basetime=self.cycle_basetime.isoformat(),
+            args=args,
+            status=status,
+        )
+
+    def write_timing(self, status):
+        """Write the timing record of the task.
+
+        Args:
+            status (str): Task status
+
+        """
+        if not self.config.get("timing.enabled", False):
+            return
+        record = self.timing_record(status)
+        logger.info("Timing of {}: {}", self.name, record["phases"])
+        metrics_dir = self.config.get("timing.metrics_dir", "")
+        try:
+            if metrics_dir == "":
+                metrics_dir = f"{self.casedir}/metrics/task_timing"
+            else:
+                metrics_dir = self.platform.substitute(
+                    metrics_dir, basetime=self.cycle_basetime
+                )
+            cycle = self.cycle_basetime.strftime("%Y%m%d%H")
+            write_record(f"{metrics_dir}/{cycle}", record)
+            prometheus_dir = self.config.get("timing.prometheus_dir", "")
+            if prometheus_dir != "":
+                write_prometheus_textfile(prometheus_dir, record)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Could not write timing of {}: {}", self.name, exc)
+
+    @LazyAttribute
+    def geo(self):
+        """Domain geometry."""
         conf_proj = {
             "nam_conf_proj_grid": {
                 "nimax": self.config["domain.nimax"],
@@ -58,46 +215,208 @@ class PySurfexBaseTask(Task):
                 "xlat0": self.config["domain.xlat0"],
             },
         }
-
-        self.geo = ConfProj(conf_proj)
-        self.climdir = self.platform.get_system_value("climdir")
-        deodemakedirs(self.climdir)
-        domain_json = self.geo.json
-        domain_json.update({"nam_pgd_grid": {"cgrid": "CONF PROJ"}})
-        self.domain_file = f"{self.climdir}/domain.json"
-        if not os.path.exists(self.domain_file):
-            with open(self.domain_file, mode="w", encoding="utf-8") as file_handler:
+        return ConfProj(conf_proj)
+
+    @LazyAttribute
+    def climdir(self):
+        """Climate directory."""
+        climdir = self.cycle_manifest.get("climdir")
+        if climdir is None:
+            climdir = self.platform.get_system_value("climdir")
+        deodemakedirs(climdir)
+        return climdir
+
+    @LazyAttribute
+    def domain_file(self):
+        """Domain json file. Created if it does not exist."""
+        domain_file = f"{self.climdir}/domain.json"
+        if not os.path.exists(domain_file):
+            domain_json = self.geo.json
+            domain_json.update({"nam_pgd_grid": {"cgrid": "CONF PROJ"}})
+            with open(domain_file, mode="w", encoding="utf-8") as file_handler:
                 json.dump(domain_json, file_handler, indent=2)
-        self.basetime = as_datetime(self.config["general.times.basetime"])
+        return domain_file
+
+    @LazyAttribute
+    def casedir(self):
+        """Case directory."""
         casedir = self.config["system.casedir"]
-        self.casedir = self.platform.substitute(casedir, basetime=self.basetime)
-        self.archive = self.platform.get_system_value("archive")
-        self.archive_path = self.config["system.archive_dir"]
+        return self.platform.substitute(casedir, basetime=self.cycle_basetime)
+
+    @LazyAttribute
+    def cycle_manifest(self):
+        """Resolved paths of the cycle written by PrepareCycle."""
+        if not self.config.get("suite_control.cycle_manifest", True):
+            return CycleManifest()
+        filename = CycleManifest.get_filename(
+            f"{self.casedir}/manifests", self.cycle_basetime
+        )
+        return CycleManifest.load(filename, fingerprint=self.manifest_fingerprint())
 
-        self.translation = {
-            "t2m": "air_temperature_2m",
-            "rh2m": "relative_humidity_2m",
-            "sd": "surface_snow_thickness",
-        }
+    def manifest_fingerprint(self):
+        """Fingerprint of the config used to resolve the manifest paths.
+
+        Returns:
+            str: Fingerprint
 
-        # Namelist settings
-        self.soda_settings = SettingsFromNamelistAndConfig("soda", config)
-        self.suffix = (
-            f'.{self.soda_settings.get_setting("NAM_IO_OFFLINE#CSURF_FILETYPE").lower()}'
+        """
+        return fingerprint(
+            {
+                "system": self.config["system"].dict(),
+                "platform": self.config["platform"].dict(),
+                "cycle_length": self.config["general.times.cycle_length"],
+                "one_decade": self.config["pgd.one_decade"],
+            }
         )
-        self.obs_types = self.soda_settings.get_setting("NAM_OBS#COBS_M", default=[])
-        self.nnco = self.soda_settings.get_nnco(self.config, basetime=self.basetime)
-        logger.debug("NNCO: {}", self.nnco)
 
-        self.fgint = as_timedelta(self.config["general.times.cycle_length"])
-        self.fcint = as_timedelta(self.config["general.times.cycle_length"])
-        self.fg_basetime = self.basetime - self.fgint
-        self.next_dtg = self.basetime + self.fcint
-        self.next_dtgpp = self.next_dtg
+    def resolve_path(self, kind, basetime, pattern):
+        """Resolve a path from the cycle manifest or by substitution.
 
-        # Binary input data
-        self.input_definition = self.platform.get_system_value("sfx_input_definition")
-        # Create PySurfex system paths
+        Args:
+            kind (str): Kind of path in the manifest
+            basetime (datetime): Basetime
+            pattern (str): Pattern to substitute if not in the manifest
+
+        Returns:
+            str: Resolved path
+
+        """
+        path = self.cycle_manifest.get(kind, basetime)
+        if path is None:
+            path = self.platform.substitute(pattern, basetime=basetime)
+        return path
+
+    def create_cycle_manifest(self):
+        """Resolve the paths used by the tasks of the cycle.
+
+        Returns:
+            CycleManifest: The manifest
+
+        """
+        manifest = CycleManifest(fingerprint=self.manifest_fingerprint())
+        # Resolve everything by substitution
+        self.cycle_manifest = CycleManifest()
+        archive_dir = self.config["system.archive_dir"]
+        forcing_dir = self.config["system.forcing_dir"]
+        obs_dir = self.config["system.obs_dir"]
+        for basetime in [self.cycle_basetime, self.cycle_basetime - self.fcint]:
+            manifest.add(
+                "archive_dir",
+                basetime,
+                self.resolve_path("archive_dir", basetime, archive_dir),
+            )
+            manifest.add(
+                "obs_dir", basetime, self.resolve_path("obs_dir", basetime, obs_dir)
+            )
+            for mode in ["default", "an_forcing", "forecast"]:
+                kind = f"forcing_dir/{mode}"
+                manifest.add(
+                    kind,
+                    basetime,
+                    self.resolve_path(kind, basetime, f"{forcing_dir}/{mode}"),
+                )
+            manifest.add("pgd_stem", basetime, self.get_pgd_stem(basetime))
+        fg_dir = self.platform.substitute(
+            archive_dir,
+            basetime=self.cycle_basetime - self.fcint,
+            validtime=self.cycle_basetime,
+        )
+        manifest.add("first_guess_dir", self.cycle_basetime, fg_dir)
+        manifest.add("climdir", None, self.climdir)
+        self.cycle_manifest = manifest
+        return manifest
+
+    @LazyAttribute
+    def archive_index(self):
+        """Index of produced artifacts. None if disabled."""
+        if not self.config.get("archive_index.enabled", True):
+            return None
+        return ArchiveIndex(f"{self.casedir}/archive_index.sqlite")
+
+    def artifact_exists(self, path, kind=""):
+        """Check if an artifact exists using the archive index.
+
+        Args:
+            path (str): File name
+            kind (str, optional): Kind of artifact. Defaults to "".
+
+        Returns:
+            bool: True if the file exists.
+
+        """
+        if self.archive_index is None:
+            return os.path.exists(path)
+        return self.archive_index.exists(path, kind=kind)
+
+    def register_artifact(self, path, kind=""):
+        """Register a produced artifact in the archive index.
+
+        Args:
+            path (str): File name
+            kind (str, optional): Kind of artifact. Defaults to "".
+
+        """
+        if self.archive_index is not None:
+            self.archive_index.register(path, kind=kind)
+
+    def get_nproc(self):
+        """Number of processes from the processor layout of the task.
+
+        The task exception is used if set, otherwise the submission type
+        listing the task.
+
+        Returns:
+            int: Number of processes. Defaults to 1.
+
+        """
+        nproc = self.config.get(f"submission.task_exceptions.{self.name}.NPROC")
+        if nproc is None:
+            types = self.config.get("submission.types")
+            types = {} if types is None else types.dict()
+            for settings in types.values():
+                if self.name in settings.get("tasks", []) and "NPROC" in settings:
+                    nproc = settings["NPROC"]
+                    break
+        if nproc is None:
+            return 1
+        return max(1, int(nproc))
+
+    @LazyAttribute
+    def archive(self):
+        """Archive directory."""
+        return self.platform.get_system_value("archive")
+
+    @LazyAttribute
+    def soda_settings(self):
+        """Namelist settings for soda."""
+        return SettingsFromNamelistAndConfig("soda", self.config)
+
+    @LazyAttribute
+    def suffix(self):
+        """Suffix of surfex files."""
+        filetype = self.soda_settings.get_setting("NAM_IO_OFFLINE#CSURF_FILETYPE")
+        return f".{filetype.lower()}"
+
+    @LazyAttribute
+    def obs_types(self):
+        """Observation types."""
+        return self.soda_settings.get_setting("NAM_OBS#COBS_M", default=[])
+
+    @LazyAttribute
+    def nnco(self):
+        """Active observations for the cycle."""
+        nnco = self.soda_settings.get_nnco(self.config, basetime=self.cycle_basetime)
+        logger.debug("NNCO: {}", nnco)
+        return nnco
+
+    @LazyAttribute
+    def input_definition(self):
+        """Binary input data definition."""
+        return self.platform.get_system_value("sfx_input_definition")
+
+    @LazyAttribute
+    def exp_file_paths(self):
+        """PySurfex system paths."""
         system_paths = self.config["system"].dict()
         platform_paths = self.config["platform"].dict()
         exp_file_paths = {}
@@ -109,7 +428,7 @@ class PySurfexBaseTask(Task):
             lkey = self.platform.substitute(key)
             lval = self.platform.substitute(val)
             exp_file_paths.update({lkey: lval})
-        self.exp_file_paths = SystemFilePaths(exp_file_paths)
+        return SystemFilePaths(exp_file_paths)
 
     def get_exp_file_paths_file(self):
         """Get exp file paths."""
@@ -117,25 +436,52 @@ class PySurfexBaseTask(Task):
         self.exp_file_paths.save_as(exp_file_paths_file)
         return exp_file_paths_file
 
+    @LazyAttribute
+    def template_engine(self):
+        """Compiled substitution engine for the system file paths."""
+        return TemplateEngine(
+            self.exp_file_paths.system_file_paths,
+            one_decade=self.config["pgd.one_decade"],
+        )
+
+    def add_system_file_path(self, key, value):
+        """Add or update a system file path.
+
+        Args:
+            key (str): Key
+            value (str): Path
+
+        """
+        self.exp_file_paths.system_file_paths.update({key: value})
+        self.__dict__.pop("template_engine", None)
+
     def substitute(self, pattern, basetime=None, micro="@"):
         """Substitute value."""
-        logger.debug("pattern in {}", pattern)
-        fpattern = pattern
-        for key, val in self.exp_file_paths.system_file_paths.items():
-            logger.debug("key: {} val={}", key, val)
-            if isinstance(key, str) and isinstance(val, str):
-                fpattern = fpattern.replace(f"{micro}{key.upper()}{micro}", val)
-                fpattern = fpattern.replace(f"{micro}{key.lower()}{micro}", val)
-
-        if isinstance(fpattern, str) and basetime is not None:
-            decade_key = "decade"
-            decade_val = get_decade(basetime) if self.config["pgd.one_decade"] else ""
-            logger.debug("decade key={} val={}", decade_key, decade_val)
-            fpattern = fpattern.replace(f"{micro}{decade_key.upper()}{micro}", decade_val)
-            fpattern = fpattern.replace(f"{micro}{decade_key.lower()}{micro}", decade_val)
-        logger.debug("pattern out {}", fpattern)
+        if micro == "@":
+            engine = self.template_engine
+        else:
+            engine = TemplateEngine(
+                self.exp_file_paths.system_file_paths,
+                micro=micro,
+                one_decade=self.config["pgd.one_decade"],
+            )
+        fpattern = engine.render(pattern, basetime=basetime)
+        logger.debug("pattern in {} out {}", pattern, fpattern)
         return fpattern
 
+    def substitute_many(self, patterns, basetime=None):
+        """Substitute many patterns for the same basetime.
+
+        Args:
+            patterns (list): Patterns
+            basetime (datetime, optional): Basetime. Defaults to None.
+
+        Returns:
+            list: Substituted patterns
+
+        """
+        return self.template_engine.render_many(patterns, basetime=basetime)
+
     def get_binary(self, binary):
         """Determine binary path from task or system config section.
 
@@ -163,16 +509,44 @@ class PySurfexBaseTask(Task):
 
         bin_paths = [f"{bindir_system}/{binary}-offline", f"{bindir_system}/{binary}"]
         for bin_path in bin_paths:
-            if os.path.exists(bin_path):
+            if self.artifact_exists(bin_path, kind="binary"):
                 return bin_path
 
         bin_path = f"{bindir}/{binary}"
         try:
-            if os.path.exists(bin_path):
+            if self.artifact_exists(bin_path, kind="binary"):
                 return bin_path
         except FileNotFoundError:
             raise RuntimeError from FileNotFoundError
 
+    def get_pgd_stem(self, basetime):
+        """Get path to PGD file without suffix. Take decade into account.
+
+        Args:
+            basetime (as_datetime): Basetime
+
+        Returns:
+            str: Path to PGD file without suffix
+        """
+        pgd_stem = self.cycle_manifest.get("pgd_stem", basetime)
+        if pgd_stem is None:
+            decade = ""
+            if self.config["pgd.one_decade"]:
+                decade = f"_{get_decade(as_datetime(basetime))}"
+            pgd_stem = f"{self.climdir}/PGD{decade}"
+        return pgd_stem
+
+    def get_pgdfile(self, basetime):
+        """Get path to PGD file. Take decade into account.
+
+        Args:
+            basetime (as_datetime): Basetime
+
+        Returns:
+            str: Path to PGD file
+        """
+        return f"{self.get_pgd_stem(basetime)}{self.suffix}"
+
     def get_first_guess(self, basetime):
         """Get first guess.
 
@@ -189,10 +563,12 @@ class PySurfexBaseTask(Task):
         fcint = as_timedelta(self.config["general.times.cycle_length"])
         fg_basetime = basetime - fcint
         logger.debug("DTG: {} BASEDTG: {}", basetime, fg_basetime)
-        fg_dir = self.config["system.archive_dir"]
-        fg_dir = self.platform.substitute(
-            fg_dir, basetime=fg_basetime, validtime=basetime
-        )
+        fg_dir = self.cycle_manifest.get("first_guess_dir", basetime)
+        if fg_dir is None:
+            fg_dir = self.config["system.archive_dir"]
+            fg_dir = self.platform.substitute(
+                fg_dir, basetime=fg_basetime, validtime=basetime
+            )
         fg_file = f"{fg_dir}/{firstguess}"
 
         logger.info("Use first guess: {}", fg_file)
@@ -211,9 +587,9 @@ class PySurfexBaseTask(Task):
         """
         csurffile = self.soda_settings.get_setting("NAM_IO_OFFLINE#CSURFFILE")
         archive_dir = self.config["system.archive_dir"]
-        archive = self.platform.substitute(archive_dir, basetime=basetime)
-        fg_archive = self.platform.substitute(
-            archive_dir, basetime=(basetime - self.fcint)
+        archive = self.resolve_path("archive_dir", basetime, archive_dir)
+        fg_archive = self.resolve_path(
+            "archive_dir", basetime - self.fcint, archive_dir
         )
         csurffile = f"{fg_archive}/{csurffile}{self.suffix}"
         analysis = f"{archive}/ANALYSIS{self.suffix}"
@@ -232,12 +608,12 @@ class PySurfexBaseTask(Task):
                 "NAM_IO_OFFLINE#CPREPFILE", default="PREP"
             )
             prep_file = f"{archive}/{cprepfile}{self.suffix}"
-            if os.path.exists(prep_file):
+            if self.artifact_exists(prep_file, kind="prep"):
                 logger.info("Found PREP file {}", prep_file)
                 return prep_file
             raise FileNotFoundError(prep_file)
         for fname in [analysis, csurffile]:
-            if os.path.exists(fname):
+            if self.artifact_exists(fname):
                 logger.info("Using {} as initial conditions", fname)
                 return fname
             logger.warning("Could not find possible initial condition {}", fname)
@@ -247,7 +623,8 @@ class PySurfexBaseTask(Task):
 class PrepareCycle(PySurfexBaseTask):
     """Prepare for th cycle to be run.
 
-    Clean up existing directories.
+    Clean up existing directories. The work directory is removed, so the task
+    does not run in it.
 
     Args:
     -----------------------------------
@@ -255,6 +632,8 @@ class PrepareCycle(PySurfexBaseTask):
 
     """
 
+    use_work_directory = False
+
     def __init__(self, config):
         """Construct the PrepareCycle task.
 
@@ -265,14 +644,15 @@ class PrepareCycle(PySurfexBaseTask):
         """
         PySurfexBaseTask.__init__(self, config, "PrepareCycle")
 
-    def run(self):
-        """Override run."""
-        self.execute()
-
     def execute(self):
         """Execute."""
         if os.path.exists(self.wrk):
             shutil.rmtree(self.wrk)
+        if self.config.get("suite_control.cycle_manifest", True):
+            filename = CycleManifest.get_filename(
+                f"{self.casedir}/manifests", self.cycle_basetime
+            )
+            self.create_cycle_manifest().save(filename)
 
 
 class QualityControl(PySurfexBaseTask):
@@ -536,7 +916,8 @@ class QualityControl(PySurfexBaseTask):
 
         tests = list(tests)
         argv += tests
-        titan(argv)
+        with self.timer.phase("external"):
+            titan(argv)
 
 
 class OptimalInterpolation(PySurfexBaseTask):
@@ -659,7 +1040,8 @@ class OptimalInterpolation(PySurfexBaseTask):
             argv += ["--only_diff"]
         if os.path.exists(output_file):
             os.unlink(output_file)
-        gridpp(argv)
+        with self.timer.phase("external"):
+            gridpp(argv)
 
 
 class CryoClim2json(PySurfexBaseTask):
@@ -753,7 +1135,8 @@ class CryoClim2json(PySurfexBaseTask):
             "-it",
             "surfex",
         ]
-        cryoclim_pseudoobs(argv)
+        with self.timer.phase("external"):
+            cryoclim_pseudoobs(argv)
 
 
 class Oi2soda(PySurfexBaseTask):
@@ -854,7 +1237,8 @@ class Oi2soda(PySurfexBaseTask):
         logger.info("rh2m {}", rh2m)
         logger.info("sd   {}", s_d)
         logger.debug("Write to {}", output)
-        cli_oi2soda(argv)
+        with self.timer.phase("external"):
+            cli_oi2soda(argv)
 
 
 class Qc2obsmon(PySurfexBaseTask):
@@ -950,7 +1334,8 @@ class Qc2obsmon(PySurfexBaseTask):
                 output,
             ]
             argv += [self.basetime.strftime("%Y%m%d%H"), var_name, q_c]
-            qc2obsmon(argv)
+            with self.timer.phase("external"):
+                qc2obsmon(argv)
 
 
 class FirstGuess4OI(PySurfexBaseTask):
@@ -989,7 +1374,12 @@ class FirstGuess4OI(PySurfexBaseTask):
         logger.info("validtime: {}", self.validtime)
 
     def execute(self):
-        """Execute."""
+        """Execute.
+
+        The first guess tool of pysurfex interpolates the input to the domain
+        on every call. It takes no precomputed weights.
+
+        """
         extra = ""
         symlink_files = {}
         archive = self.config["system.archive_dir"]
@@ -1053,23 +1443,30 @@ class FirstGuess4OI(PySurfexBaseTask):
             "--debug",
         ]
 
+        prev_basetime = self.basetime - self.fcint
+        engine = TemplateEngine(
+            {
+                "BASETIME": self.basetime.strftime("%Y%m%d%H"),
+                "FG_BASETIME": prev_basetime.strftime("%Y%m%d%H"),
+                "VALIDTIME": self.validtime.strftime("%Y%m%d%H"),
+                "DECADE": get_decade(prev_basetime),
+            },
+            case_insensitive=False,
+        )
+        exp_file_paths_file = self.get_exp_file_paths_file()
         for __, var in enumerate(raw_vars):
-            argv += [f"--{var}-system-file-paths", self.get_exp_file_paths_file()]
+            argv += [f"--{var}-system-file-paths", exp_file_paths_file]
             settings = self.config[f"initial_conditions.fg4oi.{self.mode}.{var}"]
             for setting, lval in settings.items():
                 val = lval
                 if isinstance(val, str):
-                    prev_basetime = self.basetime - self.fcint
-                    val = val.replace("@BASETIME@", self.basetime.strftime("%Y%m%d%H"))
-                    val = val.replace("@FG_BASETIME@", prev_basetime.strftime("%Y%m%d%H"))
-                    val = val.replace("@VALIDTIME@", self.validtime.strftime("%Y%m%d%H"))
-                    val = val.replace("@DECADE@", get_decade(prev_basetime))
-                    val = [val]
+                    val = [engine.render(val)]
                 val = list(val)
                 argv += [f"--{var}-{setting}", *val]
 
         logger.info("argv: {}", str(argv))
-        first_guess_for_oi(argv)
+        with self.timer.phase("external"):
+            first_guess_for_oi(argv)
 
         # Create symlinks
         for target, linkfile in symlink_files.items():
@@ -1179,7 +1576,8 @@ class FetchMarsObs(PySurfexBaseTask):
         try:
             batch = BatchJob(os.environ)
             logger.info("Running {}", cmd)
-            batch.run(cmd)
+            with self.timer.phase("external"):
+                batch.run(cmd)
         except RuntimeError as exc:
             raise RuntimeError from exc
 
@@ -1207,14 +1605,18 @@ class HarpSQLite(PySurfexBaseTask):
             self.var_name = self.config["task.args.var_name"]
         except KeyError:
             raise RuntimeError("Var name is needed") from KeyError
-        try:
-            self.basetime = as_datetime(self.config["task.args.basetime"])
-        except KeyError:
-            raise RuntimeError("Basetime is needed") from KeyError
-        try:
-            self.validtime = as_datetime(self.config["task.args.validtime"])
-        except KeyError:
-            raise RuntimeError("Validtime is needed") from KeyError
+        # Compact suites only give the lead time relative to the cycle
+        basetime = self.config.get("task.args.basetime")
+        self.basetime = self.cycle_basetime if basetime is None else as_datetime(basetime)
+        validtime = self.config.get("task.args.validtime")
+        if validtime is not None:
+            self.validtime = as_datetime(validtime)
+        else:
+            try:
+                leadtime = int(self.config["task.args.leadtime"])
+            except KeyError:
+                raise RuntimeError("Validtime or leadtime is needed") from KeyError
+            self.validtime = self.basetime + as_timedelta(f"PT{leadtime}S")
         try:
             mode = self.config["task.args.mode"]
         except KeyError:
@@ -1284,7 +1686,185 @@ class HarpSQLite(PySurfexBaseTask):
             basetime,
         ]
         logger.info("Args: {}", " ".join(argv))
-        converter2harp_cli(argv=argv)
+        with self.timer.phase("external"):
+            converter2harp_cli(argv=argv)
+
+
+class CachedConverter:
+    """Converter reading through a shared pysurfex cache."""
+
+    def __init__(self, converter, cache):
+        """Construct the cached converter.
+
+        Args:
+            converter (pysurfex.read.Converter): Converter
+            cache (pysurfex.cache.Cache): Shared cache
+
+        """
+        self.converter = converter
+        self.cache = cache
+
+    def __getattr__(self, name):
+        """Get the attributes of the converter."""
+        return getattr(self.converter, name)
+
+    def read_time_step(self, geo, validtime, cache=None):  # noqa ARG002
+        """Read a time step using the shared cache.
+
+        Args:
+            geo (pysurfex.geo.Geo): Geometry
+            validtime (datetime): Valid time
+            cache (pysurfex.cache.Cache, optional): Ignored. Defaults to None.
+
+        Returns:
+            np.ndarray: Field
+
+        """
+        return self.converter.read_time_step(geo, validtime, self.cache)
+
+
+def converter2harp_cached(argv, cache):
+    """Extract a variable for HARP reading the input through a cache.
+
+    converter2harp_cli reads without a cache and opens the input file for each
+    variable. With a shared cache the file handler and the interpolator of an
+    input file are created once and reused for all its variables.
+
+    Args:
+        argv (list): Arguments of converter2harp_cli
+        cache (pysurfex.cache.Cache): Shared cache
+
+    """
+    parser, kwargs = parse_args_converter2harp(argv)
+    converter = get_multi_converters(parser, [], argv)
+    converter2harp(CachedConverter(converter, cache), **kwargs)
+
+
+class HarpSQLiteBatch(PySurfexBaseTask):
+    """Extract all verification variables and lead times of a mode for HARP.
+
+    Each SURFOUT file is opened once and all variables are read from it.
+    The output is written to local SQLite files first, and these are merged into
+    the shared SQLite files at the end.
+    """
+
+    def __init__(self, config):
+        """Construct the HarpSQLiteBatch task.
+
+        Args:
+            config (ParsedObject): Parsed configuration
+
+        """
+        PySurfexBaseTask.__init__(self, config, "HarpSQLiteBatch")
+
+        try:
+            self.mode = self.config["task.args.mode"]
+        except KeyError:
+            raise RuntimeError("Mode is needed") from KeyError
+        basetime = self.config.get("task.args.basetime")
+        if basetime is not None:
+            self.basetime = as_datetime(basetime)
+        elif self.mode == "cycle" and self.config["an_forcing.enabled"]:
+            self.basetime = self.basetime - self.fcint
+        self.var_names = list(
+            self.config.get(f"verification.{self.mode}.variables", [])
+        )
+        self.leadtimes = get_verification_leadtimes(self.config, self.mode)
+        self.harp_params = {}
+        for var_name in self.var_names:
+            try:
+                harp_param = self.config[
+                    f"verification.{self.mode}.{var_name}.harp_param"
+                ]
+                harp_param_unit = self.config[
+                    f"verification.{self.mode}.{var_name}.harp_param_unit"
+                ]
+            except KeyError:
+                raise RuntimeError(
+                    f"harp_param and harp_param_unit are needed for {var_name}"
+                ) from KeyError
+            self.harp_params.update({var_name: (harp_param, harp_param_unit)})
+
+        self.model = self.platform.substitute(
+            self.config["extractsqlite.sqlite_model_name"]
+        )
+        self.stationlist_file = self.platform.substitute(
+            self.config["extractsqlite.station_list"]
+        )
+        self.sqlite_path = self.platform.substitute(
+            self.config["extractsqlite.sqlite_path"]
+        )
+        self.sqlite_template = self.platform.substitute(
+            self.config["extractsqlite.sqlite_template"]
+        )
+
+    def get_input(self, validtime):
+        """Get the SURFOUT file of a valid time.
+
+        Args:
+            validtime (datetime): Valid time
+
+        Returns:
+            str: File name
+
+        """
+        archive = self.platform.substitute(
+            self.config["system.archive_dir"],
+            basetime=self.basetime,
+            validtime=validtime,
+        )
+        if self.mode == "forecast":
+            archive = f"{archive}/forecast/"
+        input_pattern = f"{archive}/SURFOUT.@YYYY_LL@@MM_LL@@DD_LL@_@HH_LL@h00.nc"
+        return self.substitute(input_pattern)
+
+    def execute(self):
+        """Execute."""
+        local_path = f"{self.wrk}/harp_sqlite"
+        if os.path.exists(local_path):
+            shutil.rmtree(local_path)
+        deodemakedirs(local_path)
+
+        basetime = self.basetime.strftime("%Y%m%d%H")
+        for leadtime in self.leadtimes:
+            validtime = self.basetime + as_timedelta(f"PT{leadtime}S")
+            input_file = self.get_input(validtime)
+            logger.info("Extract {} variables from {}", len(self.var_names), input_file)
+            cache = Cache(3600)
+            for var_name, (harp_param, harp_param_unit) in self.harp_params.items():
+                argv = [
+                    "--station-list",
+                    self.stationlist_file,
+                    "--harp-param",
+                    harp_param,
+                    "--harp-param-unit",
+                    harp_param_unit,
+                    "--model-name",
+                    self.model,
+                    "--output",
+                    f"{local_path}/{self.sqlite_template}",
+                    "--inputfile",
+                    input_file,
+                    "--inputtype",
+                    "surfex",
+                    "--variable",
+                    var_name,
+                    "--validtime",
+                    validtime.strftime("%Y%m%d%H"),
+                    "--basetime",
+                    basetime,
+                ]
+                logger.debug("Args: {}", " ".join(argv))
+                with self.timer.phase("external"):
+                    converter2harp_cached(argv, cache)
+
+        for root, __, files in os.walk(local_path):
+            for fname in sorted(files):
+                local_file = os.path.join(root, fname)
+                target = os.path.join(
+                    self.sqlite_path, os.path.relpath(local_file, local_path)
+                )
+                merge_sqlite(local_file, target)
 
 
 class StartOfflineSfx(PySurfexBaseTask):
@@ -1308,6 +1888,7 @@ class StartOfflineSfx(PySurfexBaseTask):
         """Execute."""
         logger.info("Running command: {}", self.run_cmd)
         try:
-            BatchJob(os.environ).run(self.run_cmd)
+            with self.timer.phase("external"):
+                BatchJob(os.environ).run(self.run_cmd)
         except Exception as exc:
             raise RuntimeError("Command failed") from exc
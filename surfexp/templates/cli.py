@@ -1,33 +1,65 @@
 """Entry point to execute a task in a template."""
 import json
+import os
 import sys
 
-from .ecflow.default import default_main
-from .stand_alone import stand_alone_main
+from .runner import runner_socket_path, submit
 
 
-def execute_task(argv=None):
-    """Execute task.
+def run_template(kwargs):
+    """Run a task in the template given by the arguments.
 
     Args:
-        argv (list, optional): Arguments
+        kwargs (dict): Template arguments
 
-    """
-    if argv is None:
-        argv = sys.argv[1:]
+    Raises:
+        NotImplementedError: If the template is not known
 
-    args_file = argv[0]
-    with open(args_file, mode="r", encoding="utf8") as fhandler:
-        kwargs = json.load(fhandler)
+    """
     template = kwargs.get("template")
     if template is None:
         template = "ecflow"
     if template == "ecflow":
+        from .ecflow.default import default_main
+
         default_main(**kwargs)
     elif template == "stand_alone":
+        from .stand_alone import stand_alone_main
+
         task_name = kwargs["STAND_ALONE_TASK_NAME"]
         config = kwargs["STAND_ALONE_TASK_CONFIG"]
         deode_home = kwargs["STAND_ALONE_DEODE_HOME"]
         stand_alone_main(task_name, config, deode_home)
     else:
         raise NotImplementedError
+
+
+def execute_task(argv=None):
+    """Execute task.
+
+    The task is forwarded to a warm task runner if one listens on the runner
+    socket. Otherwise it runs in this process.
+
+    Args:
+        argv (list, optional): Arguments
+
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    args_file = argv[0]
+    with open(args_file, mode="r", encoding="utf8") as fhandler:
+        kwargs = json.load(fhandler)
+
+    socket_path = runner_socket_path()
+    if os.path.exists(socket_path):
+        try:
+            status = submit(kwargs, socket_path=socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Stale socket. Run the task here.
+            pass
+        else:
+            if status != 0:
+                sys.exit(status)
+            return
+    run_template(kwargs)
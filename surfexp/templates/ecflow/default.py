@@ -2,13 +2,15 @@
 
 import os
 
-from deode.config_parser import ConfigParserDefaults, ParsedConfig
+from deode.config_parser import ConfigParserDefaults
 from deode.derived_variables import derived_variables
 from deode.logs import LogDefaults, LoggerHandlers, logger
 from deode.scheduler import EcflowClient, EcflowServer, EcflowTask
 from deode.submission import ProcessorLayout
 from deode.tasks.discover_task import get_task
 
+from surfexp.cache import load_config
+
 logger.enable("deode")
 
 
@@ -32,12 +34,30 @@ def parse_ecflow_vars():
     }
 
 
+def normalize_time(value):
+    """Convert a repeat value (YYYYMMDDTHHMMSS) to an ISO time.
+
+    Args:
+        value (str): Time from ecflow
+
+    Returns:
+        str: ISO time. Other values are returned unchanged.
+
+    """
+    if value is None or len(value) != 15 or value[8] != "T":
+        return value
+    if not (value[:8] + value[9:]).isdigit():
+        return value
+    return (
+        f"{value[0:4]}-{value[4:6]}-{value[6:8]}"
+        f"T{value[9:11]}:{value[11:13]}:{value[13:15]}Z"
+    )
+
+
 def default_main(**kwargs):
     """Ecflow container default method."""
     config = kwargs.get("CONFIG")
-    config = ParsedConfig.from_file(
-        config, json_schema=ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA
-    )
+    config = load_config(config, json_schema=ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA)
 
     # Reset loglevel according to (in order of priority):
     #     (a) Configs in ECFLOW UI
@@ -65,8 +85,8 @@ def default_main(**kwargs):
             "task": {"args": args_dict},
             "general": {
                 "times": {
-                    "validtime": kwargs.get("VALIDTIME"),
-                    "basetime": kwargs.get("BASETIME"),
+                    "validtime": normalize_time(kwargs.get("VALIDTIME")),
+                    "basetime": normalize_time(kwargs.get("BASETIME")),
                 },
                 "loglevel": loglevel,
             },
@@ -1,14 +1,28 @@
-"""Default ecflow container."""
+"""Requeue ecflow container.
 
+The task can run for several successive basetimes in the same process before
+it is requeued. The MAX_ITERATIONS ecflow variable of the task, which the
+suite sets from suite_control.max_iterations, is the maximum number of
+iterations. It is queried from the server, with the config value as fallback.
+With more than one iteration, BASETIME and VALIDTIME of the task are advanced
+after each completed iteration, so that the requeued job continues after the
+last completed basetime. The task is not requeued when the next basetime is
+after the end of the experiment.
+"""
+
+import contextlib
 import os
 
-from deode.config_parser import ConfigParserDefaults, ParsedConfig
+from deode.config_parser import ConfigParserDefaults
+from deode.datetime_utils import as_datetime, as_timedelta
 from deode.derived_variables import derived_variables
 from deode.logs import LogDefaults, LoggerHandlers, logger
 from deode.scheduler import EcflowClient, EcflowServer, EcflowTask
 from deode.submission import ProcessorLayout
 from deode.tasks.discover_task import get_task
 
+from surfexp.cache import load_config
+
 logger.enable("deode")
 
 
@@ -32,12 +46,127 @@ def parse_ecflow_vars():
     }
 
 
+def normalize_time(value):
+    """Convert a repeat value (YYYYMMDDTHHMMSS) to an ISO time.
+
+    Args:
+        value (str): Time from ecflow
+
+    Returns:
+        str: ISO time. Other values are returned unchanged.
+
+    """
+    if value is None or len(value) != 15 or value[8] != "T":
+        return value
+    if not (value[:8] + value[9:]).isdigit():
+        return value
+    return (
+        f"{value[0:4]}-{value[4:6]}-{value[6:8]}"
+        f"T{value[9:11]}:{value[11:13]}:{value[13:15]}Z"
+    )
+
+
+def iteration_times(basetime, validtime, cycle_length, max_iterations, end=None):
+    """Get the times of the iterations.
+
+    Args:
+        basetime (str): Basetime of the first iteration
+        validtime (str): Validtime of the first iteration
+        cycle_length (str): Time between the iterations
+        max_iterations (int): Maximum number of iterations
+        end (str, optional): Last basetime. Defaults to None.
+
+    Returns:
+        list: Basetime and validtime of each iteration
+
+    """
+    times = [(basetime, validtime)]
+    cycle_length = as_timedelta(cycle_length)
+    next_basetime = as_datetime(basetime)
+    next_validtime = as_datetime(validtime)
+    for __ in range(1, max_iterations):
+        next_basetime = next_basetime + cycle_length
+        next_validtime = next_validtime + cycle_length
+        if end is not None and next_basetime > as_datetime(end):
+            break
+        times.append(
+            (
+                next_basetime.isoformat().replace("+00:00", "Z"),
+                next_validtime.isoformat().replace("+00:00", "Z"),
+            )
+        )
+    return times
+
+
+def report_iteration(client, iteration, basetime):
+    """Report a completed iteration to ecflow.
+
+    The iteration meter and the basetime label are only updated if they are
+    defined for the task.
+
+    Args:
+        client (ecflow.Client): Ecflow client of the task
+        iteration (int): Number of completed iterations
+        basetime (str): Basetime of the completed iteration
+
+    """
+    with contextlib.suppress(RuntimeError):
+        client.child_meter("iteration", iteration)
+    with contextlib.suppress(RuntimeError):
+        client.child_label("basetime", basetime)
+
+
+def get_max_iterations(client, ecf_name, config):
+    """Get the maximum number of iterations of the task.
+
+    Args:
+        client (ecflow.Client): Ecflow client of the task
+        ecf_name (str): Path of the task
+        config (ParsedConfig): Configuration
+
+    Returns:
+        int: Maximum number of iterations
+
+    """
+    try:
+        max_iterations = client.query("variable", ecf_name, "MAX_ITERATIONS")
+    except RuntimeError:
+        max_iterations = ""
+    if max_iterations in (None, ""):
+        max_iterations = config.get("suite_control.max_iterations", 1)
+    return int(max_iterations)
+
+
+def advance_times(client, ecf_name, basetime, validtime, cycle_length, end=None):
+    """Set the times of the next job of the task.
+
+    Args:
+        client (ecflow.Client): Ecflow client of the task
+        ecf_name (str): Path of the task
+        basetime (str): Basetime of the completed iteration
+        validtime (str): Validtime of the completed iteration
+        cycle_length (str): Time between the iterations
+        end (str, optional): Last basetime. Defaults to None.
+
+    Returns:
+        bool: False if the next basetime is after the end
+
+    """
+    times = iteration_times(basetime, validtime, cycle_length, 2, end=end)
+    if len(times) < 2:
+        logger.info("Basetime {} is the last basetime", basetime)
+        return False
+    next_basetime, next_validtime = times[1]
+    client.alter(ecf_name, "add", "variable", "BASETIME", next_basetime)
+    client.alter(ecf_name, "add", "variable", "VALIDTIME", next_validtime)
+    logger.info("Next job of {} starts at basetime {}", ecf_name, next_basetime)
+    return True
+
+
 def default_main(**kwargs):
-    """Ecflow container default method."""
+    """Ecflow container requeue method."""
     config = kwargs.get("CONFIG")
-    config = ParsedConfig.from_file(
-        config, json_schema=ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA
-    )
+    config = load_config(config, json_schema=ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA)
 
     # Reset loglevel according to (in order of priority):
     #     (a) Configs in ECFLOW UI
@@ -63,17 +192,10 @@ def default_main(**kwargs):
         update={
             "submission": {"task": {"wrapper": kwargs.get("WRAPPER")}},
             "task": {"args": args_dict},
-            "general": {
-                "times": {
-                    "validtime": kwargs.get("VALIDTIME"),
-                    "basetime": kwargs.get("BASETIME"),
-                },
-                "loglevel": loglevel,
-            },
+            "general": {"loglevel": loglevel},
             "platform": {"deode_home": kwargs.get("DEODE_HOME")},
         }
     )
-
     # TODO Add wrapper
     server = EcflowServer(config)
 
@@ -87,18 +209,58 @@ def default_main(**kwargs):
     # This will also handle call to sys.exit(), i.e. Client.__exit__ will still be called.
     client = EcflowClient(server, task)
     with client:
+        max_iterations = get_max_iterations(client.client, task.ecf_name, config)
+        cycle_length = config["general.times.cycle_length"]
+        end = config.get("general.times.end")
+        times = iteration_times(
+            normalize_time(kwargs.get("BASETIME")),
+            normalize_time(kwargs.get("VALIDTIME")),
+            cycle_length,
+            max_iterations,
+            end=end,
+        )
         processor_layout = ProcessorLayout(kwargs)
-        update = derived_variables(config, processor_layout=processor_layout)
-        config = config.copy(update=update)
+        task_class = None
+        requeue = True
+        for iteration, (basetime, validtime) in enumerate(times):
+            iteration_config = config.copy(
+                update={
+                    "general": {"times": {"validtime": validtime, "basetime": basetime}}
+                }
+            )
+            update = derived_variables(
+                iteration_config, processor_layout=processor_layout
+            )
+            iteration_config = iteration_config.copy(update=update)
 
-        # TODO Add wrapper to config
-        logger.info("Running task {}", task.ecf_name)
-        get_task(task.ecf_task, config).run()
-        logger.info("Finished task {}", task.ecf_name)
-        client.client.requeue(task.ecf_name)
+            # TODO Add wrapper to config
+            logger.info(
+                "Running task {} for basetime {} ({}/{})",
+                task.ecf_name,
+                basetime,
+                iteration + 1,
+                len(times),
+            )
+            if task_class is None:
+                # Discover the task once and reuse the class
+                surfex_task = get_task(task.ecf_task, iteration_config)
+                task_class = type(surfex_task)
+            else:
+                surfex_task = task_class(iteration_config)
+            surfex_task.run()
+            report_iteration(client.client, iteration + 1, basetime)
+            logger.info("Finished task {} for basetime {}", task.ecf_name, basetime)
+            if max_iterations > 1:
+                requeue = advance_times(
+                    client.client, task.ecf_name, basetime, validtime, cycle_length, end
+                )
+        if requeue:
+            client.client.requeue(task.ecf_name)
 
-    client = EcflowClient(server, task)
-    client.client.requeue(task.ecf_name)
+    # Leaving the client signals completion, so requeue again afterwards
+    if requeue:
+        client = EcflowClient(server, task)
+        client.client.requeue(task.ecf_name)
 
 
 if __name__ == "__main__":
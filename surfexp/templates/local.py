@@ -0,0 +1,277 @@
+"""Local executor running the tasks of a suite without ecflow."""
+import argparse
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from deode.config_parser import ConfigParserDefaults
+from deode.derived_variables import derived_variables, set_times
+from deode.logs import logger
+from deode.submission import ProcessorLayout, TaskSettings
+from deode.tasks.discover_task import get_task
+
+from surfexp.cache import load_config
+from surfexp.suites.offline import SurfexSuiteDefinition
+from surfexp.suites.triggers import TriggerGraph, parse_trigger
+from surfexp.templates.ecflow.default import normalize_time
+
+logger.enable("deode")
+
+
+class LocalTask:
+    """Task of a suite with its dependencies."""
+
+    def __init__(self, path, name, variables, dependencies):
+        """Construct the task.
+
+        Args:
+            path (str): Node path in the suite
+            name (str): Task name
+            variables (dict): Ecflow variables of the task and its ancestors
+            dependencies (set): Paths of the tasks that must complete first
+
+        """
+        self.path = path
+        self.name = name
+        self.variables = variables
+        self.dependencies = dependencies
+
+
+def node_variables(node):
+    """Get the variables of a node, inherited from its ancestors.
+
+    Args:
+        node (ecflow.Node): Node
+
+    Returns:
+        dict: Variables. The closest definition wins.
+
+    """
+    variables = {}
+    while node is not None:
+        for var in node.variables:
+            variables.setdefault(var.name(), var.value())
+        node = node.get_parent()
+    return variables
+
+
+def local_tasks(suite_node):
+    """Get the tasks of a suite with their dependencies.
+
+    Args:
+        suite_node (ecflow.Suite): Suite
+
+    Returns:
+        dict: Tasks by node path in definition order
+
+    Raises:
+        NotImplementedError: If the suite uses repeats
+        ValueError: If a trigger is not a conjunction of complete conditions
+
+    """
+    parents = {}
+    triggers = {}
+    for node in suite_node.get_all_nodes():
+        path = node.get_abs_node_path()
+        if not node.get_repeat().empty():
+            raise NotImplementedError(f"Repeat in {path} can not run locally")
+        parent = node.get_parent()
+        parents.update({path: None if parent is None else parent.get_abs_node_path()})
+        trigger = node.get_trigger()
+        if trigger is not None:
+            paths = parse_trigger(trigger.get_expression())
+            if paths is None:
+                raise ValueError(f"Can not run trigger of {path} locally")
+            triggers.update({path: paths})
+
+    graph = TriggerGraph(parents, triggers)
+    task_nodes = list(suite_node.get_all_tasks())
+    task_paths = [node.get_abs_node_path() for node in task_nodes]
+    tasks = {}
+    for node, path in zip(task_nodes, task_paths):
+        dependencies = set()
+        for required in graph.required(path):
+            dependencies.update(
+                task_path
+                for task_path in task_paths
+                if task_path == required or task_path.startswith(f"{required}/")
+            )
+        tasks.update(
+            {path: LocalTask(path, node.name(), node_variables(node), dependencies)}
+        )
+    return tasks
+
+
+def run_local_task(config, name, variables):
+    """Run a task like the stand alone template.
+
+    Args:
+        config (deode.config_parser.ParsedConfig): Parsed config
+        name (str): Task name
+        variables (dict): Ecflow variables of the task
+
+    """
+    args_dict = {}
+    for arg in variables.get("ARGS", "").split(";"):
+        if arg != "":
+            parts = arg.split("=")
+            if len(parts) == 2:
+                args_dict.update({parts[0]: parts[1]})
+            else:
+                logger.warning("Could not convert ARGS:{} to dict, skip it", arg)
+    update = {"task": {"args": args_dict}}
+    if "BASETIME" in variables:
+        times = {
+            "basetime": normalize_time(variables["BASETIME"]),
+            "validtime": normalize_time(variables.get("VALIDTIME")),
+        }
+        update.update({"general": {"times": times}})
+    config = config.copy(update=update)
+
+    task_settings = TaskSettings(config).get_task_settings(name)
+    processor_layout = ProcessorLayout(task_settings)
+    update = derived_variables(config, processor_layout=processor_layout)
+    config = config.copy(update=update)
+
+    logger.info("Running task {}", name)
+    get_task(name, config).run()
+    logger.info("Finished task {}", name)
+
+
+class LocalExecutor:
+    """Run the tasks of a suite in dependency order on the local node."""
+
+    def __init__(self, config, tasks, nproc=1):
+        """Construct the executor.
+
+        Args:
+            config (deode.config_parser.ParsedConfig): Parsed config
+            tasks (dict): Tasks by node path in definition order
+            nproc (int, optional): Number of concurrent tasks. Defaults to 1.
+
+        """
+        self.config = config
+        self.tasks = tasks
+        self.nproc = nproc
+        self.completed = []
+        self.failed = []
+
+    def run(self):
+        """Run the tasks.
+
+        Tasks depending on a failed task are not run.
+
+        Returns:
+            list: Paths of the completed tasks in completion order
+
+        Raises:
+            RuntimeError: If tasks failed or could not run
+
+        """
+        dependants = {path: [] for path in self.tasks}
+        for path, task in self.tasks.items():
+            for dep in task.dependencies:
+                dependants[dep].append(path)
+        remaining = {path: len(task.dependencies) for path, task in self.tasks.items()}
+        ready = [path for path in self.tasks if remaining[path] == 0]
+
+        def complete(path):
+            self.completed.append(path)
+            for dependant in dependants[path]:
+                remaining[dependant] -= 1
+                if remaining[dependant] == 0:
+                    ready.append(dependant)
+
+        if self.nproc <= 1:
+            while len(ready) > 0:
+                path = ready.pop(0)
+                task = self.tasks[path]
+                try:
+                    run_local_task(self.config, task.name, task.variables)
+                except Exception as exc:  # noqa: BLE001
+                    logger.error("Task {} failed: {}", path, exc)
+                    self.failed.append(path)
+                    continue
+                complete(path)
+        else:
+            with ProcessPoolExecutor(max_workers=self.nproc) as executor:
+                running = {}
+                while len(ready) > 0 or len(running) > 0:
+                    while len(ready) > 0 and len(running) < self.nproc:
+                        path = ready.pop(0)
+                        task = self.tasks[path]
+                        future = executor.submit(
+                            run_local_task, self.config, task.name, task.variables
+                        )
+                        running.update({future: path})
+                    done, __ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = running.pop(future)
+                        try:
+                            future.result()
+                        except Exception as exc:  # noqa: BLE001
+                            logger.error("Task {} failed: {}", path, exc)
+                            self.failed.append(path)
+                            continue
+                        complete(path)
+
+        not_run = len(self.tasks) - len(self.completed) - len(self.failed)
+        logger.info(
+            "Completed {} tasks. failed={} not_run={}",
+            len(self.completed),
+            len(self.failed),
+            not_run,
+        )
+        if len(self.failed) > 0 or not_run > 0:
+            raise RuntimeError(
+                f"{len(self.failed)} tasks failed and {not_run} tasks did not run: "
+                f"{self.failed}"
+            )
+        return self.completed
+
+
+def local_main(config, deode_home, nproc=1):
+    """Run all tasks of the suite of a config on the local node.
+
+    Args:
+        config (str): Config file
+        deode_home (str): Deode home path
+        nproc (int, optional): Number of concurrent tasks. Defaults to 1.
+
+    Raises:
+        NotImplementedError: If the suite definition is not supported
+
+    """
+    config = load_config(config, json_schema=ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA)
+    update = set_times(config)
+    update.update({"platform": {"deode_home": deode_home}})
+    config = config.copy(update=update)
+
+    suite_definition = config.get("suite_control.suite_definition")
+    if suite_definition not in (None, "SurfexSuiteDefinition"):
+        raise NotImplementedError(f"Can not run {suite_definition} locally")
+    suite = SurfexSuiteDefinition(config, dry_run=True)
+    tasks = local_tasks(suite.suite.ecf_node)
+    logger.info("Running {} tasks with {} processes", len(tasks), nproc)
+    LocalExecutor(config, tasks, nproc=nproc).run()
+
+
+def main(argv=None):
+    """Run a suite locally.
+
+    Args:
+        argv (list, optional): Arguments. Defaults to None.
+
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description="Run a suite without ecflow")
+    parser.add_argument("config", help="Config file")
+    parser.add_argument(
+        "--deode-home", dest="deode_home", required=True, help="Deode home path"
+    )
+    parser.add_argument(
+        "-n", "--nproc", dest="nproc", type=int, default=1, help="Concurrent tasks"
+    )
+    args = parser.parse_args(argv)
+    local_main(args.config, args.deode_home, nproc=args.nproc)
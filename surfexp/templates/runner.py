@@ -0,0 +1,397 @@
+"""Warm task runner.
+
+A long running process on a node keeps deode, pysurfex and the parsed configs
+imported and accepts task requests on a local Unix socket. Each request runs
+in a forked process, so the warm state is shared copy-on-write and a task can
+not change the state of the runner. Output and exit status are streamed back
+to the client.
+
+Only the standard library is imported at module level, so that the client side
+stays cheap.
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+
+PRELOAD_MODULES = [
+    "deode.tasks.discover_task",
+    "deode.scheduler",
+    "surfexp.templates.ecflow.default",
+    "surfexp.templates.stand_alone",
+    "surfexp.tasks.compilation",
+    "surfexp.tasks.fetch_mars",
+    "surfexp.tasks.forcing",
+    "surfexp.tasks.gmtedsoil",
+    "surfexp.tasks.suite",
+    "surfexp.tasks.surfex_binary_task",
+    "surfexp.tasks.tasks",
+    "pysurfex.cli",
+    "pysurfex.verification",
+    "netCDF4",
+    "osgeo.gdal",
+]
+
+
+def runner_socket_path():
+    """Get the path of the runner socket.
+
+    The path is read from SURFEXP_RUNNER_SOCKET. The default is a socket for
+    the user in the node local runtime or temporary directory.
+
+    Returns:
+        str: Socket path
+
+    """
+    socket_path = os.environ.get("SURFEXP_RUNNER_SOCKET")
+    if socket_path is None:
+        tmpdir = os.environ.get("XDG_RUNTIME_DIR", "/tmp")  # noqa S108
+        socket_path = f"{tmpdir}/surfexp-runner-{os.getuid()}.sock"
+    return socket_path
+
+
+def send_message(connection, message):
+    """Send a json message terminated by a new line.
+
+    Args:
+        connection (socket.socket): Connection
+        message (dict): Message
+
+    """
+    connection.sendall(json.dumps(message).encode("utf8") + b"\n")
+
+
+def read_messages(connection):
+    """Read json messages terminated by new lines.
+
+    Args:
+        connection (socket.socket): Connection
+
+    Yields:
+        dict: Message
+
+    """
+    with connection.makefile(mode="rb") as fhandler:
+        for line in fhandler:
+            yield json.loads(line)
+
+
+def config_file(kwargs):
+    """Get the config file of a task request.
+
+    Args:
+        kwargs (dict): Template arguments
+
+    Returns:
+        str: Config file. None if not set.
+
+    """
+    if kwargs.get("template") == "stand_alone":
+        return kwargs.get("STAND_ALONE_TASK_CONFIG")
+    return kwargs.get("CONFIG")
+
+
+def submit(kwargs, socket_path=None, output=None):
+    """Run a task in the warm runner.
+
+    Args:
+        kwargs (dict): Template arguments
+        socket_path (str, optional): Runner socket. Defaults to None.
+        output (io.TextIOBase, optional): Stream for the task output.
+                                          Defaults to sys.stdout.
+
+    Returns:
+        int: Exit status of the task
+
+    Raises:
+        ConnectionError: If the runner closed the connection without an exit status
+
+    """
+    if socket_path is None:
+        socket_path = runner_socket_path()
+    if output is None:
+        output = sys.stdout
+    request = {"kwargs": kwargs, "environ": dict(os.environ), "cwd": os.getcwd()}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        send_message(connection, request)
+        for message in read_messages(connection):
+            if "log" in message:
+                output.write(message["log"])
+                output.flush()
+            elif "exit" in message:
+                return message["exit"]
+    raise ConnectionError(f"Runner on {socket_path} did not return an exit status")
+
+
+def run_request(request):
+    """Run a task request in the current process.
+
+    Args:
+        request (dict): Task request
+
+    Returns:
+        int: Exit status
+
+    """
+    from surfexp.templates.cli import run_template
+
+    os.environ.clear()
+    os.environ.update(request["environ"])
+    os.chdir(request["cwd"])
+    try:
+        run_template(request["kwargs"])
+        status = 0
+    except SystemExit as exc:
+        if exc.code is None:
+            status = 0
+        elif isinstance(exc.code, int):
+            status = exc.code
+        else:
+            print(exc.code, file=sys.stderr)  # noqa T201
+            status = 1
+    except Exception:  # noqa: BLE001
+        traceback.print_exc()
+        status = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return status
+
+
+def handle_request(connection, request):
+    """Run a task request in a child process and stream the output.
+
+    Args:
+        connection (socket.socket): Client connection
+        request (dict): Task request
+
+    Returns:
+        int: Exit status
+
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        connection.close()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.dup2(write_fd, 1)
+        os.dup2(write_fd, 2)
+        os.close(write_fd)
+        sys.stdout = open(1, mode="w", encoding="utf8", buffering=1, closefd=False)
+        sys.stderr = open(2, mode="w", encoding="utf8", buffering=1, closefd=False)
+        os._exit(run_request(request))
+
+    os.close(write_fd)
+    with os.fdopen(read_fd, mode="rb") as pipe:
+        for chunk in iter(lambda: pipe.read1(65536), b""):
+            try:
+                send_message(connection, {"log": chunk.decode("utf8", errors="replace")})
+            except OSError:
+                # The client is gone, e.g. the job was killed
+                os.kill(pid, signal.SIGTERM)
+                break
+    __, wait_status = os.waitpid(pid, 0)
+    status = os.waitstatus_to_exitcode(wait_status)
+    if status < 0:
+        status = 128 - status
+    with contextlib.suppress(OSError):
+        send_message(connection, {"exit": status})
+    return status
+
+
+class TaskRunner:
+    """Runner keeping modules and configs warm."""
+
+    def __init__(self, socket_path=None, preload=None, configs=None):
+        """Construct the runner.
+
+        Args:
+            socket_path (str, optional): Socket path. Defaults to None.
+            preload (list, optional): Modules to import. Defaults to PRELOAD_MODULES.
+            configs (list, optional): Config files to parse. Defaults to None.
+
+        """
+        if socket_path is None:
+            socket_path = runner_socket_path()
+        if preload is None:
+            preload = PRELOAD_MODULES
+        if configs is None:
+            configs = []
+        self.socket_path = socket_path
+        self.preload = preload
+        self.configs = configs
+        self.children = set()
+        self.running = False
+
+    def warm_up(self):
+        """Import the modules and parse the configs."""
+        from deode.logs import logger
+
+        for module in self.preload:
+            try:
+                importlib.import_module(module)
+            except ImportError as exc:
+                logger.warning("Could not preload {}: {}", module, exc)
+        for filename in self.configs:
+            self.load_config(filename)
+
+    @staticmethod
+    def load_config(filename):
+        """Parse a config so that forked tasks find it in memory.
+
+        Args:
+            filename (str): Config file
+
+        """
+        from deode.config_parser import ConfigParserDefaults
+        from deode.logs import logger
+
+        from surfexp.cache import load_config
+
+        schema = ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA
+        try:
+            load_config(filename, json_schema=schema)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Could not load config {}: {}", filename, exc)
+
+    def bind(self):
+        """Bind the socket.
+
+        Returns:
+            socket.socket: Listening socket
+
+        Raises:
+            RuntimeError: If another runner listens on the socket
+
+        """
+        if os.path.exists(self.socket_path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(self.socket_path)
+                except OSError:
+                    os.remove(self.socket_path)
+                else:
+                    raise RuntimeError(f"A runner is already using {self.socket_path}")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        server.listen()
+        server.settimeout(1.0)
+        return server
+
+    def reap(self):
+        """Wait for finished request handlers."""
+        for pid in list(self.children):
+            with contextlib.suppress(ChildProcessError):
+                done, __ = os.waitpid(pid, os.WNOHANG)
+                if done == 0:
+                    continue
+            self.children.discard(pid)
+
+    def accept(self, connection):
+        """Accept a task request.
+
+        The config is parsed in the runner before forking, so that later
+        requests for the same config find it in memory.
+
+        Args:
+            connection (socket.socket): Client connection
+
+        """
+        from deode.logs import logger
+
+        connection.settimeout(None)
+        try:
+            request = next(read_messages(connection))
+        except (StopIteration, OSError, ValueError) as exc:
+            logger.warning("Invalid task request: {}", exc)
+            connection.close()
+            return
+        filename = config_file(request.get("kwargs", {}))
+        if filename is not None:
+            self.load_config(filename)
+
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                status = handle_request(connection, request)
+            finally:
+                os._exit(status)
+        self.children.add(pid)
+        connection.close()
+
+    def serve(self):
+        """Serve task requests until stopped."""
+        from deode.logs import logger
+
+        self.warm_up()
+        server = self.bind()
+        self.running = True
+        logger.info("Task runner listening on {}", self.socket_path)
+        try:
+            while self.running:
+                self.reap()
+                try:
+                    connection, __ = server.accept()
+                except TimeoutError:
+                    continue
+                except OSError:
+                    if not self.running:
+                        break
+                    raise
+                self.accept(connection)
+        finally:
+            server.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.socket_path)
+            logger.info("Task runner on {} stopped", self.socket_path)
+
+    def stop(self, *__):
+        """Stop serving."""
+        self.running = False
+
+
+def main(argv=None):
+    """Start a warm task runner.
+
+    Args:
+        argv (list, optional): Arguments. Defaults to None.
+
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description="Warm task runner for execute_task")
+    parser.add_argument(
+        "--socket", dest="socket_path", default=None, help="Unix socket path"
+    )
+    parser.add_argument(
+        "--config",
+        dest="configs",
+        action="append",
+        default=[],
+        help="Config file to parse at start up",
+    )
+    parser.add_argument(
+        "--preload",
+        dest="preload",
+        action="append",
+        default=None,
+        help="Module to import at start up. Defaults to the task modules.",
+    )
+    args = parser.parse_args(argv)
+
+    runner = TaskRunner(
+        socket_path=args.socket_path, preload=args.preload, configs=args.configs
+    )
+    signal.signal(signal.SIGTERM, runner.stop)
+    signal.signal(signal.SIGINT, runner.stop)
+    runner.serve()
@@ -2,12 +2,14 @@
 
 import os
 
-from deode.config_parser import ConfigParserDefaults, ParsedConfig
+from deode.config_parser import ConfigParserDefaults
 from deode.derived_variables import derived_variables, set_times
 from deode.logs import logger  # Use deode's own configs for logger
 from deode.submission import ProcessorLayout, TaskSettings
 from deode.tasks.discover_task import get_task
 
+from surfexp.cache import load_config
+
 logger.enable("deode")
 
 
@@ -19,11 +21,10 @@ def stand_alone_main(task, config, deode_home):
         config (str): Config file
         deode_home(str): Deode home path
     """
-    config = ParsedConfig.from_file(
-        config, json_schema=ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA
-    )
-    config = config.copy(update=set_times(config))
-    config = config.copy(update={"platform": {"deode_home": deode_home}})
+    config = load_config(config, json_schema=ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA)
+    update = set_times(config)
+    update.update({"platform": {"deode_home": deode_home}})
+    config = config.copy(update=update)
 
     task_settings = TaskSettings(config).get_task_settings(task)
     processor_layout = ProcessorLayout(task_settings)
@@ -0,0 +1,213 @@
+"""Timing of task phases."""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import socket
+import time
+from datetime import datetime, timezone
+
+from deode.logs import logger
+
+
+class PhaseTimer:
+    """Accumulate wall clock time of named phases.
+
+    The timer starts when it is constructed, so the time until the first phase
+    can be recorded with stop().
+    """
+
+    def __init__(self):
+        """Construct the timer."""
+        self.created = time.perf_counter()
+        self.start_time = datetime.now(timezone.utc)
+        self.phases = {}
+
+    def add(self, name, seconds):
+        """Add time to a phase.
+
+        Args:
+            name (str): Phase name
+            seconds (float): Elapsed time
+
+        """
+        self.phases.update({name: self.phases.get(name, 0.0) + seconds})
+
+    def stop(self, name):
+        """Record the time since the timer was constructed.
+
+        Args:
+            name (str): Phase name
+
+        """
+        self.add(name, time.perf_counter() - self.created)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time a phase.
+
+        Args:
+            name (str): Phase name
+
+        Yields:
+            None
+
+        """
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - tic)
+
+    def record(self, phases=None, **metadata):
+        """Create a timing record.
+
+        Args:
+            phases (dict, optional): Phases to record. Defaults to the timed phases.
+            metadata (dict): Extra fields of the record
+
+        Returns:
+            dict: Timing record
+
+        """
+        if phases is None:
+            phases = self.phases
+        record = {
+            "start": self.start_time.isoformat(),
+            "hostname": socket.gethostname(),
+            "phases": {name: round(value, 6) for name, value in phases.items()},
+        }
+        record.update(metadata)
+        return record
+
+
+def write_record(directory, record):
+    """Write a timing record to its own file.
+
+    Each task run writes a separate file, so concurrent jobs never write to
+    the same file. The records are combined with merge_metrics.
+
+    Args:
+        directory (str): Metrics directory
+        record (dict): Timing record
+
+    Returns:
+        str: Written file
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    start = datetime.fromisoformat(record["start"]).strftime("%Y%m%dT%H%M%S%f")
+    task = record.get("task", "unknown")
+    hostname = record.get("hostname", "")
+    filename = f"{directory}/{task}_{hostname}_{os.getpid()}_{start}.json"
+    tmp_filename = f"{filename}.tmp"
+    try:
+        with open(tmp_filename, mode="w", encoding="utf8") as fhandler:
+            json.dump(record, fhandler, default=str)
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+    return filename
+
+
+def merge_metrics(directory, filename):
+    """Merge the timing records in a directory into a json lines file.
+
+    Args:
+        directory (str): Metrics directory, searched recursively
+        filename (str): Merged json lines file
+
+    Returns:
+        int: Number of merged records
+
+    """
+    records = []
+    for record_file in glob.glob(f"{directory}/**/*.json", recursive=True):
+        with open(record_file, mode="r", encoding="utf8") as fhandler:
+            records.append(json.load(fhandler))
+    records.sort(key=lambda record: (record["start"], record.get("task", "")))
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    with open(filename, mode="w", encoding="utf8") as fhandler:
+        for record in records:
+            fhandler.write(json.dumps(record, default=str) + "\n")
+    logger.info("Merged {} timing records into {}", len(records), filename)
+    return len(records)
+
+
+def prometheus_label(value):
+    """Escape a Prometheus label value.
+
+    Args:
+        value (any): Label value
+
+    Returns:
+        str: Escaped value
+
+    """
+    value = str(value)
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_prometheus_textfile(directory, record):
+    """Write a timing record for the Prometheus node exporter textfile collector.
+
+    The file is replaced atomically and holds the last record of the task.
+
+    Args:
+        directory (str): Textfile collector directory
+        record (dict): Timing record
+
+    Returns:
+        str: Written file
+
+    """
+    task = record.get("task", "unknown")
+    labels = (
+        f'task="{prometheus_label(task)}",'
+        f'hostname="{prometheus_label(record.get("hostname", ""))}"'
+    )
+    lines = [
+        "# HELP surfexp_task_phase_seconds Wall clock time of a task phase.",
+        "# TYPE surfexp_task_phase_seconds gauge",
+    ]
+    for phase, seconds in record.get("phases", {}).items():
+        lines.append(
+            f'surfexp_task_phase_seconds{{{labels},phase="{prometheus_label(phase)}"}} '
+            f"{seconds}"
+        )
+    lines += [
+        "# HELP surfexp_task_last_run_timestamp_seconds Start time of the last run.",
+        "# TYPE surfexp_task_last_run_timestamp_seconds gauge",
+        f"surfexp_task_last_run_timestamp_seconds{{{labels}}} "
+        f"{datetime.fromisoformat(record['start']).timestamp()}",
+    ]
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{directory}/surfexp_{task}.prom"
+    tmp_filename = f"{filename}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_filename, mode="w", encoding="utf8") as fhandler:
+            fhandler.write("\n".join(lines) + "\n")
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+    logger.debug("Wrote Prometheus timing {}", filename)
+    return filename
+
+
+def main(argv=None):
+    """Merge the timing records of a case.
+
+    Args:
+        argv (list, optional): Command arguments. Defaults to None.
+
+    """
+    parser = argparse.ArgumentParser(description="Merge task timing records")
+    parser.add_argument("directory", help="Metrics directory of the case")
+    parser.add_argument(
+        "-o", "--output", dest="output", help="Merged json lines file", required=True
+    )
+    args = parser.parse_args(argv)
+    merge_metrics(args.directory, args.output)
@@ -0,0 +1,168 @@
+"""Benchmark of the cold start import time of the task classes.
+
+Run with: pytest tests/benchmarks/test_importtime.py -s
+
+Each task module is imported in a fresh interpreter with -X importtime. The
+test fails if a task module imports one of the heavy modules in the baseline,
+or if the import time of a task class exceeds its baseline by more than the
+tolerance. Timings are measured as the overhead over importing the reference
+module in the same run, so that the baseline does not depend on the speed of
+the machine. Classes without a recorded baseline use the default overhead.
+Record new baseline timings with:
+python tests/benchmarks/update_importtime_baseline.py
+"""
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from deode.logs import logger
+
+from surfexp import PACKAGE_DIRECTORY
+
+BASELINE = Path(__file__).parent / "importtime_baseline.json"
+REPEAT = 3
+
+
+def parse_importtime(stderr):
+    """Parse the output of python -X importtime.
+
+    Args:
+        stderr (str): Standard error of the interpreter
+
+    Returns:
+        dict: Cumulative import time in microseconds by module
+
+    """
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        timings.update({parts[2].strip(): int(parts[1])})
+    return timings
+
+
+def measure_import(module):
+    """Import a module in fresh interpreters.
+
+    Args:
+        module (str): Module name
+
+    Returns:
+        tuple: Best cumulative import time in ms and the imported modules
+
+    """
+    best = None
+    imported = {}
+    for __ in range(REPEAT):
+        result = subprocess.run(  # noqa S603
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        imported = parse_importtime(result.stderr)
+        elapsed = imported[module] / 1000.0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, imported
+
+
+def task_classes():
+    """Find the task classes without importing the task modules.
+
+    Returns:
+        dict: Task class names by module name
+
+    """
+    bases = {}
+    for filename in sorted((PACKAGE_DIRECTORY / "tasks").glob("*.py")):
+        tree = ast.parse(filename.read_text(encoding="utf8"))
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef):
+                names = [base.id for base in node.bases if isinstance(base, ast.Name)]
+                bases.update({(f"surfexp.tasks.{filename.stem}", node.name): names})
+
+    tasks = {"Task"}
+    found = True
+    while found:
+        found = False
+        for (__, name), parents in bases.items():
+            if name not in tasks and any(parent in tasks for parent in parents):
+                tasks.add(name)
+                found = True
+
+    classes = {}
+    for module, name in bases:
+        if name in tasks:
+            classes.setdefault(module, []).append(name)
+    return classes
+
+
+def read_baseline():
+    """Read the import time baseline.
+
+    Returns:
+        dict: Baseline
+
+    """
+    with open(BASELINE, mode="r", encoding="utf8") as fhandler:
+        return json.load(fhandler)
+
+
+def measure_task_imports(baseline):
+    """Measure the import time overhead of the task classes.
+
+    Args:
+        baseline (dict): Baseline with the reference and forbidden modules
+
+    Returns:
+        tuple: Overhead in ms by class and forbidden imports by module
+
+    """
+    reference, __ = measure_import(baseline["reference"])
+    logger.info("{}: {:.1f} ms", baseline["reference"], reference)
+    timings = {}
+    heavy_imports = {}
+    for module, classes in task_classes().items():
+        elapsed, imported = measure_import(module)
+        overhead = max(elapsed - reference, 0.0)
+        heavy = [
+            name
+            for name in imported
+            for forbidden in baseline["forbidden"]
+            if name == forbidden or name.startswith(f"{forbidden}.")
+        ]
+        if len(heavy) > 0:
+            heavy_imports.update({module: sorted(heavy)})
+        for cls in classes:
+            timings.update({f"{module}.{cls}": round(overhead, 1)})
+    return timings, heavy_imports
+
+
+def test_task_import_time():
+    baseline = read_baseline()
+    timings, heavy_imports = measure_task_imports(baseline)
+    failures = [
+        f"{module} imports {', '.join(heavy)}" for module, heavy in heavy_imports.items()
+    ]
+    for name, overhead in timings.items():
+        limit = baseline["classes"].get(name, baseline["overhead_ms"])
+        limit = limit * baseline["tolerance"] + baseline["slack_ms"]
+        logger.info("{}: {:.1f} ms (limit {:.1f} ms)", name, overhead, limit)
+        if overhead > limit:
+            failures.append(f"{name} imports in {overhead:.1f} ms > {limit:.1f} ms")
+    assert failures == []
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:       300 |        420 | json\n"
+    )
+    assert parse_importtime(stderr) == {"json.decoder": 120, "json": 420}
@@ -0,0 +1,54 @@
+"""Benchmark of the suite build time as function of the number of cycles.
+
+Run with: pytest tests/benchmarks -s
+"""
+import time
+
+import pytest
+from deode.datetime_utils import as_datetime, as_timedelta
+from deode.logs import logger
+
+from surfexp.suites.offline import SurfexSuiteDefinition
+
+DAYS = [1, 4, 16]
+
+
+@pytest.fixture(name="mock_submission")
+def fixture_mock_submission(session_mocker):
+    session_mocker.patch("deode.submission.TaskSettings")
+
+
+def suite_config(config, days):
+    start = as_datetime("2025-01-01T00:00:00Z")
+    end = start + as_timedelta(f"PT{days * 24 - 3}H")
+    times = {
+        "basetime": start.isoformat(),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+    }
+    return config.copy(
+        {"general": {"times": times}, "suite_control": {"do_prep": False}}
+    )
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_suite_build_scaling(default_config):
+    timings = {}
+    for days in DAYS:
+        config = suite_config(default_config, days)
+        tic = time.perf_counter()
+        SurfexSuiteDefinition(config)
+        timings[days] = time.perf_counter() - tic
+
+    cycles_per_day = 8
+    for days, elapsed in timings.items():
+        logger.info(
+            "days={} cycles={} build={:.3f}s per_cycle={:.4f}s",
+            days,
+            days * cycles_per_day,
+            elapsed,
+            elapsed / (days * cycles_per_day),
+        )
+    # The build time per cycle should not grow with the number of cycles
+    per_cycle = [timings[days] / days for days in DAYS]
+    assert per_cycle[-1] < 4 * per_cycle[0]
@@ -0,0 +1,32 @@
+"""Record the import time baseline of the task classes.
+
+Run with: python tests/benchmarks/update_importtime_baseline.py
+
+The overhead of each task class is measured as in test_importtime.py and
+written to importtime_baseline.json. Record the baseline in an environment
+with all dependencies installed and commit the result.
+"""
+import json
+import sys
+
+from deode.logs import logger
+from test_importtime import BASELINE, measure_task_imports, read_baseline
+
+
+def main():
+    """Measure and write the baseline."""
+    baseline = read_baseline()
+    timings, heavy_imports = measure_task_imports(baseline)
+    if len(heavy_imports) > 0:
+        for module, heavy in heavy_imports.items():
+            logger.error("{} imports {}", module, ", ".join(heavy))
+        sys.exit(1)
+    baseline.update({"classes": timings})
+    with open(BASELINE, mode="w", encoding="utf8") as fhandler:
+        json.dump(baseline, fhandler, indent=2, sort_keys=True)
+        fhandler.write("\n")
+    logger.info("Updated import time baseline {}", BASELINE)
+
+
+if __name__ == "__main__":
+    main()
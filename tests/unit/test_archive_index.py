@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from surfexp.archive_index import ArchiveIndex
+
+
+def test_archive_index(tmp_path):
+    index = ArchiveIndex(f"{tmp_path}/case/archive_index.sqlite")
+    produced = tmp_path / "PREP.nc"
+    assert not index.exists(str(produced))
+    assert not index.register(str(produced), kind="prep")
+
+    produced.write_text("data")
+    assert index.register(str(produced), kind="prep")
+    assert index.lookup(str(produced))
+
+    index.unregister(str(produced))
+    assert not index.lookup(str(produced))
+
+
+def test_archive_index_stale_entry(tmp_path):
+    index = ArchiveIndex(f"{tmp_path}/archive_index.sqlite")
+    produced = tmp_path / "ANALYSIS.nc"
+    produced.write_text("data")
+    assert index.register(str(produced), kind="analysis")
+
+    # Removed after registration, e.g. by an archive cleanup
+    produced.unlink()
+    assert not index.exists(str(produced))
+    assert not index.lookup(str(produced))
+
+    # Produced again with other content
+    produced.write_text("new data")
+    assert index.exists(str(produced))
+    assert index.entry(str(produced))[0] == len("new data")
+
+
+def test_archive_index_registers_on_fallback(tmp_path):
+    index = ArchiveIndex(f"{tmp_path}/archive_index.sqlite")
+    binary = Path(tmp_path / "OFFLINE")
+    binary.write_text("binary")
+    assert not index.lookup(str(binary))
+    assert index.exists(str(binary), kind="binary")
+    assert index.lookup(str(binary))
@@ -0,0 +1,161 @@
+import os
+import shutil
+
+from deode.config_parser import ConfigParserDefaults, ParsedConfig
+from deode.derived_variables import derived_variables
+
+from surfexp.cache import (
+    CONFIG_CACHE,
+    LRUCache,
+    NamelistCache,
+    config_cache_key,
+    get_cache_dir,
+    load_config,
+    namelist_cache_key,
+)
+from surfexp.experiment import (
+    SettingsFromNamelistAndConfig,
+    assemble_settings,
+    consistency_fingerprint,
+    create_namelist_bundle,
+    ensure_consistency,
+)
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_namelist_cache_persistent(tmp_directory):
+    cache_dir = f"{tmp_directory}/namelist_cache"
+    settings = {"nam_io_offline": {"csurf_filetype": "NC"}}
+    NamelistCache().put("key", settings, cache_dir=cache_dir)
+    assert os.path.exists(f"{cache_dir}/key.json")
+
+    cached = NamelistCache().get("key", cache_dir=cache_dir)
+    assert cached == settings
+    cached["nam_io_offline"]["csurf_filetype"] = "FA"
+    assert NamelistCache().get("key", cache_dir=cache_dir) == settings
+
+
+def test_namelist_cache_key(default_config):
+    key = namelist_cache_key("soda", default_config)
+    assert key == namelist_cache_key("soda", default_config)
+    assert key != namelist_cache_key("pgd", default_config)
+
+    namelist_defs = default_config["system.namelist_defs"]
+    stat = os.stat(namelist_defs)
+    os.utime(namelist_defs, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    try:
+        assert key != namelist_cache_key("soda", default_config)
+    finally:
+        os.utime(namelist_defs, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_namelist_cache_key_deode(deode_config, tmp_directory, mocker):
+    source = f"{tmp_directory}/surfex_namelists_test.yml"
+    with open(source, mode="w", encoding="utf8") as fhandler:
+        fhandler.write("nam_io_offline: {}\n")
+    mocker.patch("surfexp.cache.deode_namelist_sources", return_value=[source])
+    key = namelist_cache_key("pgd", deode_config)
+    assert key.startswith("pgd_")
+
+    unrelated = deode_config.copy(update={"suite_control": {"do_verification": False}})
+    assert namelist_cache_key("pgd", unrelated) == key
+
+    with open(source, mode="a", encoding="utf8") as fhandler:
+        fhandler.write("nam_pgd_arrange_cover: {}\n")
+    assert namelist_cache_key("pgd", deode_config) != key
+
+
+def test_settings_from_cache(default_config):
+    settings1 = SettingsFromNamelistAndConfig("soda", default_config)
+    settings1.nml["nam_obs"]["nnco"] = []
+    settings2 = SettingsFromNamelistAndConfig("soda", default_config)
+    assert settings2.nml["nam_obs"]["nnco"] != []
+
+
+def job_config(config, basetime):
+    """Update a case config like the ecflow job template does."""
+    config = config.copy(
+        update={
+            "submission": {"task": {"wrapper": "srun"}},
+            "task": {"args": {"mode": "default"}},
+            "general": {
+                "times": {"basetime": basetime, "validtime": basetime},
+                "loglevel": "DEBUG",
+            },
+            "platform": {"deode_home": "/deode/home"},
+        }
+    )
+    return config.copy(update=derived_variables(config))
+
+
+def test_namelist_bundle(default_config, tmp_directory):
+    bundle = f"{tmp_directory}/bundle.namelists.json"
+    create_namelist_bundle(default_config, bundle, programs=["soda"])
+
+    config = job_config(default_config, "2025-02-10T06:00:00Z")
+    key = namelist_cache_key("soda", config)
+    cache = NamelistCache()
+    settings = cache.get(key, bundle=bundle)
+    assert settings is not None
+    assert settings == assemble_settings("soda", config)
+    assert cache.get("missing", bundle=bundle) is None
+
+
+def test_namelist_bundle_deode_job(deode_config, tmp_directory):
+    bundle = f"{tmp_directory}/deode.namelists.json"
+    programs = ["pgd", "prep", "offline", "soda"]
+    create_namelist_bundle(deode_config, bundle, programs=programs)
+
+    cache = NamelistCache()
+    for basetime in ["2025-02-09T00:00:00Z", "2025-02-10T06:00:00Z"]:
+        config = job_config(deode_config, basetime)
+        for program in programs:
+            assert cache.get(namelist_cache_key(program, config), bundle=bundle)
+
+
+def test_ensure_consistency(default_config, mocker):
+    check = mocker.patch("surfexp.experiment.check_consistency")
+    cache_dir = get_cache_dir(default_config, "consistency")
+    fname = f"{cache_dir}/{consistency_fingerprint(default_config)}.json"
+    if os.path.exists(fname):
+        os.remove(fname)
+    ensure_consistency(default_config)
+    ensure_consistency(default_config)
+    check.assert_called_once()
+    assert os.path.exists(fname)
+
+
+def test_load_config_cache(default_config_file, tmp_directory, mocker):
+    config_file = f"{tmp_directory}/config_cached.toml"
+    shutil.copy(default_config_file, config_file)
+    cache_dir = f"{tmp_directory}/config_cache"
+    schema = ConfigParserDefaults.MAIN_CONFIG_JSON_SCHEMA
+    CONFIG_CACHE.clear()
+
+    config = load_config(config_file, json_schema=schema, cache_dir=cache_dir)
+    key = config_cache_key(config_file, json_schema=schema)
+    assert os.path.exists(f"{cache_dir}/config_cached.toml.{key}.pickle")
+
+    from_file = mocker.spy(ParsedConfig, "from_file")
+    CONFIG_CACHE.clear()
+    cached = load_config(config_file, json_schema=schema, cache_dir=cache_dir)
+    from_file.assert_not_called()
+    assert cached.dict() == config.dict()
+
+    with open(config_file, mode="a", encoding="utf8") as fhandler:
+        fhandler.write("\n")
+    assert config_cache_key(config_file, json_schema=schema) != key
+    load_config(config_file, json_schema=schema, cache_dir=cache_dir)
+    from_file.assert_called_once()
+    assert not os.path.exists(f"{cache_dir}/config_cached.toml.{key}.pickle")
+    assert len(os.listdir(cache_dir)) == 1
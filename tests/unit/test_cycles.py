@@ -0,0 +1,70 @@
+from deode.datetime_utils import as_datetime, as_timedelta, get_decade
+
+from surfexp.cycles import CycleCalendar
+
+
+def reference_cycles(basetime, starttime, endtime, cycle_length, input_cycles_ahead=3):
+    cycles = {}
+    time_trigger_times = {}
+    prediction_trigger_times = {}
+    l_basetime = basetime
+    while l_basetime <= endtime:
+        c_index = l_basetime.strftime("%Y%m%d%H%M")
+        time_fam_start = l_basetime - cycle_length * input_cycles_ahead
+        time_trigger_times[c_index] = None
+        if time_fam_start >= starttime:
+            time_trigger_times[c_index] = time_fam_start.strftime("%Y%m%d%H%M")
+        prediction_time = max(l_basetime - cycle_length, starttime)
+        prediction_trigger_times[c_index] = prediction_time.strftime("%Y%m%d%H%M")
+        cycles[c_index] = {
+            "day": l_basetime.strftime("%Y%m%d"),
+            "time": l_basetime.strftime("%H%M"),
+            "validtime": l_basetime.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "basetime": l_basetime.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        l_basetime += cycle_length
+    return cycles, time_trigger_times, prediction_trigger_times
+
+
+def test_cycle_calendar():
+    starttime = as_datetime("2025-01-28T00:00:00Z")
+    basetime = as_datetime("2025-01-28T06:00:00Z")
+    endtime = as_datetime("2025-02-12T04:00:00Z")
+    cycle_length = as_timedelta("PT3H")
+
+    calendar = CycleCalendar(basetime, starttime, endtime, cycle_length)
+    cycles, time_triggers, prediction_triggers = reference_cycles(
+        basetime, starttime, endtime, cycle_length
+    )
+    assert len(calendar) == len(cycles)
+    assert calendar.cycles() == cycles
+    assert calendar.time_trigger_times() == time_triggers
+    assert calendar.prediction_trigger_times() == prediction_triggers
+
+    decades = calendar.decades()
+    for btime, decade in zip(cycles.values(), decades):
+        assert decade == get_decade(as_datetime(btime["basetime"]))
+
+
+def test_cycle_calendar_empty():
+    basetime = as_datetime("2025-01-28T06:00:00Z")
+    endtime = as_datetime("2025-01-28T03:00:00Z")
+    calendar = CycleCalendar(basetime, basetime, endtime, as_timedelta("PT1H"))
+    assert len(calendar) == 0
+    assert calendar.cycles() == {}
+    assert len(calendar.decades()) == 0
+    assert calendar.decade_starts() == {}
+
+
+def test_cycle_calendar_decade_starts():
+    starttime = as_datetime("2025-01-28T06:00:00Z")
+    endtime = as_datetime("2025-02-12T00:00:00Z")
+    calendar = CycleCalendar(starttime, starttime, endtime, as_timedelta("PT6H"))
+    decade_starts = calendar.decade_starts()
+    assert list(decade_starts) == [
+        get_decade(starttime),
+        get_decade(as_datetime("2025-02-01T00:00:00Z")),
+        get_decade(as_datetime("2025-02-11T00:00:00Z")),
+    ]
+    assert decade_starts[get_decade(starttime)] == starttime
+    assert decade_starts[get_decade(endtime)] == as_datetime("2025-02-11T00:00:00Z")
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from surfexp.tasks import forcing
+
+
+def test_convert_variable_keeps_existing(tmp_path, monkeypatch):
+    basetime = datetime(2025, 2, 9, tzinfo=timezone.utc)
+    ncdir = str(tmp_path)
+    (tmp_path / "default").mkdir()
+    calls = []
+
+    def converter2ds(argv):
+        calls.append(argv)
+        output = argv[argv.index("--output") + 1]
+        with open(output, mode="w", encoding="utf8") as fhandler:
+            fhandler.write("data")
+
+    monkeypatch.setattr(forcing, "converter2ds", converter2ds)
+    args = (ncdir, "default", "sfx_hres", basetime, 3, "air_temperature_2m")
+    output = forcing.convert_variable("domain.json", *args)
+    assert output == f"{ncdir}/default/air_temperature_2m_2025020900+03.nc"
+    assert sorted(path.name for path in (tmp_path / "default").iterdir()) == [
+        "air_temperature_2m_2025020900+03.nc"
+    ]
+    assert calls[0][calls[0].index("--validtime") + 1] == "2025020903"
+
+    forcing.convert_variable("domain.json", *args)
+    assert len(calls) == 1
+
+
+def test_concat_step(tmp_path, monkeypatch):
+    basetime = datetime(2025, 2, 9, tzinfo=timezone.utc)
+    (tmp_path / "default").mkdir()
+    calls = []
+    monkeypatch.setattr(forcing, "concat_datasets", lambda argv: calls.append(argv))
+    output = forcing.concat_step(str(tmp_path), "default", "sfx_hres", basetime, 0)
+    assert output == f"{tmp_path}/default/sfx_hres_2025020900+00.nc"
+    assert len(calls[0]) == 2 + len(forcing.INTERPOLATE2GRID_MAPPING)
+
+
+def test_convert_variable_removes_tmp_files(tmp_path, monkeypatch):
+    basetime = datetime(2025, 2, 9, tzinfo=timezone.utc)
+    ncdir = str(tmp_path)
+    (tmp_path / "default").mkdir()
+    stale = tmp_path / "default" / "tmp1_air_temperature_2m_2025020900+03.nc"
+    stale.write_text("partial")
+    other = tmp_path / "default" / "tmp1_x_air_temperature_2m_2025020900+03.nc"
+    other.write_text("other")
+
+    def converter2ds(argv):
+        output = argv[argv.index("--output") + 1]
+        with open(output, mode="w", encoding="utf8") as fhandler:
+            fhandler.write("partial")
+        raise RuntimeError("converter2ds failed")
+
+    monkeypatch.setattr(forcing, "converter2ds", converter2ds)
+    args = (ncdir, "default", "sfx_hres", basetime, 3, "air_temperature_2m")
+    with pytest.raises(RuntimeError, match="converter2ds failed"):
+        forcing.convert_variable("domain.json", *args)
+    assert sorted(path.name for path in (tmp_path / "default").iterdir()) == [
+        other.name
+    ]
@@ -0,0 +1,30 @@
+import sqlite3
+
+from surfexp.harp import merge_sqlite
+
+
+def _write_table(fname, rows):
+    connection = sqlite3.connect(fname)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS FC (fcst_dttm INTEGER, lead_time INTEGER, "
+        "SID INTEGER, T2m REAL, PRIMARY KEY (fcst_dttm, lead_time, SID))"
+    )
+    connection.executemany("INSERT OR REPLACE INTO FC VALUES (?, ?, ?, ?)", rows)
+    connection.commit()
+    connection.close()
+
+
+def test_merge_sqlite(tmp_path):
+    source = f"{tmp_path}/local/FCTABLE.sqlite"
+    target = f"{tmp_path}/shared/FCTABLE.sqlite"
+    (tmp_path / "local").mkdir()
+    _write_table(source, [(0, 1, 100, 270.0), (0, 2, 100, 271.0)])
+
+    assert merge_sqlite(source, target) == 2
+    _write_table(source, [(0, 2, 100, 272.0), (0, 3, 100, 273.0)])
+    merge_sqlite(source, target)
+
+    connection = sqlite3.connect(target)
+    rows = connection.execute("SELECT lead_time, T2m FROM FC ORDER BY lead_time")
+    assert rows.fetchall() == [(1, 270.0), (2, 272.0), (3, 273.0)]
+    connection.close()
@@ -0,0 +1,29 @@
+import pytest
+
+from surfexp.lazy import LazyModule, LazyObject
+
+
+def test_lazy_module():
+    module = LazyModule("json")
+    assert "not loaded" in repr(module)
+    assert module.dumps([1]) == "[1]"
+    assert "(loaded)" in repr(module)
+
+
+def test_lazy_module_error_message():
+    module = LazyModule("surfexp_non_existing_module", error_message="Install it")
+    with pytest.raises(ImportError, match="Install it"):
+        module.Dataset  # noqa B018
+
+
+def test_lazy_object():
+    join = LazyObject("os.path", "join")
+    assert join("a", "b") == "a/b"
+
+
+def test_lazy_object_patchable(mocker):
+    import surfexp.tasks.tasks
+
+    titan = mocker.patch("surfexp.tasks.tasks.titan")
+    surfexp.tasks.tasks.titan(["--help"])
+    titan.assert_called_once_with(["--help"])
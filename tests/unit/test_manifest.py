@@ -0,0 +1,45 @@
+import pytest
+from deode.datetime_utils import as_datetime
+
+from surfexp.manifest import CycleManifest
+from surfexp.tasks.tasks import PrepareCycle
+
+
+def test_cycle_manifest(tmp_directory):
+    basetime = as_datetime("2025-02-09T03:00:00Z")
+    filename = CycleManifest.get_filename(f"{tmp_directory}/manifests", basetime)
+    assert filename.endswith("202502090300.json")
+
+    manifest = CycleManifest(fingerprint="abc")
+    manifest.add("archive_dir", basetime, "/archive/2025/02/09/03")
+    manifest.add("climdir", None, "/clim")
+    manifest.save(filename)
+
+    loaded = CycleManifest.load(filename, fingerprint="abc")
+    assert loaded.get("archive_dir", basetime) == "/archive/2025/02/09/03"
+    assert loaded.get("climdir") == "/clim"
+    assert loaded.get("archive_dir", as_datetime("2025-02-09T06:00:00Z")) is None
+    assert loaded.get("obs_dir", basetime) is None
+
+    assert CycleManifest.load(filename, fingerprint="other").paths == {}
+    assert CycleManifest.load(f"{tmp_directory}/missing.json").paths == {}
+
+
+@pytest.mark.usefixtures("project_directory")
+def test_prepare_cycle_writes_manifest(default_config, tmp_directory):
+    task_config = default_config.copy(
+        {"general": {"case": "manifest"}, "platform": {"scratch": tmp_directory}}
+    )
+    task = PrepareCycle(task_config)
+    task.execute()
+    basetime = task.cycle_basetime
+    fg_basetime = basetime - task.fcint
+
+    other = PrepareCycle(task_config)
+    manifest = other.cycle_manifest
+    assert manifest.get("archive_dir", basetime) == task.platform.substitute(
+        task_config["system.archive_dir"], basetime=basetime
+    )
+    assert manifest.get("forcing_dir/default", fg_basetime) is not None
+    assert manifest.get("first_guess_dir", basetime) is not None
+    assert other.get_pgdfile(basetime) == task.get_pgdfile(basetime)
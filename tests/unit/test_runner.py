@@ -0,0 +1,39 @@
+import io
+import os
+import sys
+import threading
+import time
+
+from surfexp.templates.runner import TaskRunner, config_file, submit
+
+
+def test_config_file():
+    assert config_file({"CONFIG": "config.toml"}) == "config.toml"
+    kwargs = {"template": "stand_alone", "STAND_ALONE_TASK_CONFIG": "stand_alone.toml"}
+    assert config_file(kwargs) == "stand_alone.toml"
+
+
+def test_task_runner(tmp_path, mocker):
+    def run_template(kwargs):
+        print("Running", kwargs["name"], os.environ["SURFEXP_RUNNER_TEST"])
+        sys.exit(3)
+
+    mocker.patch("surfexp.templates.cli.run_template", side_effect=run_template)
+    mocker.patch.dict(os.environ, {"SURFEXP_RUNNER_TEST": "forwarded"})
+    socket_path = f"{tmp_path}/runner.sock"
+    runner = TaskRunner(socket_path=socket_path, preload=[])
+    thread = threading.Thread(target=runner.serve)
+    thread.start()
+    try:
+        for __ in range(100):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+        output = io.StringIO()
+        status = submit({"name": "task"}, socket_path=socket_path, output=output)
+    finally:
+        runner.stop()
+        thread.join()
+    assert status == 3
+    assert "Running task forwarded" in output.getvalue()
+    assert not os.path.exists(socket_path)
@@ -0,0 +1,32 @@
+from deode.datetime_utils import as_datetime, get_decade
+
+from surfexp.substitution import TemplateEngine
+
+
+def test_render():
+    engine = TemplateEngine({"casedir": "/case", "CLIMDIR": "/clim", "number": 1})
+    assert engine.render("@casedir@/@CASEDIR@/@climdir@") == "/case//case//clim"
+    assert engine.render("@casedir@/@YYYY@/@NUMBER@") == "/case/@YYYY@/@NUMBER@"
+    assert engine.render("a@b@casedir@") == "a@b/case"
+    assert engine.render("") == ""
+    assert engine.render(None) is None
+
+
+def test_render_decade():
+    basetime = as_datetime("2025-02-09T00:00:00Z")
+    engine = TemplateEngine({"climdir": "/clim"}, one_decade=True)
+    pattern = "@climdir@/PGD_@DECADE@.nc"
+    assert engine.render(pattern) == pattern.replace("@climdir@", "/clim")
+    assert engine.render(pattern, basetime=basetime) == f"/clim/PGD_{get_decade(basetime)}.nc"
+
+    engine = TemplateEngine({"climdir": "/clim"}, one_decade=False)
+    assert engine.render(pattern, basetime=basetime) == "/clim/PGD_.nc"
+
+
+def test_render_many():
+    engine = TemplateEngine({"BASETIME": "2025020900"}, case_insensitive=False)
+    assert engine.render_many(["@BASETIME@", "@basetime@"]) == [
+        "2025020900",
+        "@basetime@",
+    ]
+    assert len(engine.compiled) == 2
@@ -1,10 +1,24 @@
+from collections import Counter
+
+import ecflow
 import pytest
 from deode.config_parser import ConfigParserDefaults, ParsedConfig
+from deode.datetime_utils import as_datetime
 from deode.derived_variables import set_times
 
 from surfexp import PACKAGE_DIRECTORY
 from surfexp.cli import pysfxexp
-from surfexp.suites.offline import SurfexSuiteDefinition
+from surfexp.experiment import (
+    SettingsFromNamelistAndConfig,
+    SuiteNamelistSettings,
+    get_perturbations,
+)
+from surfexp.sizing import SuiteSizing
+from surfexp.suites.compact import SurfexCompactSuiteDefinition
+from surfexp.suites.offline import TASK_LIMIT_CLASSES, SurfexSuiteDefinition
+from surfexp.suites.triggers import parse_trigger
+from surfexp.tasks.suite import SuiteExtender
+from surfexp.templates.local import LocalExecutor, local_tasks
 
 
 @pytest.fixture(name="mock_submission")
@@ -54,3 +68,367 @@ def test_offline_suite(default_config):
 @pytest.mark.usefixtures("mock_submission", "project_directory")
 def test_offline_sekf_suite(sekf_config):
     SurfexSuiteDefinition(sekf_config)
+
+
+@pytest.mark.usefixtures("project_directory")
+def test_suite_namelist_settings(sekf_config):
+    nml_settings = SuiteNamelistSettings(sekf_config)
+    soda = SettingsFromNamelistAndConfig("soda", sekf_config)
+    assert nml_settings.schemes["CASSIM_ISBA"] == soda.get_setting(
+        "NAM_ASSIM#CASSIM_ISBA"
+    )
+    for basetime in ["2025-02-09T03:00:00Z", "2025-02-10T03:00:00Z"]:
+        basetime = as_datetime(basetime)
+        expected = soda.get_nnco(sekf_config, basetime=basetime)
+        assert nml_settings.nnco(basetime) == expected
+    assert list(nml_settings.nnco_by_hour) == [3]
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_offline_suite_window(default_config):
+    config = default_config.copy(
+        {
+            "general": {
+                "times": {
+                    "basetime": "2025-02-09T00:00:00Z",
+                    "start": "2025-02-09T00:00:00Z",
+                    "end": "2025-02-14T21:00:00Z",
+                }
+            },
+            "suite_control": {"window_days": 2},
+        }
+    )
+    suite = SurfexSuiteDefinition(config)
+    assert suite.day_names == ["20250209", "20250210"]
+    assert suite.next_window_basetime == as_datetime("2025-02-11T00:00:00Z")
+
+    config = config.copy({"suite_control": {"window_days": 0}})
+    suite = SurfexSuiteDefinition(config)
+    assert len(suite.day_names) == 6
+    assert suite.next_window_basetime is None
+
+
+class WindowClient:
+    """Client serving a suite definition and recording the changes."""
+
+    def __init__(self, defs):
+        self.defs = defs
+        self.replaced = []
+        self.deleted = []
+
+    def sync_local(self):
+        pass
+
+    def get_defs(self):
+        return self.defs
+
+    def replace(self, path, defs_file, parent, force):
+        self.replaced.append(path)
+
+    def delete(self, path, force):
+        self.deleted.append(path)
+
+
+def trigger_paths(node):
+    trigger = node.get_trigger()
+    if trigger is None:
+        return []
+    return parse_trigger(trigger.get_expression())
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_suite_extender(default_config, tmp_directory, mocker):
+    config = default_config.copy(
+        {
+            "general": {
+                "case": "window",
+                "times": {
+                    "basetime": "2025-02-09T00:00:00Z",
+                    "start": "2025-02-09T00:00:00Z",
+                    "end": "2025-02-14T21:00:00Z",
+                },
+            },
+            "platform": {"scratch": tmp_directory},
+            "suite_control": {"window_days": 2},
+        }
+    )
+    suite = SurfexSuiteDefinition(config)
+    name = suite.name
+    defs_file = f"{tmp_directory}/window_first.def"
+    suite.save_as_defs(defs_file)
+    defs = ecflow.Defs(defs_file)
+
+    # The next window is added when the input of the last cycle is complete
+    extender = defs.find_abs_node(f"/{name}/20250210/SuiteExtender")
+    assert trigger_paths(extender) == [f"/{name}/20250210/2100/CycleInput"]
+
+    args = {"next_basetime": "2025-02-11T00:00:00Z", "suite": name}
+    config = config.copy(
+        {
+            "general": {"times": {"basetime": "2025-02-10T00:00:00Z"}},
+            "task": {"args": args},
+        }
+    )
+    task = SuiteExtender(config)
+    next_defs_file, day_names = task.generate_window()
+    assert day_names == ["20250211", "20250212"]
+
+    # The first cycles of the next window are triggered by the previous window
+    next_defs = ecflow.Defs(next_defs_file)
+    previous_day = f"/{name}/20250210"
+    first_cycle = next_defs.find_abs_node(f"/{name}/20250211/0000")
+    assert f"{previous_day}/1500" in trigger_paths(first_cycle)
+    for node in first_cycle.nodes:
+        paths = trigger_paths(node)
+        if node.name() in ("PrepareCycle", "CycleInput"):
+            assert not any(path.startswith(previous_day) for path in paths)
+        else:
+            assert f"{previous_day}/2100" in paths
+    third_cycle = next_defs.find_abs_node(f"/{name}/20250211/0600")
+    assert f"{previous_day}/2100" in trigger_paths(third_cycle)
+    fourth_cycle = next_defs.find_abs_node(f"/{name}/20250211/0900")
+    assert not any(
+        path.startswith(previous_day) for path in trigger_paths(fourth_cycle)
+    )
+
+    client = WindowClient(defs)
+    mocker.patch.object(SuiteExtender, "get_client", return_value=client)
+    mocker.patch("surfexp.tasks.suite.is_complete", return_value=True)
+    task.execute()
+    assert client.replaced == [f"/{name}/20250211", f"/{name}/20250212"]
+    assert client.deleted == [f"/{name}/20250209"]
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_compact_suite(default_config):
+    config = default_config.copy(
+        {
+            "general": {
+                "times": {
+                    "basetime": "2025-02-09T00:00:00Z",
+                    "start": "2025-02-09T00:00:00Z",
+                    "end": "2025-02-14T21:00:00Z",
+                }
+            }
+        }
+    )
+    short = SurfexCompactSuiteDefinition(config)
+    config = config.copy({"general": {"times": {"end": "2025-03-14T21:00:00Z"}}})
+    long = SurfexCompactSuiteDefinition(config)
+    assert len(list(short.suite.ecf_node.get_all_nodes())) == len(
+        list(long.suite.ecf_node.get_all_nodes())
+    )
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_compact_sekf_suite(sekf_config):
+    SurfexCompactSuiteDefinition(sekf_config)
+
+
+@pytest.mark.parametrize("one_decade", [True, False])
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_suite_static_data(default_config, one_decade):
+    config = default_config.copy({"pgd": {"one_decade": one_decade}})
+    for suite_class in (SurfexSuiteDefinition, SurfexCompactSuiteDefinition):
+        suite = suite_class(config)
+        static_data = suite.suite.ecf_node.find_node("StaticData")
+        pgd_tasks = [
+            task for task in static_data.get_all_tasks() if task.name() == "OfflinePgd"
+        ]
+        assert len(pgd_tasks) > 0
+        for task in pgd_tasks:
+            assert task.find_variable("ARGS").value().startswith("basetime=")
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_offline_suite_interpolate2grid_per_mode(default_config):
+    config = default_config.copy(
+        {
+            "suite_control": {
+                "interpolate2grid": True,
+                "interpolate2grid_per_mode": True,
+            }
+        }
+    )
+    suite = SurfexSuiteDefinition(config)
+    names = [node.name() for node in suite.suite.ecf_node.get_all_nodes()]
+    assert "Interpolate2grid" in names
+    assert not any(name.startswith("bd_input") for name in names)
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_offline_suite_batch_verification(default_config):
+    config = default_config.copy({"suite_control": {"batch_verification": True}})
+    suite = SurfexSuiteDefinition(config)
+    names = [node.name() for node in suite.suite.ecf_node.get_all_nodes()]
+    assert "HarpSQLiteBatch" in names
+    assert "HarpSQLite" not in names
+
+
+SIZING_TIMES = {
+    "basetime": "2025-02-09T00:00:00Z",
+    "start": "2025-02-09T00:00:00Z",
+    "end": "2025-02-12T21:00:00Z",
+}
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+@pytest.mark.parametrize(
+    ("config_name", "update", "suite_class"),
+    [
+        ("default_config", {}, SurfexSuiteDefinition),
+        ("sekf_config", {}, SurfexSuiteDefinition),
+        (
+            "default_config",
+            {"general": {"times": SIZING_TIMES}, "suite_control": {"window_days": 2}},
+            SurfexSuiteDefinition,
+        ),
+        (
+            "default_config",
+            {
+                "general": {"times": SIZING_TIMES},
+                "suite_control": {"suite_definition": "SurfexCompactSuiteDefinition"},
+            },
+            SurfexCompactSuiteDefinition,
+        ),
+    ],
+)
+def test_suite_sizing(config_name, update, suite_class, request):
+    config = request.getfixturevalue(config_name).copy(update)
+    report = SuiteSizing(config).report()
+
+    suite = suite_class(config)
+    nodes = list(suite.suite.ecf_node.get_all_nodes())
+    tasks = Counter(node.name() for node in nodes if isinstance(node, ecflow.Task))
+    families = [node for node in nodes if isinstance(node, ecflow.Family)]
+    assert report["tasks"] == dict(sorted(tasks.items()))
+    assert report["total_families"] == len(families)
+    assert report["total_job_submissions"] >= report["total_tasks"]
+    assert report["peak_concurrent_tasks"] <= report["max_tasks"]
+    if suite_class is SurfexCompactSuiteDefinition:
+        assert report["cycles"] == len(suite.repeat_basetimes) + int(suite.do_prep)
+        assert report["days"] == 4
+    if config.get("suite_control.window_days", 0) > 0:
+        assert report["days"] == 2
+        assert report["next_window_basetime"] == str(suite.next_window_basetime)
+
+
+def test_suite_sizing_cycle_basetimes():
+    class RepeatSuite:
+        repeat_basetimes = [
+            as_datetime("2025-02-09T00:00:00Z"),
+            as_datetime("2025-02-09T12:00:00Z"),
+            as_datetime("2025-02-10T00:00:00Z"),
+        ]
+
+    suite = RepeatSuite()
+    basetimes = SuiteSizing.cycle_basetimes(suite, "%CYCLE%")
+    assert basetimes == suite.repeat_basetimes
+    basetimes = SuiteSizing.cycle_basetimes(suite, "%CYCLE%T000000")
+    assert basetimes == [suite.repeat_basetimes[0], suite.repeat_basetimes[2]]
+    basetimes = SuiteSizing.cycle_basetimes(suite, "2025-02-09T06:00:00Z")
+    assert basetimes == [as_datetime("2025-02-09T06:00:00Z")]
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_offline_suite_limits(default_config):
+    config = default_config.copy(
+        {
+            "suite_control": {
+                "limits": {"postprocessing": 4},
+                "priority_classes": ["binaries"],
+            }
+        }
+    )
+    suite = SurfexSuiteDefinition(config)
+    suite_node = suite.suite.ecf_node
+    limits = {limit.name(): limit.limit() for limit in suite_node.limits}
+    assert limits == {"max_tasks": 20, "limit_postprocessing": 4, "regular_tasks": 15}
+    assert [inlimit.name() for inlimit in suite_node.inlimits] == ["max_tasks"]
+    for task in suite_node.get_all_tasks():
+        inlimits = [inlimit.name() for inlimit in task.inlimits]
+        task_class = TASK_LIMIT_CLASSES.get(task.name())
+        assert task_class is not None
+        if task_class == "binaries":
+            assert inlimits == []
+        elif task_class == "postprocessing":
+            assert inlimits == ["limit_postprocessing", "regular_tasks"]
+        else:
+            assert inlimits == ["regular_tasks"]
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_offline_suite_default_limit_class(default_config, monkeypatch):
+    task_limit_classes = dict(TASK_LIMIT_CLASSES)
+    task_limit_classes.pop("PrepareCycle")
+    monkeypatch.setattr("surfexp.suites.offline.TASK_LIMIT_CLASSES", task_limit_classes)
+    config = default_config.copy({"suite_control": {"limits": {"default": 2}}})
+    suite_node = SurfexSuiteDefinition(config).suite.ecf_node
+    for task in suite_node.get_all_tasks():
+        inlimits = [inlimit.name() for inlimit in task.inlimits]
+        if task.name() == "PrepareCycle":
+            assert inlimits == ["limit_default"]
+        else:
+            assert inlimits == []
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_offline_suite_max_iterations(default_config):
+    config = default_config.copy({"suite_control": {"max_iterations": 4}})
+    suite_node = SurfexSuiteDefinition(config).suite.ecf_node
+    assert suite_node.find_variable("MAX_ITERATIONS").value() == "4"
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_offline_suite_reduce_triggers(default_config):
+    suite = SurfexSuiteDefinition(default_config)
+    assert suite.removed_triggers == 0
+    config = default_config.copy({"suite_control": {"reduce_triggers": True}})
+    suite = SurfexSuiteDefinition(config)
+    assert suite.removed_triggers > 0
+
+
+def test_get_perturbations():
+    perturbations = get_perturbations([1, 0, 1], ["A", "B", "C"], True)
+    assert [(pert["pert"], pert["name"], pert["ivar"]) for pert in perturbations] == [
+        (0, "REF", 0),
+        (1, "A", 1),
+        (3, "C", 2),
+        (4, "A", 1),
+        (6, "C", 2),
+    ]
+    assert [pert["pert_sign"] for pert in perturbations] == [
+        None,
+        "pos",
+        "pos",
+        "neg",
+        "neg",
+    ]
+    assert len(get_perturbations(None, None, False)) == 1
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_offline_sekf_suite_batch_perturbations(sekf_config):
+    config = sekf_config.copy({"suite_control": {"batch_perturbations": True}})
+    suite = SurfexSuiteDefinition(config)
+    names = [node.name() for node in suite.suite.ecf_node.get_all_tasks()]
+    assert "PerturbedRuns" in names
+    assert "PerturbedRun" not in names
+
+
+@pytest.mark.usefixtures("mock_submission", "project_directory")
+def test_local_executor(default_config, mocker):
+    suite = SurfexSuiteDefinition(default_config, dry_run=True)
+    tasks = local_tasks(suite.suite.ecf_node)
+    assert len(tasks) == len(list(suite.suite.ecf_node.get_all_tasks()))
+    forcing = [task for task in tasks.values() if task.name == "Forcing"][0]
+    assert any(dep.endswith("/PrepareCycle") for dep in forcing.dependencies)
+    assert "BASETIME" in forcing.variables
+
+    run_local_task = mocker.patch("surfexp.templates.local.run_local_task")
+    completed = LocalExecutor(default_config, tasks).run()
+    assert run_local_task.call_count == len(tasks)
+    order = {path: index for index, path in enumerate(completed)}
+    for path, task in tasks.items():
+        for dep in task.dependencies:
+            assert order[dep] < order[path]
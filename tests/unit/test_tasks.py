@@ -2,6 +2,7 @@ import contextlib
 import os
 import sys
 import types
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
@@ -11,6 +12,7 @@ from deode.tasks.base import Task
 from deode.tasks.discover_task import discover, get_task
 
 from surfexp import PACKAGE_DIRECTORY
+from surfexp.tasks.tasks import PrepareCycle, converter2harp_cached
 
 
 def available_tasks():
@@ -64,14 +66,15 @@ def create_binaries(casedir, task_name, task_config):
     need_pgd = False
     need_prep = False
     task_config = task_config.copy(update)
-    if task_name in ("offlineforecast", "perturbedrun"):
+    if task_name in ("offlineforecast", "perturbedrun", "perturbedruns"):
         need_pgd = True
         need_prep = True
-        if task_name == "perturbedrun":
+        if task_name in ("perturbedrun", "perturbedruns"):
             forcing_dir = f"{casedir}/forcing/2025020821/"
             diag_output = "SURFOUT.20250209_00h00.nc"
-            args = {"task": {"args": {"pert": "1"}}}
-            task_config = task_config.copy(args)
+            if task_name == "perturbedrun":
+                args = {"task": {"args": {"pert": "1"}}}
+                task_config = task_config.copy(args)
             archive = f"{casedir}/archive/2025/02/08/21/"
             deodemakedirs(archive)
             os.system(f"touch {archive}/ANALYSIS.nc")  # noqa S605
@@ -162,6 +165,7 @@ def fixture_task_name_and_configs(request, default_config, tmp_directory):
         "offlineprep",
         "offlineforecast",
         "perturbedrun",
+        "perturbedruns",
         "soda",
     ]:
         task_config = create_binaries(casedir, task_name, task_config)
@@ -189,6 +193,9 @@ def fixture_task_name_and_configs(request, default_config, tmp_directory):
             }
         }
         task_config = task_config.copy(update)
+    elif task_name.lower() == "harpsqlitebatch":
+        update = {"task": {"args": {"mode": "cycle"}}}
+        task_config = task_config.copy(update)
     elif task_name.lower() == "modifyforcing":
         update = {"task": {"args": {"var_name": "SWdir", "mode": "default"}}}
         task_config = task_config.copy(update)
@@ -233,6 +240,13 @@ def fixture_task_name_and_configs(request, default_config, tmp_directory):
     elif task_name.lower() == "qc2obsmon":
         update = {"task": {"args": {"mode": "an_forcing"}}}
         task_config = task_config.copy(update)
+    elif task_name.lower() == "suiteextender":
+        update = {
+            "task": {
+                "args": {"next_basetime": "2025-02-10T00:00:00Z", "suite": task_name}
+            }
+        }
+        task_config = task_config.copy(update)
     elif task_name.lower() == "harpsqlite2":
         update = {"task": {"args": {"basetime": "2025-02-09T00:00:00Z"}}}
         task_config = task_config.copy(update)
@@ -243,6 +257,7 @@ def fixture_task_name_and_configs(request, default_config, tmp_directory):
 def _mockers_for_task_run_tests(session_mocker):
     session_mocker.patch("surfexp.tasks.compilation.BatchJob")
     session_mocker.patch("surfexp.tasks.tasks.converter2harp_cli")
+    session_mocker.patch("surfexp.tasks.tasks.converter2harp_cached")
     session_mocker.patch("surfexp.tasks.tasks.BatchJob")
     session_mocker.patch("surfexp.tasks.fetch_mars.BatchJob")
     session_mocker.patch("surfexp.tasks.tasks.cli_oi2soda")
@@ -260,6 +275,8 @@ def _mockers_for_task_run_tests(session_mocker):
     session_mocker.patch("surfexp.tasks.forcing.create_forcing")
     session_mocker.patch("surfexp.tasks.tasks.cryoclim_pseudoobs")
     session_mocker.patch("surfexp.tasks.gmtedsoil.gdal")
+    session_mocker.patch("surfexp.tasks.suite.Client")
+    session_mocker.patch("surfexp.tasks.suite.SurfexSuiteDefinition")
 
 
 class TestTasks:
@@ -277,3 +294,116 @@ class TestTasks:
         org_cwd = Path.cwd()
         my_task_class.run()
         os.chdir(org_cwd)
+
+
+@pytest.mark.usefixtures("project_directory")
+def test_lazy_attributes(default_config, tmp_directory):
+    task_config = default_config.copy(
+        {"general": {"case": "lazy"}, "platform": {"scratch": tmp_directory}}
+    )
+    task = PrepareCycle(task_config)
+    assert task.lazy_attributes_used == []
+    assert task.suffix == ".nc"
+    assert task.lazy_attributes_used == ["suffix", "soda_settings"]
+    assert task.suffix == ".nc"
+    assert task.lazy_attributes_used == ["suffix", "soda_settings"]
+
+
+@pytest.mark.usefixtures("project_directory")
+def test_prepare_cycle_timing(default_config, tmp_directory, mocker):
+    task_config = default_config.copy(
+        {
+            "general": {"case": "prepare_cycle_timing"},
+            "platform": {"scratch": tmp_directory},
+            "suite_control": {"cycle_manifest": False},
+        }
+    )
+    task = PrepareCycle(task_config)
+    deodemakedirs(task.wrk)
+    write_timing = mocker.patch.object(task, "write_timing")
+    task.run()
+    assert not os.path.exists(task.wrk)
+    assert "run" in task.timer.phases
+    write_timing.assert_called_once_with("complete")
+
+
+@pytest.mark.usefixtures("project_directory")
+def test_perturbed_runs_failures(default_config, tmp_directory, mocker):
+    casedir = f"{tmp_directory}/deode/perturbedruns"
+    task_config = default_config.copy(
+        {
+            "general": {"case": "perturbedruns"},
+            "platform": {"scratch": tmp_directory},
+            "submission": {"task": {"wrapper": "srun"}},
+        }
+    )
+    task_config = create_binaries(casedir, "perturbedruns", task_config)
+    perturbed_offline = mocker.patch(
+        "surfexp.tasks.surfex_binary_task.perturbed_offline",
+        side_effect=RuntimeError("failed"),
+    )
+    task = get_task("PerturbedRuns", task_config)
+    mocker.patch.object(task, "get_nproc", return_value=1)
+    org_cwd = Path.cwd()
+    with pytest.raises(RuntimeError, match="Perturbed runs failed"):
+        task.execute()
+    os.chdir(org_cwd)
+    assert perturbed_offline.call_count == len(task.perturbations)
+    for call in perturbed_offline.call_args_list:
+        argv = call.kwargs["argv"]
+        assert argv[argv.index("--wrapper") + 1] == "srun"
+
+
+@pytest.mark.usefixtures("project_directory")
+def test_perturbed_runs_pooled_without_wrapper(default_config, tmp_directory, mocker):
+    casedir = f"{tmp_directory}/deode/perturbedruns_pooled"
+    task_config = default_config.copy(
+        {
+            "general": {"case": "perturbedruns_pooled"},
+            "platform": {"scratch": tmp_directory},
+            "submission": {"task": {"wrapper": "srun"}},
+        }
+    )
+    task_config = create_binaries(casedir, "perturbedruns", task_config)
+    perturbed_offline = mocker.patch("surfexp.tasks.surfex_binary_task.perturbed_offline")
+    mocker.patch(
+        "surfexp.tasks.surfex_binary_task.ProcessPoolExecutor", ThreadPoolExecutor
+    )
+    task = get_task("PerturbedRuns", task_config)
+    mocker.patch.object(task, "get_nproc", return_value=2)
+    org_cwd = Path.cwd()
+    task.execute()
+    os.chdir(org_cwd)
+    assert perturbed_offline.call_count == len(task.perturbations)
+    for call in perturbed_offline.call_args_list:
+        argv = call.kwargs["argv"]
+        assert argv[argv.index("--wrapper") + 1] == ""
+
+
+def test_converter2harp_cached_shares_cache(monkeypatch):
+    class FakeConverter:
+        def __init__(self, name):
+            self.name = name
+            self.caches = []
+
+        def read_time_step(self, geo, validtime, cache):
+            self.caches.append(cache)
+
+    def converter2harp(converter, **kwargs):
+        converter.read_time_step("geo", "validtime", None)
+        assert kwargs == {"model-name": "SURFEX"}
+
+    converters = [FakeConverter("t2m"), FakeConverter("rh2m")]
+    monkeypatch.setattr(
+        "surfexp.tasks.tasks.parse_args_converter2harp",
+        lambda argv: (None, {"model-name": "SURFEX"}),
+    )
+    monkeypatch.setattr(
+        "surfexp.tasks.tasks.get_multi_converters",
+        lambda parser, multivars, argv: converters[int(argv[-1])],
+    )
+    monkeypatch.setattr("surfexp.tasks.tasks.converter2harp", converter2harp)
+    cache = object()
+    converter2harp_cached(["--variable", "0"], cache)
+    converter2harp_cached(["--variable", "1"], cache)
+    assert [conv.caches for conv in converters] == [[cache], [cache]]
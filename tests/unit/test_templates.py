@@ -0,0 +1,162 @@
+import pytest
+
+from surfexp.templates.ecflow.default import normalize_time
+from surfexp.templates.ecflow.requeue import (
+    advance_times,
+    default_main,
+    get_max_iterations,
+    iteration_times,
+)
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("20250209T030000", "2025-02-09T03:00:00Z"),
+        ("2025-02-09T03:00:00Z", "2025-02-09T03:00:00Z"),
+        ("20250209TXX0000", "20250209TXX0000"),
+        (None, None),
+    ],
+)
+def test_normalize_time(value, expected):
+    assert normalize_time(value) == expected
+
+
+def test_iteration_times():
+    basetime = "2025-02-09T00:00:00Z"
+    validtime = "2025-02-09T03:00:00Z"
+    times = iteration_times(basetime, validtime, "PT3H", 3, end="2025-02-09T03:00:00Z")
+    assert times == [
+        ("2025-02-09T00:00:00Z", "2025-02-09T03:00:00Z"),
+        ("2025-02-09T03:00:00Z", "2025-02-09T06:00:00Z"),
+    ]
+
+    times = iteration_times("2025-02-09T00:00:00Z", "2025-02-09T00:00:00Z", "PT3H", 1)
+    assert times == [("2025-02-09T00:00:00Z", "2025-02-09T00:00:00Z")]
+
+
+class RequeueClient:
+    """Ecflow client recording the calls of the requeue template."""
+
+    def __init__(self, max_iterations=""):
+        self.max_iterations = max_iterations
+        self.variables = {}
+        self.events = []
+
+    def query(self, query_type, path, name):
+        assert (query_type, name) == ("variable", "MAX_ITERATIONS")
+        if self.max_iterations is None:
+            raise RuntimeError("No server")
+        return self.max_iterations
+
+    def alter(self, path, action, kind, name, value):
+        assert (action, kind) == ("add", "variable")
+        self.variables.update({(path, name): value})
+
+    def requeue(self, path):
+        self.events.append("requeue")
+
+    def child_meter(self, name, value):
+        pass
+
+    def child_label(self, name, value):
+        pass
+
+
+class TaskEcflowClient:
+    """Context manager signalling completion like deode's EcflowClient."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __enter__(self):
+        self.client.events.append("init")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.client.events.append("complete")
+
+
+def test_advance_times():
+    client = RequeueClient()
+    basetime = "2025-02-09T00:00:00Z"
+    validtime = "2025-02-09T03:00:00Z"
+    assert advance_times(client, "/suite/task", basetime, validtime, "PT3H")
+    assert client.variables == {
+        ("/suite/task", "BASETIME"): "2025-02-09T03:00:00Z",
+        ("/suite/task", "VALIDTIME"): "2025-02-09T06:00:00Z",
+    }
+    client = RequeueClient()
+    end = "2025-02-09T00:00:00Z"
+    assert not advance_times(client, "/suite/task", basetime, validtime, "PT3H", end)
+    assert client.variables == {}
+
+
+def test_get_max_iterations(default_config):
+    config = default_config.copy({"suite_control": {"max_iterations": 3}})
+    assert get_max_iterations(RequeueClient("2"), "/suite/task", config) == 2
+    assert get_max_iterations(RequeueClient(""), "/suite/task", config) == 3
+    assert get_max_iterations(RequeueClient(None), "/suite/task", config) == 3
+
+
+@pytest.mark.parametrize(
+    ("end", "events", "basetimes"),
+    [
+        (
+            "2025-02-10T00:00:00Z",
+            ["init", "requeue", "complete", "requeue"],
+            ["2025-02-09T00:00:00Z", "2025-02-09T03:00:00Z"],
+        ),
+        (
+            "2025-02-09T03:00:00Z",
+            ["init", "complete"],
+            ["2025-02-09T00:00:00Z", "2025-02-09T03:00:00Z"],
+        ),
+    ],
+)
+def test_requeue_iterations(default_config, mocker, end, events, basetimes):
+    config = default_config.copy(
+        {"general": {"times": {"cycle_length": "PT3H", "end": end}}}
+    )
+    client = RequeueClient("2")
+    mocker.patch(
+        "surfexp.templates.ecflow.requeue.EcflowClient",
+        side_effect=lambda server, task: TaskEcflowClient(client),
+    )
+    mocker.patch("surfexp.templates.ecflow.requeue.load_config", return_value=config)
+    mocker.patch("surfexp.templates.ecflow.requeue.EcflowServer")
+    mocker.patch("surfexp.templates.ecflow.requeue.ProcessorLayout")
+    mocker.patch("surfexp.templates.ecflow.requeue.derived_variables", return_value={})
+    task_basetimes = []
+
+    class IterationTask:
+        def __init__(self, task_config):
+            self.basetime = task_config["general.times.basetime"]
+
+        def run(self):
+            task_basetimes.append(self.basetime)
+
+    mocker.patch(
+        "surfexp.templates.ecflow.requeue.get_task",
+        side_effect=lambda __, task_config: IterationTask(task_config),
+    )
+
+    default_main(
+        ECF_NAME="/suite/task",
+        ECF_PASS="pass",
+        ECF_TRYNO="1",
+        ECF_RID="1",
+        ECF_TIMEOUT="0",
+        BASETIME="20250209T000000",
+        VALIDTIME="20250209T000000",
+        LOGLEVEL="INFO",
+        ARGS="",
+        WRAPPER="",
+        CONFIG="config.toml",
+        DEODE_HOME="deode_home",
+    )
+    assert task_basetimes == basetimes
+    # The task stays queued after the client signalled completion
+    assert client.events == events
+    if "requeue" in events:
+        assert client.variables[("/suite/task", "BASETIME")] == "2025-02-09T06:00:00Z"
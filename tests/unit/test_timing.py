@@ -0,0 +1,50 @@
+import json
+
+from surfexp.timing import (
+    PhaseTimer,
+    merge_metrics,
+    write_prometheus_textfile,
+    write_record,
+)
+
+
+def test_phase_timer():
+    timer = PhaseTimer()
+    timer.stop("init")
+    with timer.phase("external"):
+        pass
+    with timer.phase("external"):
+        pass
+    timer.add("archive", 1.5)
+    record = timer.record(task="Forcing", args={"mode": "default"})
+    assert set(record["phases"]) == {"init", "external", "archive"}
+    assert record["phases"]["archive"] == 1.5
+    assert record["task"] == "Forcing"
+    assert record["args"] == {"mode": "default"}
+    assert "hostname" in record
+
+
+def test_write_and_merge_records(tmp_path):
+    directory = f"{tmp_path}/metrics/task_timing"
+    soda = PhaseTimer().record(phases={"external": 2.0}, task="Soda")
+    forcing = PhaseTimer().record(phases={"external": 1.0}, task="Forcing")
+    files = [
+        write_record(f"{directory}/2020010106", soda),
+        write_record(f"{directory}/2020010100", forcing),
+    ]
+    assert len(set(files)) == 2
+    filename = f"{tmp_path}/task_timing.jsonl"
+    assert merge_metrics(directory, filename) == 2
+    with open(filename, mode="r", encoding="utf8") as fhandler:
+        records = [json.loads(line) for line in fhandler]
+    assert [record["task"] for record in records] == ["Soda", "Forcing"]
+
+
+def test_write_prometheus_textfile(tmp_path):
+    record = PhaseTimer().record(phases={"external": 2.5}, task="Soda")
+    filename = write_prometheus_textfile(f"{tmp_path}/prometheus", record)
+    with open(filename, mode="r", encoding="utf8") as fhandler:
+        content = fhandler.read()
+    assert 'phase="external"} 2.5' in content
+    assert 'task="Soda"' in content
+    assert "# TYPE surfexp_task_phase_seconds gauge" in content
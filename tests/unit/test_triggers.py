@@ -0,0 +1,152 @@
+import ecflow
+import pytest
+
+from surfexp.suites.triggers import (
+    TriggerGraph,
+    add_complete_trigger,
+    format_trigger,
+    parse_trigger,
+    reduce_triggers,
+)
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("(/s/a == complete)", ["/s/a"]),
+        ("(/s/a == complete) and (/s/b == complete)", ["/s/a", "/s/b"]),
+        ("((/s/a == complete) AND /s/a eq complete)", ["/s/a"]),
+        ("(/s/a == complete) or (/s/b == complete)", None),
+        ("(/s/a == aborted)", None),
+        ("(/s/a != complete)", None),
+        ("(a == complete)", None),
+    ],
+)
+def test_parse_trigger(expression, expected):
+    assert parse_trigger(expression) == expected
+
+
+def test_format_trigger():
+    paths = ["/s/a", "/s/b"]
+    assert parse_trigger(format_trigger(paths)) == paths
+
+
+def test_reduce_triggers():
+    parents = {
+        "/s/comp": "/s",
+        "/s/static": "/s",
+        "/s/day": "/s",
+        "/s/day/time": "/s/day",
+        "/s/day/time/input": "/s/day/time",
+        "/s/day/time/input/task": "/s/day/time/input",
+        "/s/day/time/prediction": "/s/day/time",
+        "/s/day/time/pp": "/s/day/time",
+        "/s/other": "/s",
+    }
+    triggers = {
+        "/s/static": ["/s/comp"],
+        "/s/day/time": ["/s/comp", "/s/static"],
+        "/s/day/time/input": ["/s/comp", "/s/static"],
+        "/s/day/time/input/task": ["/s/static"],
+        "/s/day/time/prediction": ["/s/static", "/s/day/time/input"],
+        "/s/day/time/pp": ["/s/day/time/input", "/s/day/time/prediction"],
+        "/s/other": ["/s/comp", "/s/day/time/pp"],
+    }
+    changed = TriggerGraph(parents, triggers).reduce()
+    assert changed == {
+        # Complete static data implies complete compilation
+        "/s/day/time": ["/s/static"],
+        # Implied by the parent
+        "/s/day/time/input": [],
+        "/s/day/time/input/task": [],
+        "/s/day/time/prediction": ["/s/day/time/input"],
+        # The prediction is triggered by the input
+        "/s/day/time/pp": ["/s/day/time/prediction"],
+        "/s/other": ["/s/day/time/pp"],
+    }
+
+
+def test_reduce_keeps_volatile_triggers():
+    parents = {
+        "/s/cycles": "/s",
+        "/s/cycles/input": "/s/cycles",
+        "/s/cycles/forecast": "/s/cycles",
+        "/s/cycles/pp": "/s/cycles",
+        "/s/last": "/s",
+    }
+    triggers = {
+        "/s/cycles/forecast": ["/s/cycles/input"],
+        "/s/cycles/pp": ["/s/cycles/input", "/s/cycles/forecast"],
+        "/s/last": ["/s/cycles", "/s/cycles/pp"],
+    }
+    volatile = {"/s/cycles", "/s/cycles/input", "/s/cycles/forecast", "/s/cycles/pp"}
+    changed = TriggerGraph(parents, triggers, volatile=volatile).reduce()
+    # A complete repeat family implies complete children
+    assert changed == {"/s/last": ["/s/cycles"]}
+
+
+def test_reduce_triggers_requeue_layout():
+    defs = ecflow.Defs()
+    suite = defs.add_suite("s")
+    cycles = suite.add_family("cycles")
+    cycles.add_repeat(ecflow.RepeatInteger("CYCLE", 0, 3))
+    cycles.add_task("input")
+    cycles.add_task("forecast").add_trigger("/s/cycles/input == complete")
+    cycles.add_task("pp").add_trigger(
+        "(/s/cycles/input == complete) and (/s/cycles/forecast == complete)"
+    )
+    suite.add_task("prep")
+    suite.add_task("run").add_trigger("/s/prep == complete")
+    suite.add_task("post").add_trigger("(/s/prep == complete) and (/s/run == complete)")
+    suite.add_family("empty")
+    suite.add_task("after_empty").add_trigger(
+        "(/s/prep == complete) and (/s/empty == complete)"
+    )
+    assert reduce_triggers(suite) == 1
+    assert parse_trigger(suite.find_node("post").get_trigger().get_expression()) == [
+        "/s/run"
+    ]
+    pp_trigger = cycles.find_node("pp").get_trigger().get_expression()
+    assert parse_trigger(pp_trigger) == ["/s/cycles/input", "/s/cycles/forecast"]
+    after_empty = suite.find_node("after_empty").get_trigger().get_expression()
+    assert parse_trigger(after_empty) == ["/s/prep", "/s/empty"]
+
+
+def test_reduce_keeps_unparsed_triggers():
+    parents = {"/s/a": "/s", "/s/b": "/s", "/s/b/c": "/s/b"}
+    triggers = {"/s/b": None, "/s/b/c": ["/s/a"]}
+    assert TriggerGraph(parents, triggers).reduce() == {}
+
+
+class TriggerNode:
+    """Node with the trigger methods of an ecflow node."""
+
+    def __init__(self, expression=None):
+        self.expression = expression
+
+    def get_trigger(self):
+        if self.expression is None:
+            return None
+        return self
+
+    def get_expression(self):
+        return self.expression
+
+    def delete_trigger(self):
+        self.expression = None
+
+    def add_trigger(self, expression):
+        assert self.expression is None
+        self.expression = expression
+
+
+def test_add_complete_trigger():
+    node = TriggerNode()
+    add_complete_trigger(node, "/s/a")
+    assert parse_trigger(node.expression) == ["/s/a"]
+    add_complete_trigger(node, "/s/b")
+    assert parse_trigger(node.expression) == ["/s/a", "/s/b"]
+
+    node = TriggerNode("(/s/a == complete) or (/s/b == complete)")
+    add_complete_trigger(node, "/s/c")
+    assert node.expression.endswith("and (/s/c == complete)")